@@ -1,102 +1,44 @@
 import { NextResponse } from 'next/server';
-import { GoogleGenerativeAI } from '@google/generative-ai';
 import { createClient } from '@supabase/supabase-js';
-import { createWorker } from 'tesseract.js';
 import { requireUser } from '@/lib/auth';
-import { MongoClient } from 'mongodb';
 import { assertNoMock } from '@/lib/mode';
+import { deepgramUrl } from '@/lib/upstreams';
+import { generateContent, GeminiBusyError } from '@/lib/gemini-scheduler';
+import { preprocessImage, preprocessRequested, preprocessHeaders } from '@/lib/image-preprocess';
+import { cachedVisionResult, cacheBypassRequested, cacheHeaders } from '@/lib/result-cache';
+import { recognizeWithPool, recognizeOneShot, ocrPoolRequested, OcrPoolBusyError } from '@/lib/ocr-pool';
+import { parseExportOptions, exportResponse } from '@/lib/export';
+import { repositories, InvalidCursorError, rollupDate } from '@/lib/repos';
+import { getDatabase } from '@/lib/repos/mongo/connection';
+import { cachedRead, invalidateUserReads, uncacheable } from '@/lib/read-cache';
+import { withIdempotency, withIdempotencyEach, idempotencyKey, idempotencyHeaders, IdempotencyConflictError } from '@/lib/idempotency';
+import { INDIAN_FOOD_DB } from '@/lib/indian-foods';
+import { resolveNutrients } from '@/lib/nutrient-resolver';
 
 // Force Node.js runtime for MongoDB operations
 export const runtime = 'nodejs';
 export const dynamic = 'force-dynamic';
 
-// MongoDB connection setup
-const MONGO_URL = process.env.MONGO_URL || process.env.MONGODB_URI || 'mongodb://localhost:27017';
-const DB_NAME = process.env.DB_NAME || process.env.MONGODB_DB || 'your_database_name';
-
-let cachedDb = null;
-let cachedClient = null;
-
+// One pool per process, shared with the repositories (lib/repos/mongo/connection.ts)
 async function connectToDatabase() {
-  if (cachedDb) {
-    return cachedDb;
-  }
-  
   try {
-    console.log('Connecting to MongoDB with:', { 
-      url: MONGO_URL ? 'SET' : 'MISSING', 
-      db: DB_NAME,
-      env_vars: {
-        MONGO_URL: !!process.env.MONGO_URL,
-        MONGODB_URI: !!process.env.MONGODB_URI,
-        DB_NAME: !!process.env.DB_NAME,
-        MONGODB_DB: !!process.env.MONGODB_DB
-      }
-    });
-    
-    if (!MONGO_URL || MONGO_URL === 'mongodb://localhost:27017') {
-      throw new Error('MongoDB connection string not configured for production');
-    }
-    
-    const client = new MongoClient(MONGO_URL, {
-      maxPoolSize: 10,
-      serverSelectionTimeoutMS: 5000,
-      connectTimeoutMS: 10000,
-    });
-    
-    await client.connect();
-    console.log('Successfully connected to MongoDB');
-    
-    const db = client.db(DB_NAME);
-    
-    // Test the connection with a ping
-    await db.admin().ping();
-    console.log('MongoDB ping successful');
-    
-    cachedDb = db;
-    cachedClient = client;
-    return db;
+    return await getDatabase();
   } catch (error) {
     console.error('MongoDB connection failed:', error);
     throw new Error(`Database connection failed: ${error.message}`);
   }
 }
-const genAI = new GoogleGenerativeAI(process.env.GEMINI_API_KEY);
 const supabase = createClient(
   process.env.SUPABASE_URL,
   process.env.SUPABASE_ANON_KEY
 );
 
-// Comprehensive Indian food database (sample)
-const INDIAN_FOOD_DB = {
-  "dal tadka": { calories: 180, protein_g: 9, fiber_g: 8, sodium_mg: 400, category: "dal" },
-  "paneer tikka": { calories: 250, protein_g: 15, fiber_g: 2, sodium_mg: 600, category: "paneer" },
-  "chicken tikka": { calories: 220, protein_g: 25, fiber_g: 1, sodium_mg: 800, category: "chicken" },
-  "butter chicken": { calories: 350, protein_g: 20, fiber_g: 2, sodium_mg: 900, category: "chicken" },
-  "biryani": { calories: 450, protein_g: 12, fiber_g: 3, sodium_mg: 1200, category: "rice" },
-  "roti": { calories: 120, protein_g: 4, fiber_g: 2, sodium_mg: 200, category: "bread" },
-  "naan": { calories: 200, protein_g: 6, fiber_g: 2, sodium_mg: 400, category: "bread" },
-  "rice": { calories: 200, protein_g: 4, fiber_g: 1, sodium_mg: 10, category: "rice" },
-  "idli": { calories: 80, protein_g: 3, fiber_g: 1, sodium_mg: 150, category: "south_indian" },
-  "dosa": { calories: 150, protein_g: 4, fiber_g: 2, sodium_mg: 300, category: "south_indian" },
-  "samosa": { calories: 250, protein_g: 4, fiber_g: 3, sodium_mg: 500, category: "snack" },
-  "chole": { calories: 220, protein_g: 12, fiber_g: 10, sodium_mg: 600, category: "dal" },
-  "rajma": { calories: 200, protein_g: 10, fiber_g: 8, sodium_mg: 500, category: "dal" },
-  "palak paneer": { calories: 180, protein_g: 12, fiber_g: 4, sodium_mg: 700, category: "paneer" },
-  "masala dosa": { calories: 200, protein_g: 6, fiber_g: 3, sodium_mg: 400, category: "south_indian" },
-  "upma": { calories: 160, protein_g: 4, fiber_g: 3, sodium_mg: 350, category: "south_indian" },
-  "poha": { calories: 140, protein_g: 3, fiber_g: 2, sodium_mg: 300, category: "snack" },
-  "paratha": { calories: 250, protein_g: 6, fiber_g: 3, sodium_mg: 500, category: "bread" },
-  "thali": { calories: 600, protein_g: 20, fiber_g: 12, sodium_mg: 1500, category: "complete_meal" }
-};
-
 // Menu OCR processing using Gemini Vision (primary) with Tesseract fallback
-async function processMenuImage(imageBuffer, useVisionOCR = true) {
+async function processMenuImage(imageBuffer, useVisionOCR = true, mimeType = 'image/jpeg', useOcrPool = true) {
   if (useVisionOCR) {
     try {
       console.log('Processing menu image with Gemini Vision OCR...');
       
-      const model = genAI.getGenerativeModel({ model: "gemini-1.5-flash" });
       const base64Image = imageBuffer.toString('base64');
       
       const prompt = `You are an expert at reading Indian restaurant menus. Analyze this menu image and extract ONLY the food item names.
@@ -111,15 +53,15 @@ Instructions:
 
 Format: List each food item on a new line.`;
 
-      const result = await model.generateContent([
+      const result = await generateContent([
         prompt,
         {
           inlineData: {
-            mimeType: 'image/jpeg',
+            mimeType,
             data: base64Image
           }
         }
-      ]);
+      ], { priority: 'batch' });
       
       const response = result.response.text();
       console.log('Gemini Vision OCR result:', response);
@@ -129,27 +71,21 @@ Format: List each food item on a new line.`;
     } catch (error) {
       console.error('Gemini Vision OCR Error:', error);
       console.log('Falling back to Tesseract.js...');
-      return await processTesseractFallback(imageBuffer);
+      return await processTesseractFallback(imageBuffer, useOcrPool);
     }
   } else {
-    return await processTesseractFallback(imageBuffer);
+    return await processTesseractFallback(imageBuffer, useOcrPool);
   }
 }
 
-// Tesseract.js fallback implementation
-async function processTesseractFallback(imageBuffer) {
+// Tesseract.js fallback on warm pooled workers (lib/ocr-pool.ts)
+async function processTesseractFallback(imageBuffer, useOcrPool = true) {
   try {
     console.log('Processing with Tesseract.js fallback...');
     
-    const worker = await createWorker('eng+hin', 1);
-    
-    await worker.setParameters({
-      tessedit_page_seg_mode: '6',
-      tessedit_char_whitelist: 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 .-₹',
-    });
-    
-    const { data: { text, confidence } } = await worker.recognize(imageBuffer);
-    await worker.terminate();
+    const { text, confidence } = useOcrPool
+      ? await recognizeWithPool(imageBuffer)
+      : await recognizeOneShot(imageBuffer);
     
     return { 
       text, 
@@ -159,6 +95,9 @@ async function processTesseractFallback(imageBuffer) {
     };
     
   } catch (error) {
+    if (error instanceof OcrPoolBusyError) {
+      throw error; // Shed load instead of answering with canned data
+    }
     console.error('Tesseract.js Error:', error);
     
     // Final fallback with mock Indian menu data
@@ -230,26 +169,20 @@ function getRecommendations(items, profile) {
   };
 }
 
-// Extract food items from OCR text
-function extractFoodItems(ocrText) {
-  const lines = ocrText.toLowerCase().split('\n')
-    .map(line => line.trim())
-    .filter(line => line.length > 2);
+// Extract food items from OCR text (one per line naming a known food),
+// resolved in one batched lookup
+async function extractFoodItems(ocrText) {
+  const lines = ocrText.split('\n').filter(line => line.trim().length > 2);
+  const { results } = await resolveNutrients(lines);
   
-  const foundItems = [];
-  
-  for (const line of lines) {
-    for (const [foodName, nutritionData] of Object.entries(INDIAN_FOOD_DB)) {
-      if (line.includes(foodName.toLowerCase()) || 
-          foodName.toLowerCase().includes(line)) {
-        foundItems.push({
-          name: foodName.charAt(0).toUpperCase() + foodName.slice(1),
-          ...nutritionData
-        });
-        break;
-      }
-    }
-  }
+  const foundItems = results.filter(Boolean).map(({ food }) => ({
+    name: food.name.charAt(0).toUpperCase() + food.name.slice(1),
+    calories: food.kcal,
+    protein_g: food.protein_g,
+    fiber_g: food.fiber_g,
+    sodium_mg: food.sodium_mg,
+    category: food.category
+  }));
   
   if (foundItems.length === 0) {
     foundItems.push(
@@ -305,29 +238,42 @@ export async function POST(request) {
       // Check feature flag for OCR method
       const useVisionOCR = true; // Default to Vision, can be controlled by PostHog flag
       
-      const imageBuffer = Buffer.from(await imageFile.arrayBuffer());
-      const ocrResult = await processMenuImage(imageBuffer, useVisionOCR);
-      
-      const items = extractFoodItems(ocrResult.text);
-      const defaultProfile = { veg_flag: true, weight_kg: 65 };
-      const recommendations = getRecommendations(items, defaultProfile);
-      
-      const response = {
-        items,
-        picks: recommendations.picks,
-        alternates: recommendations.alternates,
-        avoid: recommendations.avoid,
-        assumptions: [
-          "Portion sizes assumed as standard servings",
-          "Vegetarian preference applied",
-          "Nutrition values are approximate"
-        ],
-        ocr_method: ocrResult.method,
-        confidence: ocrResult.confidence,
-        degraded: ocrResult.degraded || false
-      };
+      const image = await preprocessImage(
+        Buffer.from(await imageFile.arrayBuffer()),
+        imageFile.type,
+        'menu',
+        preprocessRequested(request)
+      );
+      // Repeat scans of the same menu are served from lib/result-cache.ts
+      const { result: response, outcome, hash } = await cachedVisionResult('menu', image, async () => {
+        const ocrResult = await processMenuImage(image.data, useVisionOCR, image.mimeType, ocrPoolRequested(request));
+        
+        const items = await extractFoodItems(ocrResult.text);
+        const defaultProfile = { veg_flag: true, weight_kg: 65 };
+        const recommendations = getRecommendations(items, defaultProfile);
+        
+        return {
+          items,
+          picks: recommendations.picks,
+          alternates: recommendations.alternates,
+          avoid: recommendations.avoid,
+          assumptions: [
+            "Portion sizes assumed as standard servings",
+            "Vegetarian preference applied",
+            "Nutrition values are approximate"
+          ],
+          ocr_method: ocrResult.method,
+          confidence: ocrResult.confidence,
+          degraded: ocrResult.degraded || false
+        };
+      }, {
+        bypass: cacheBypassRequested(request),
+        cacheable: (scan) => !scan.degraded
+      });
       
-      return NextResponse.json(response);
+      return NextResponse.json(response, {
+        headers: { ...preprocessHeaders(image), ...cacheHeaders(outcome, hash) }
+      });
     }
     
     // Meal Photo Analyzer endpoint
@@ -343,12 +289,55 @@ export async function POST(request) {
         );
       }
       
-      const analysis = await analyzeMealPhoto(imageFile);
-      return NextResponse.json(analysis);
+      const image = await preprocessImage(
+        Buffer.from(await imageFile.arrayBuffer()),
+        imageFile.type,
+        'meal',
+        preprocessRequested(request)
+      );
+      const { result: analysis, outcome, hash } = await cachedVisionResult('meal', image, () => analyzeMealPhoto(image), {
+        bypass: cacheBypassRequested(request),
+        cacheable: (result) => !result.degraded
+      });
+      return NextResponse.json(analysis, {
+        headers: { ...preprocessHeaders(image), ...cacheHeaders(outcome, hash) }
+      });
     }
     
     // Food logging endpoint
+    if (pathname.includes('/logs/batch')) {
+      const { user, error } = await requireUser(request);
+      if (error) return error;
+      
+      const body = await request.json();
+      const entries = Array.isArray(body) ? body : body?.entries;
+      if (!Array.isArray(entries) || entries.length === 0) {
+        return NextResponse.json(
+          { error: { type: 'DataContract', message: 'entries must be a non-empty array' } },
+          { status: 400 }
+        );
+      }
+      if (entries.length > MAX_BATCH_ENTRIES) {
+        return NextResponse.json(
+          { error: { type: 'DataContract', message: `At most ${MAX_BATCH_ENTRIES} entries per batch` } },
+          { status: 400 }
+        );
+      }
+      
+      // A retried batch with an Idempotency-Key header replays the first
+      // response; entries' own keys are checked one by one in logFoodBatch
+      const outcome = await withIdempotency(user.id, 'logs_batch', idempotencyKey(request), entries, async () => {
+        const batch = await logFoodBatch(user.id, entries);
+        // 207 when some entries were rejected, so callers check per-item results
+        return { status: batch.invalid || batch.conflicts ? 207 : 200, body: batch };
+      });
+      return NextResponse.json(outcome.body, { status: outcome.status, headers: idempotencyHeaders(outcome) });
+    }
+    
     if (pathname.includes('/logs')) {
+      const { user, error } = await requireUser(request);
+      if (error) return error;
+      
       const { food_id, menu_item_id, portion_qty, portion_unit, idempotency_key } = await request.json();
       
       if (!food_id && !menu_item_id) {
@@ -358,15 +347,19 @@ export async function POST(request) {
         );
       }
       
-      const logEntry = await logFoodEntry({
+      // Retries with the same key get the first response back, never a second log
+      const entry = {
         food_id,
         menu_item_id,
         portion_qty: portion_qty || 1,
-        portion_unit: portion_unit || 'serving',
-        idempotency_key
-      });
+        portion_unit: portion_unit || 'serving'
+      };
+      const outcome = await withIdempotency(user.id, 'logs', idempotencyKey(request, idempotency_key), entry, async () => ({
+        status: 200,
+        body: await logFoodEntry({ user_id: user.id, ...entry })
+      }));
       
-      return NextResponse.json(logEntry);
+      return NextResponse.json(outcome.body, { status: outcome.status, headers: idempotencyHeaders(outcome) });
     }
     
     // TDEE Calculator endpoint
@@ -450,15 +443,13 @@ export async function POST(request) {
         );
       }
       
-      const model = genAI.getGenerativeModel({ model: "gemini-1.5-flash" });
-      
       const contextInfo = profile ? 
         `User profile: Weight ${profile.weight_kg || 65}kg, Height ${profile.height_cm || 165}cm, ${profile.veg_flag ? 'Vegetarian' : 'Non-vegetarian'}, Activity: ${profile.activity_level || 'moderate'}` : 
         'No profile data available';
       
       const fullPrompt = `${COACH_C_PROMPT}\n\nUser Context: ${contextInfo}\nUser Question: ${message}`;
       
-      const result = await model.generateContent(fullPrompt);
+      const result = await generateContent(fullPrompt, { priority: 'interactive' });
       const reply = result.response.text();
       
       return NextResponse.json({
@@ -480,7 +471,7 @@ export async function POST(request) {
       
       try {
         // Call Deepgram Aura-2 TTS
-        const deepgramResponse = await fetch('https://api.deepgram.com/v1/speak?model=aura-2-en', {
+        const deepgramResponse = await fetch(deepgramUrl('/v1/speak?model=aura-2-en'), {
           method: 'POST',
           headers: {
             'Authorization': `Token ${process.env.DEEPGRAM_API_KEY}`,
@@ -546,6 +537,18 @@ export async function POST(request) {
     );
     
   } catch (error) {
+    if (error instanceof OcrPoolBusyError || error instanceof GeminiBusyError) {
+      return NextResponse.json(
+        { error: { type: 'Logic', message: error.message } },
+        { status: 503, headers: { 'Retry-After': String(error.retryAfterS) } }
+      );
+    }
+    if (error instanceof IdempotencyConflictError) {
+      return NextResponse.json(
+        { error: { type: error.status === 422 ? 'DataContract' : 'Logic', message: error.message } },
+        { status: error.status, headers: error.status === 409 ? { 'Retry-After': '1' } : {} }
+      );
+    }
     console.error('API Error:', error);
     return NextResponse.json(
       { error: { type: 'Logic', message: error.message } },
@@ -561,56 +564,92 @@ export async function GET(request) {
   try {
     // Export endpoint
     if (pathname.includes('/export')) {
-      // Get user from auth
-      const { user, error } = await requireUser(request);
+      // Get user from auth - checked with Supabase, a full export must not go to a revoked session
+      const { user, error } = await requireUser(request, { remote: true });
       if (error) return error;
       
-      // Get all user data
-      const profile = await getUserProfile(user.id);
-      const targets = await getDailyTargets(null, user.id); // Get all targets
-      const logs = await getFoodLogs(null, null, user.id); // Get all logs
+      // Stream targets and logs off cursors instead of building one object (lib/export.ts)
+      const options = parseExportOptions(url);
+      if (options.error) {
+        return NextResponse.json(
+          { error: { type: 'DataContract', message: options.error } },
+          { status: 400 }
+        );
+      }
       
-      const exportData = {
-        user_id: user.id,
-        exported_at: new Date().toISOString(),
-        profile: profile || {},
-        targets: targets || [],
-        logs: logs || [],
-        metadata: {
-          total_targets: (targets || []).length,
-          total_logs: (logs || []).length,
-          date_range: {
-            earliest_log: logs?.[logs.length - 1]?.ts,
-            latest_log: logs?.[0]?.ts
-          }
-        }
-      };
+      return exportResponse(user.id, options);
+    }
+
+    if (pathname.includes('/rollups')) {
+      const { user, error } = await requireUser(request);
+      if (error) return error;
       
-      return NextResponse.json(exportData, {
-        headers: {
-          'Content-Type': 'application/json',
-          'Content-Disposition': `attachment; filename="fitbear-export-${user.id}-${new Date().toISOString().split('T')[0]}.json"`
-        }
+      const to = url.searchParams.get('to') || rollupDate();
+      const from = url.searchParams.get('from') || to;
+      const isDay = (value) => /^\d{4}-\d{2}-\d{2}$/.test(value) && !isNaN(Date.parse(value));
+      if (!isDay(from) || !isDay(to) || from > to) {
+        return NextResponse.json(
+          { error: { type: 'DataContract', message: 'from/to must be YYYY-MM-DD with from <= to' } },
+          { status: 400 }
+        );
+      }
+      if ((Date.parse(to) - Date.parse(from)) / 86400000 >= MAX_ROLLUP_DAYS) {
+        return NextResponse.json(
+          { error: { type: 'DataContract', message: `At most ${MAX_ROLLUP_DAYS} days per request` } },
+          { status: 400 }
+        );
+      }
+      
+      return NextResponse.json(await getRollupRange(user.id, from, to), {
+        headers: { 'Cache-Control': 'no-store' }
       });
     }
-
+    
     if (pathname.includes('/logs')) {
+      const { user, error } = await requireUser(request);
+      if (error) return error;
+      
+      // Keyset pagination: pass next_cursor back as ?cursor= for the following page
       const from = url.searchParams.get('from');
       const to = url.searchParams.get('to');
-      const logs = await getFoodLogs(from, to);
-      return NextResponse.json(logs || []);
+      const fields = url.searchParams.get('fields');
+      if ((from && isNaN(Date.parse(from))) || (to && isNaN(Date.parse(to)))) {
+        return NextResponse.json(
+          { error: { type: 'DataContract', message: 'from/to must be dates' } },
+          { status: 400 }
+        );
+      }
+      try {
+        const page = await repositories.foodLogs.findPageByUserId(user.id, {
+          limit: Number(url.searchParams.get('limit')) || undefined,
+          cursor: url.searchParams.get('cursor'),
+          from: from ? new Date(from) : undefined,
+          to: to ? new Date(to) : undefined,
+          fields: fields ? fields.split(',').map(f => f.trim()).filter(Boolean) : undefined
+        });
+        return NextResponse.json(page, { headers: { 'Cache-Control': 'no-store' } });
+      } catch (err) {
+        if (err instanceof InvalidCursorError) {
+          return NextResponse.json(
+            { error: { type: 'DataContract', message: err.message } },
+            { status: 400 }
+          );
+        }
+        throw err;
+      }
     }
     
+    // Profile and targets reads are cached per user and answer If-None-Match
+    // with 304 (lib/read-cache.ts); the writes below invalidate them. The demo
+    // stand-ins served after a database error are marked uncacheable.
     if (pathname.includes('/me/targets')) {
-      const date = url.searchParams.get('date');
-      const targets = await getDailyTargets(date);
-      return NextResponse.json(targets);
+      const date = url.searchParams.get('date') || new Date().toISOString().split('T')[0];
+      return cachedRead(request, 'targets', 'demo-user', date, () => getDailyTargets(date, 'demo-user', uncacheable));
     }
     
     if (pathname.includes('/me')) {
       const userId = url.searchParams.get('user_id') || 'demo-user';
-      const profile = await getUserProfile(userId);
-      return NextResponse.json(profile || {});
+      return cachedRead(request, 'profile', userId, '', async () => (await getUserProfile(userId, uncacheable)) || {});
     }
     
     return NextResponse.json({ message: "Fitbear AI API is running!" });
@@ -686,12 +725,10 @@ export async function PUT(request) {
   }
 }
 
-// Meal Photo Analysis using Gemini Vision
-async function analyzeMealPhoto(imageFile) {
+// Meal Photo Analysis using Gemini Vision (image is a preprocessImage() result)
+async function analyzeMealPhoto(image) {
   try {
-    const model = genAI.getGenerativeModel({ model: "gemini-1.5-flash" });
-    const imageBuffer = Buffer.from(await imageFile.arrayBuffer());
-    const base64Image = imageBuffer.toString('base64');
+    const base64Image = image.data.toString('base64');
     
     const prompt = `Analyze this Indian meal photo. Identify the main dishes visible and provide:
 1. Top 3 most likely food items with confidence scores
@@ -701,15 +738,15 @@ async function analyzeMealPhoto(imageFile) {
 Focus on common Indian foods: dal, rice, roti, sabzi, paneer dishes, etc.
 Format response as JSON with: guess, portion_hint, confidence, question.`;
     
-    const result = await model.generateContent([
+    const result = await generateContent([
       prompt,
       {
         inlineData: {
-          mimeType: imageFile.type,
+          mimeType: image.mimeType,
           data: base64Image
         }
       }
-    ]);
+    ], { priority: 'batch' });
     
     const response = result.response.text();
     
@@ -731,6 +768,7 @@ Format response as JSON with: guess, portion_hint, confidence, question.`;
         ],
         portion_hint: "Standard serving sizes assumed",
         confidence: 0.7,
+        degraded: true,
         question: "How many rotis can you see in the image?",
         on_confirm: {
           calories: 420,
@@ -744,6 +782,9 @@ Format response as JSON with: guess, portion_hint, confidence, question.`;
     }
     
   } catch (error) {
+    if (error instanceof GeminiBusyError) {
+      throw error; // Shed load instead of answering with canned data
+    }
     console.error('Photo analysis error:', error);
     
     assertNoMock('meal photo analysis: processing error');
@@ -755,6 +796,7 @@ Format response as JSON with: guess, portion_hint, confidence, question.`;
       ],
       portion_hint: "Complete meal detected",
       confidence: 0.6,
+      degraded: true,
       question: "Is this a full thali or individual dishes?",
       on_confirm: {
         calories: 600,
@@ -769,79 +811,204 @@ Format response as JSON with: guess, portion_hint, confidence, question.`;
 }
 
 // Food logging with idempotency
-async function logFoodEntry({ food_id, menu_item_id, portion_qty, portion_unit, idempotency_key }) {
-  try {
-    if (idempotency_key) {
-      console.log(`Checking idempotency for key: ${idempotency_key}`);
+/**
+ * The food_logs document for one entry (without user_id/ts)
+ */
+function buildLogEntry({ food_id, menu_item_id, portion_qty, portion_unit }) {
+  const foodData = INDIAN_FOOD_DB[food_id] || INDIAN_FOOD_DB["dal tadka"];
+  
+  return {
+    source_enum: menu_item_id ? 'menu' : 'manual',
+    food_id,
+    menu_item_id,
+    portion_qty_numeric: portion_qty,
+    portion_units: portion_unit,
+    kcal: Math.round(foodData.calories * portion_qty),
+    protein_g: Math.round(foodData.protein_g * portion_qty * 10) / 10,
+    carb_g: Math.round((foodData.carb_g || 0) * portion_qty * 10) / 10,
+    fat_g: Math.round((foodData.fat_g || 0) * portion_qty * 10) / 10,
+    fiber_g: Math.round(foodData.fiber_g * portion_qty * 10) / 10,
+    sodium_mg: Math.round(foodData.sodium_mg * portion_qty)
+  };
+}
+
+function logEntryResponse(saved) {
+  return {
+    log_id: saved.id,
+    logged_at: saved.ts.toISOString(),
+    date: rollupDate(saved.ts),
+    calories: saved.kcal,
+    macros: {
+      protein_g: saved.protein_g,
+      carb_g: saved.carb_g,
+      fat_g: saved.fat_g,
+      fiber_g: saved.fiber_g,
+      sodium_mg: saved.sodium_mg
     }
+  };
+}
+
+async function logFoodEntry({ user_id, food_id, menu_item_id, portion_qty, portion_unit }) {
+  try {
+    // Persisting also $inc's the day's daily_rollups document
+    const saved = await repositories.foodLogs.create({
+      user_id,
+      ts: new Date(),
+      ...buildLogEntry({ food_id, menu_item_id, portion_qty, portion_unit })
+    });
     
-    const foodData = INDIAN_FOOD_DB[food_id] || INDIAN_FOOD_DB["dal tadka"];
-    
-    const actualCalories = Math.round(foodData.calories * portion_qty);
-    const actualProtein = Math.round(foodData.protein_g * portion_qty * 10) / 10;
-    const actualCarbs = Math.round((foodData.carb_g || 0) * portion_qty * 10) / 10;
-    const actualFat = Math.round((foodData.fat_g || 0) * portion_qty * 10) / 10;
-    const actualFiber = Math.round(foodData.fiber_g * portion_qty * 10) / 10;
-    const actualSodium = Math.round(foodData.sodium_mg * portion_qty);
-    
-    const logEntry = {
-      log_id: `log_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`,
-      food_id,
-      menu_item_id,
-      portion_qty,
-      portion_unit,
-      calories: actualCalories,
-      protein_g: actualProtein,
-      carb_g: actualCarbs,
-      fat_g: actualFat,
-      fiber_g: actualFiber,
-      sodium_mg: actualSodium,
-      logged_at: new Date().toISOString(),
-      idempotency_key
-    };
-    
-    console.log('Logging food entry:', logEntry);
-    
-    return {
-      log_id: logEntry.log_id,
-      calories: actualCalories,
-      macros: {
-        protein_g: actualProtein,
-        carb_g: actualCarbs,
-        fat_g: actualFat,
-        fiber_g: actualFiber,
-        sodium_mg: actualSodium
-      }
-    };
+    return logEntryResponse(saved);
     
   } catch (error) {
     throw new Error(`Failed to log food entry: ${error.message}`);
   }
 }
 
-// Stub functions for demo
-async function getFoodLogs(from, to) {
-  return [
-    {
-      id: "log1",
-      timestamp: new Date().toISOString(),
-      food_name: "Dal Tadka",
-      calories: 180,
-      protein_g: 9,
-      portion: "1 katori"
-    },
-    {
-      id: "log2", 
-      timestamp: new Date(Date.now() - 3600000).toISOString(),
-      food_name: "Roti",
-      calories: 120,
-      protein_g: 4,
-      portion: "2 pieces"
+const MAX_BATCH_ENTRIES = 100;
+
+/**
+ * Check one batch entry; returns an error message or null
+ */
+function validateBatchEntry(entry) {
+  if (!entry || typeof entry !== 'object') return 'Entry must be an object';
+  if (!entry.food_id && !entry.menu_item_id) return 'Either food_id or menu_item_id required';
+  if (entry.portion_qty !== undefined &&
+      (typeof entry.portion_qty !== 'number' || !(entry.portion_qty > 0) || !Number.isFinite(entry.portion_qty))) {
+    return 'portion_qty must be a positive number';
+  }
+  if (entry.portion_unit !== undefined && typeof entry.portion_unit !== 'string') return 'portion_unit must be a string';
+  if (entry.idempotency_key !== undefined && typeof entry.idempotency_key !== 'string') return 'idempotency_key must be a string';
+  return null;
+}
+
+/**
+ * Validate every entry in one pass, drop repeats of an idempotency_key
+ * within the batch, and write the rest with a single insertMany. A keyed
+ * entry is checked against the same 'logs' idempotency scope as POST /logs,
+ * so one already logged (singly or in an earlier batch) is replayed rather
+ * than written again. Returns one result per input entry, in order.
+ */
+async function logFoodBatch(userId, entries) {
+  const results = new Array(entries.length);
+  const firstIndexByKey = new Map();
+  const keyed = [];
+  const unkeyed = [];
+  const ts = new Date();
+  
+  entries.forEach((entry, index) => {
+    const invalid = validateBatchEntry(entry);
+    if (invalid) {
+      results[index] = { index, status: 'invalid', error: invalid };
+      return;
+    }
+    // Same shape POST /logs keys its request with
+    const log = {
+      food_id: entry.food_id,
+      menu_item_id: entry.menu_item_id,
+      portion_qty: entry.portion_qty || 1,
+      portion_unit: entry.portion_unit || 'serving'
+    };
+    if (entry.idempotency_key) {
+      if (firstIndexByKey.has(entry.idempotency_key)) {
+        results[index] = { index, status: 'duplicate', duplicate_of: firstIndexByKey.get(entry.idempotency_key) };
+        return;
+      }
+      firstIndexByKey.set(entry.idempotency_key, index);
+      keyed.push({ index, key: entry.idempotency_key, request: log });
+    } else {
+      unkeyed.push({ index, request: log });
     }
-  ];
+  });
+  
+  // New keyed entries and unkeyed ones go out in the same insertMany
+  let unkeyedResponses = [];
+  const outcomes = await withIdempotencyEach(userId, 'logs', keyed, async (positions) => {
+    const toWrite = [...unkeyed, ...positions.map(pos => keyed[pos])];
+    const saved = await repositories.foodLogs.createMany(toWrite.map(item => ({
+      user_id: userId,
+      ts,
+      ...buildLogEntry(item.request)
+    })));
+    const responses = saved.map(logEntryResponse);
+    unkeyedResponses = responses.slice(0, unkeyed.length);
+    return responses.slice(unkeyed.length).map(body => ({ status: 200, body }));
+  });
+  
+  unkeyed.forEach((item, i) => {
+    results[item.index] = { index: item.index, status: 'created', ...unkeyedResponses[i] };
+  });
+  keyed.forEach((item, pos) => {
+    const outcome = outcomes[pos];
+    results[item.index] = outcome instanceof IdempotencyConflictError
+      ? { index: item.index, status: 'conflict', error: outcome.message }
+      : { index: item.index, status: outcome.replayed ? 'replayed' : 'created', ...outcome.body };
+  });
+  
+  // Repeats point at the entry they duplicate and share its log
+  for (const result of results) {
+    if (result.status === 'duplicate') {
+      result.log_id = results[result.duplicate_of].log_id;
+    }
+  }
+  
+  const count = (status) => results.filter(r => r.status === status).length;
+  return {
+    created: count('created'),
+    replayed: count('replayed'),
+    duplicates: count('duplicate'),
+    invalid: count('invalid'),
+    conflicts: count('conflict'),
+    results
+  };
+}
+
+const MAX_ROLLUP_DAYS = 366;
+
+/**
+ * Daily totals for [from, to] next to that day's targets document: two
+ * indexed range reads (daily_rollups, targets), no scan of food_logs.
+ * Days without logs come back with zero totals so charts need no gap-filling.
+ */
+async function getRollupRange(userId, from, to) {
+  const [rollups, targets] = await Promise.all([
+    repositories.dailyRollups.findRange(userId, from, to),
+    (async () => {
+      const rows = [];
+      for await (const target of repositories.targets.iterateByUserId(userId, { from, to })) {
+        rows.push(target);
+      }
+      return rows;
+    })()
+  ]);
+  
+  const rollupByDate = new Map(rollups.map(r => [r.date, r]));
+  const targetByDate = new Map(targets.map(t => [t.date, t]));
+  
+  const days = [];
+  for (let t = Date.parse(from); t <= Date.parse(to); t += 86400000) {
+    const date = new Date(t).toISOString().split('T')[0];
+    const rollup = rollupByDate.get(date);
+    days.push({
+      date,
+      totals: {
+        kcal: rollup?.kcal || 0,
+        protein_g: rollup?.protein_g || 0,
+        carb_g: rollup?.carb_g || 0,
+        fat_g: rollup?.fat_g || 0,
+        fiber_g: rollup?.fiber_g || 0,
+        sodium_mg: rollup?.sodium_mg || 0
+      },
+      log_count: rollup?.log_count || 0,
+      target: targetByDate.get(date) || null
+    });
+  }
+  
+  return { from, to, days };
 }
 
-async function getUserProfile(userId = 'demo-user') {
+// Stub functions for demo. `onDbError` wraps the stand-in returned when the
+// database read fails (the read cache passes `uncacheable`).
+async function getUserProfile(userId = 'demo-user', onDbError = (fallback) => fallback) {
   try {
     const db = await connectToDatabase();
     const profile = await db.collection('profiles').findOne({ user_id: userId });
@@ -863,13 +1030,13 @@ async function getUserProfile(userId = 'demo-user') {
     };
   } catch (error) {
     console.error('Error fetching user profile:', error);
-    return {
+    return onDbError({
       name: "Demo User",
       height_cm: 165,
       weight_kg: 65,
       veg_flag: true,
       activity_level: "moderate"
-    };
+    });
   }
 }
 
@@ -908,6 +1075,7 @@ async function updateUserProfile(profileData) {
       }
     );
     
+    invalidateUserReads(userId);
     console.log('Profile update result:', result.value ? 'success' : 'failed');
     
     if (result.value) {
@@ -933,7 +1101,7 @@ async function updateUserProfile(profileData) {
   }
 }
 
-async function getDailyTargets(date, userId = 'demo-user') {
+async function getDailyTargets(date, userId = 'demo-user', onDbError = (fallback) => fallback) {
   try {
     const db = await connectToDatabase();
     const targetDate = date || new Date().toISOString().split('T')[0];
@@ -964,7 +1132,7 @@ async function getDailyTargets(date, userId = 'demo-user') {
     };
   } catch (error) {
     console.error('Error fetching daily targets:', error);
-    return {
+    return onDbError({
       date: date || new Date().toISOString().split('T')[0],
       tdee_kcal: 2400,
       kcal_budget: 2200,
@@ -974,7 +1142,7 @@ async function getDailyTargets(date, userId = 'demo-user') {
       fiber_g: 30,
       water_ml: 2500,
       steps: 8000
-    };
+    });
   }
 }
 
@@ -1016,6 +1184,7 @@ async function upsertDailyTargets(targetData) {
       }
     );
     
+    invalidateUserReads(userId);
     console.log('Targets upsert result:', result.value ? 'success' : 'failed');
     
     if (result.value) {
@@ -1039,4 +1208,38 @@ async function upsertDailyTargets(targetData) {
     console.log('Returning fallback targets response:', fallbackResponse);
     return fallbackResponse;
   }
-}
\ No newline at end of file
+}
+
+export async function DELETE(request) {
+  const pathname = new URL(request.url).pathname;
+  
+  try {
+    // DELETE /api/logs/<id> - also takes the log back out of its daily rollup
+    const logMatch = pathname.match(/\/logs\/([^/]+)$/);
+    if (logMatch) {
+      const { user, error } = await requireUser(request, { remote: true });
+      if (error) return error;
+      
+      const removed = await repositories.foodLogs.deleteById(user.id, decodeURIComponent(logMatch[1]));
+      if (!removed) {
+        return NextResponse.json(
+          { error: { type: 'Logic', message: 'Log not found' } },
+          { status: 404 }
+        );
+      }
+      return NextResponse.json({ deleted: removed.id, date: rollupDate(removed.ts) });
+    }
+    
+    return NextResponse.json(
+      { error: { type: 'Logic', message: 'DELETE endpoint not found' } },
+      { status: 404 }
+    );
+    
+  } catch (error) {
+    console.error('DELETE API Error:', error);
+    return NextResponse.json(
+      { error: { type: 'Logic', message: error.message } },
+      { status: 500 }
+    );
+  }
+}
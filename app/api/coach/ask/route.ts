@@ -1,18 +1,119 @@
 import { NextResponse } from 'next/server';
-import { GoogleGenerativeAI } from '@google/generative-ai';
+import { generateContent, generateContentStream, geminiSchedulerRequested, GeminiBusyError } from '@/lib/gemini-scheduler';
 import { requireUser } from '@/lib/auth';
+import { repositories, rollupDate } from '@/lib/repos';
 
 export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
 
-const genAI = new GoogleGenerativeAI(process.env.GEMINI_API_KEY || '');
+type StreamFormat = 'sse' | 'ndjson';
+
+const CONTEXT_DAYS = 7;
+// An unreachable database must not hold up the reply
+const CONTEXT_TIMEOUT_MS = 500;
+
+/**
+ * Last week's daily totals, one range read on daily_rollups. The coach
+ * answers without them if the database is unavailable.
+ */
+async function recentDailyTotals(userId: string) {
+  try {
+    const to = rollupDate();
+    const from = rollupDate(new Date(Date.now() - (CONTEXT_DAYS - 1) * 86400000));
+    let timer: NodeJS.Timeout | undefined;
+    const timeout = new Promise<never>((_, reject) => {
+      timer = setTimeout(() => reject(new Error(`exceeded ${CONTEXT_TIMEOUT_MS}ms`)), CONTEXT_TIMEOUT_MS);
+    });
+    const rollups = await Promise.race([repositories.dailyRollups.findRange(userId, from, to), timeout])
+      .finally(() => clearTimeout(timer));
+    return rollups.map(({ date, kcal, protein_g, carb_g, fat_g, fiber_g, log_count }) => ({
+      date, kcal, protein_g, carb_g, fat_g, fiber_g, log_count
+    }));
+  } catch (error) {
+    console.warn('Coach rollup context unavailable:', (error as Error).message);
+    return [];
+  }
+}
+
+/**
+ * Streaming is opt-in so the `{reply}` JSON shape keeps working:
+ * `Accept: text/event-stream` -> SSE, `Accept: application/x-ndjson` -> NDJSON,
+ * `"stream": true` in the body -> SSE (or `"stream": "ndjson"`).
+ */
+function streamFormat(req: Request, stream: unknown): StreamFormat | null {
+  const accept = req.headers.get('accept') || '';
+  if (accept.includes('text/event-stream')) return 'sse';
+  if (accept.includes('application/x-ndjson')) return 'ndjson';
+  if (stream === 'ndjson') return 'ndjson';
+  if (stream === true || stream === 'sse') return 'sse';
+  return null;
+}
+
+function encodeEvent(format: StreamFormat, type: string, payload: Record<string, unknown>): string {
+  if (format === 'sse') {
+    return `event: ${type}\ndata: ${JSON.stringify(payload)}\n\n`;
+  }
+  return JSON.stringify({ type, ...payload }) + '\n';
+}
+
+/**
+ * Forward Gemini tokens as they arrive: `token` events with the new text,
+ * then one `done` event carrying the same fields as the JSON response
+ * (or an `error` event if the upstream fails mid-stream). Stops reading
+ * Gemini as soon as the client goes away.
+ */
+function streamReply(prompt: string, format: StreamFormat, scheduled: boolean): Response {
+  const encoder = new TextEncoder();
+  let aborted = false;
+
+  const body = new ReadableStream({
+    async start(controller) {
+      const send = (type: string, payload: Record<string, unknown>) => {
+        if (!aborted) controller.enqueue(encoder.encode(encodeEvent(format, type, payload)));
+      };
+      let reply = '';
+      try {
+        const result = await generateContentStream(prompt, { priority: 'interactive', scheduled });
+        for await (const chunk of result.stream) {
+          if (aborted) break;
+          const text = chunk.text();
+          if (!text) continue;
+          reply += text;
+          send('token', { text });
+        }
+        send('done', {
+          reply,
+          coach: "Coach C",
+          timestamp: new Date().toISOString(),
+          citations: []
+        });
+      } catch (error) {
+        if (!aborted) console.error('Coach stream error:', error);
+        send('error', { error: "Coach chat failed", details: (error as Error).message });
+      } finally {
+        if (!aborted) controller.close();
+      }
+    },
+    cancel() {
+      aborted = true;
+    }
+  });
+
+  return new Response(body, {
+    headers: {
+      'Content-Type': format === 'sse' ? 'text/event-stream; charset=utf-8' : 'application/x-ndjson; charset=utf-8',
+      'Cache-Control': 'no-cache, no-transform',
+      'X-Accel-Buffering': 'no' // keep reverse proxies from buffering the stream
+    }
+  });
+}
 
 export async function POST(req: Request) {
   try {
     // Require authentication for coach interactions
     const user = await requireUser();
     
-    const { message, user_id, profile, recent_logs } = await req.json();
+    const { message, user_id, profile, recent_logs, stream } = await req.json();
     
     if (!message || !message.trim()) {
       return NextResponse.json({ 
@@ -28,8 +129,6 @@ export async function POST(req: Request) {
     
     console.log('Processing coach question with Gemini 2.5 Flash...');
     
-    const model = genAI.getGenerativeModel({ model: "gemini-1.5-flash" });
-    
     // Build context from profile and recent logs
     let contextInfo = "";
     if (profile) {
@@ -38,6 +137,10 @@ export async function POST(req: Request) {
     if (recent_logs && recent_logs.length > 0) {
       contextInfo += `Recent Food Logs: ${JSON.stringify(recent_logs)}\n`;
     }
+    const dailyTotals = await recentDailyTotals(user.id);
+    if (dailyTotals.length > 0) {
+      contextInfo += `Daily Totals (last ${CONTEXT_DAYS} days): ${JSON.stringify(dailyTotals)}\n`;
+    }
     
     const prompt = `You are Coach C, an empathetic, science-first nutrition coach specializing in Indian diets and mixed dietary preferences. You help users with personalized nutrition advice.
 
@@ -56,7 +159,14 @@ Instructions:
 
 Respond as Coach C would - supportive and knowledgeable about nutrition.`;
 
-    const result = await model.generateContent(prompt);
+    // Interactive priority: the coach goes ahead of queued photo and menu scans
+    const scheduled = geminiSchedulerRequested(req);
+    const format = streamFormat(req, stream);
+    if (format) {
+      return streamReply(prompt, format, scheduled);
+    }
+
+    const result = await generateContent(prompt, { priority: 'interactive', scheduled });
     const response = await result.response;
     const reply = response.text();
     
@@ -76,6 +186,12 @@ Respond as Coach C would - supportive and knowledgeable about nutrition.`;
       }, { status: 401 });
     }
     
+    if (error instanceof GeminiBusyError) {
+      return NextResponse.json({ 
+        error: "Coach is busy, retry shortly" 
+      }, { status: 503, headers: { 'Retry-After': String(error.retryAfterS) } });
+    }
+    
     return NextResponse.json({ 
       error: "Coach chat failed",
       details: (error as Error).message 
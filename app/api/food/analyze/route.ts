@@ -1,45 +1,13 @@
 import { NextResponse } from 'next/server';
-import { GoogleGenerativeAI } from '@google/generative-ai';
+import { generateContent, geminiSchedulerRequested, GeminiBusyError } from '@/lib/gemini-scheduler';
+import { preprocessImage, preprocessRequested, preprocessHeaders, type PreprocessedImage } from '@/lib/image-preprocess';
+import { cachedVisionResult, cacheBypassRequested, cacheHeaders } from '@/lib/result-cache';
 import { assertNoMock } from '@/lib/mode';
 
 export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
 
-const genAI = new GoogleGenerativeAI(process.env.GEMINI_API_KEY || '');
-
-export async function POST(req: Request) {
-  try {
-    const contentType = req.headers.get("content-type") || "";
-    if (!contentType.includes("multipart/form-data")) {
-      assertNoMock("meal photo analysis: content type must be multipart/form-data");
-      return NextResponse.json({ 
-        error: "Content-Type must be multipart/form-data" 
-      }, { status: 400 });
-    }
-
-    const form = await req.formData();
-    const file = form.get("image") as File | null;
-    
-    if (!file) {
-      assertNoMock("meal photo analysis: no image uploaded");
-      return NextResponse.json({ error: "No meal image provided" }, { status: 400 });
-    }
-    
-    if (!process.env.GEMINI_API_KEY) {
-      return NextResponse.json({ 
-        error: "Gemini API key not configured" 
-      }, { status: 500 });
-    }
-    
-    // Convert file to base64
-    const bytes = new Uint8Array(await file.arrayBuffer());
-    const base64 = Buffer.from(bytes).toString("base64");
-    
-    console.log('Processing meal photo with Gemini Vision AI...');
-    
-    const model = genAI.getGenerativeModel({ model: "gemini-1.5-flash" });
-    
-    const prompt = `You are an expert nutrition coach. Analyze this meal photo and identify the food items.
+const MEAL_PROMPT = `You are an expert nutrition coach. Analyze this meal photo and identify the food items.
 
 Look carefully at the image and identify specific dishes. If you can see Indian foods like:
 - Pani puri/Golgappa, Bhel puri, Chaat items
@@ -76,52 +44,110 @@ Return JSON format:
 
 If you're unsure about specific items, ask ONE clarifying question. Only identify what you can actually see in the image.`;
 
-    const result = await model.generateContent([
-      prompt,
-      {
-        inlineData: {
-          data: base64,
-          mimeType: file.type || "image/jpeg"
-        }
+async function analyzeMealWithGemini(image: PreprocessedImage, scheduled: boolean) {
+  const base64 = image.data.toString("base64");
+  
+  console.log('Processing meal photo with Gemini Vision AI...');
+  
+  const result = await generateContent([
+    MEAL_PROMPT,
+    {
+      inlineData: {
+        data: base64,
+        mimeType: image.mimeType
       }
-    ]);
+    }
+  ], { priority: 'batch', scheduled });
+  
+  const response = await result.response;
+  const text = response.text();
+  
+  // Parse Gemini response as JSON
+  try {
+    return JSON.parse(text);
+  } catch (parseError) {
+    console.error('Failed to parse Gemini Vision response as JSON:', parseError);
+    console.log('Raw response:', text);
     
-    const response = await result.response;
-    const text = response.text();
+    assertNoMock("meal photo analysis: failed to parse AI response");
     
-    // Parse Gemini response as JSON
-    try {
-      const parsedResponse = JSON.parse(text);
-      return NextResponse.json(parsedResponse);
-    } catch (parseError) {
-      console.error('Failed to parse Gemini Vision response as JSON:', parseError);
-      console.log('Raw response:', text);
-      
-      assertNoMock("meal photo analysis: failed to parse AI response");
-      
-      // Return structured fallback
-      return NextResponse.json({
-        guess: [
-          {
-            food_id: "unknown-meal",
-            name: "Unidentified Food Item",
-            confidence: 0.3,
-            portion_hints: "Unable to determine portion"
-          }
-        ],
-        nutrition: {
-          calories: 250,
-          protein: 8,
-          carbs: 30,
-          fat: 10
-        },
-        processing_time: "< 2s",
-        raw_ai_response: text,
-        note: "Gemini response parsing failed"
-      });
+    // Return structured fallback
+    return {
+      guess: [
+        {
+          food_id: "unknown-meal",
+          name: "Unidentified Food Item",
+          confidence: 0.3,
+          portion_hints: "Unable to determine portion"
+        }
+      ],
+      nutrition: {
+        calories: 250,
+        protein: 8,
+        carbs: 30,
+        fat: 10
+      },
+      processing_time: "< 2s",
+      raw_ai_response: text,
+      note: "Gemini response parsing failed"
+    };
+  }
+}
+
+export async function POST(req: Request) {
+  try {
+    const contentType = req.headers.get("content-type") || "";
+    if (!contentType.includes("multipart/form-data")) {
+      assertNoMock("meal photo analysis: content type must be multipart/form-data");
+      return NextResponse.json({ 
+        error: "Content-Type must be multipart/form-data" 
+      }, { status: 400 });
     }
+
+    const form = await req.formData();
+    const file = form.get("image") as File | null;
+    
+    if (!file) {
+      assertNoMock("meal photo analysis: no image uploaded");
+      return NextResponse.json({ error: "No meal image provided" }, { status: 400 });
+    }
+    
+    if (!process.env.GEMINI_API_KEY) {
+      return NextResponse.json({ 
+        error: "Gemini API key not configured" 
+      }, { status: 500 });
+    }
+    
+    // Orient, downscale and recompress before base64 (see lib/image-preprocess.ts)
+    const image = await preprocessImage(
+      Buffer.from(await file.arrayBuffer()),
+      file.type,
+      "meal",
+      preprocessRequested(req)
+    );
+    
+    // Re-uploads of the same photo are served from lib/result-cache.ts
+    const { result, outcome, hash } = await cachedVisionResult(
+      "meal",
+      image,
+      () => analyzeMealWithGemini(image, geminiSchedulerRequested(req)),
+      {
+        bypass: cacheBypassRequested(req),
+        cacheable: (analysis) => !analysis.raw_ai_response
+      }
+    );
+    
+    return NextResponse.json(result, {
+      headers: { ...preprocessHeaders(image), ...cacheHeaders(outcome, hash) }
+    });
     
   } catch (error) {
+    if (error instanceof GeminiBusyError) {
+      return NextResponse.json({ 
+        error: "Meal photo analysis is busy, retry shortly" 
+      }, { status: 503, headers: { 'Retry-After': String(error.retryAfterS) } });
+    }
+    
     console.error('Photo analysis error:', error);
     
     if (error.message.includes('Mock path blocked')) {
@@ -0,0 +1,66 @@
+import { NextResponse } from 'next/server';
+import { searchFoods } from '@/lib/food-catalog';
+import { repositories } from '@/lib/repos';
+import { benchToggle } from '@/lib/mode';
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+const DEFAULT_LIMIT = 10;
+const MAX_LIMIT = 50;
+
+// "X-Food-Search: mongo" runs the old food_items $regex/$text query instead
+// of the in-memory catalog, for benchmarking the two side by side (a collection
+// scan per request, so only with BENCH_TOGGLES=true)
+function mongoRequested(req: Request): boolean {
+  return benchToggle(req.headers, 'x-food-search') === 'mongo';
+}
+
+export async function GET(req: Request) {
+  const url = new URL(req.url);
+  const query = (url.searchParams.get('q') || '').trim();
+  const limit = Math.min(Math.max(Number(url.searchParams.get('limit')) || DEFAULT_LIMIT, 1), MAX_LIMIT);
+
+  if (!query) {
+    return NextResponse.json({ error: "Query parameter q is required" }, { status: 400 });
+  }
+  if (query.length > 200) {
+    return NextResponse.json({ error: "Query is too long (max 200 characters)" }, { status: 400 });
+  }
+
+  const started = performance.now();
+  try {
+    if (mongoRequested(req)) {
+      const items = await repositories.foodItems.search(query, limit);
+      return NextResponse.json({
+        query,
+        engine: 'mongo',
+        results: items.map(item => ({
+          id: item.id,
+          name: item.canonical_name,
+          category: item.category_enum,
+          kcal: item.kcal_per_unit,
+          protein_g: item.protein_g ?? 0,
+          matched_term: item.canonical_name,
+          score: null
+        })),
+        took_ms: Number((performance.now() - started).toFixed(2))
+      });
+    }
+
+    const matches = await searchFoods(query, limit);
+    return NextResponse.json({
+      query,
+      engine: 'catalog',
+      results: matches.map(({ food, score, matched_term }) => ({
+        ...food,
+        matched_term,
+        score
+      })),
+      took_ms: Number((performance.now() - started).toFixed(2))
+    });
+  } catch (error) {
+    console.error('Food search error:', error);
+    return NextResponse.json({ error: "Food search failed" }, { status: 500 });
+  }
+}
@@ -1,34 +1,34 @@
 import { NextResponse } from 'next/server';
-import { MongoClient } from 'mongodb';
+import { readiness } from '@/lib/health';
+import { metricsAccessAllowed } from '@/lib/metrics';
+import { mongoPoolStats } from '@/lib/repos/mongo/connection';
 
 // Force Node.js runtime 
 export const runtime = 'nodejs';
 export const dynamic = 'force-dynamic';
 
-const MONGO_URL = process.env.MONGO_URL || process.env.MONGODB_URI || 'mongodb://localhost:27017';
-const DB_NAME = process.env.DB_NAME || process.env.MONGODB_DB || 'your_database_name';
-
-export async function GET() {
+// Probes run through the shared pool and are cached briefly (lib/health.ts);
+// /api/health/live and /api/health/ready are the split liveness/readiness checks.
+// Pool counters are included only for callers /api/metrics would let in.
+export async function GET(request) {
   try {
-    // Test database connection
-    const client = new MongoClient(MONGO_URL);
-    await client.connect();
-    const db = client.db(DB_NAME);
-    
-    // Simple ping to verify connection
-    await db.admin().ping();
-    await client.close();
+    const report = await readiness();
+    const mongo = report.dependencies.mongo;
     
     return NextResponse.json({
-      ok: true,
-      db: "ok",
+      ok: report.ready,
+      db: mongo.status === 'ok' ? "ok" : "error",
+      ...(mongo.error && { error: mongo.error }),
+      status: report.status,
+      dependencies: report.dependencies,
+      ...(metricsAccessAllowed(request.headers) && { mongo_pool: mongoPoolStats() }),
       timestamp: new Date().toISOString(),
       environment: {
         node_env: process.env.NODE_ENV,
         db_provider: process.env.DB_PROVIDER,
         runtime: 'nodejs'
       }
-    });
+    }, { status: report.ready ? 200 : 500 });
     
   } catch (error) {
     console.error('Health check failed:', error);
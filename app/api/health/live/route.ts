@@ -0,0 +1,12 @@
+import { NextResponse } from 'next/server';
+import { liveness } from '@/lib/health';
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+// Liveness: answers without touching MongoDB or any upstream
+export async function GET() {
+  return NextResponse.json(liveness(), {
+    headers: { 'Cache-Control': 'no-store' }
+  });
+}
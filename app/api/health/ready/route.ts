@@ -0,0 +1,20 @@
+import { NextResponse } from 'next/server';
+import { readiness } from '@/lib/health';
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+// Readiness: 503 until MongoDB answers. Probes always come from the short-lived
+// cache: callers are unauthenticated and must not drive upstream calls on our keys.
+// For the same reason the body is only status and per-dependency status/latency;
+// pool counters stay behind METRICS_TOKEN on /api/metrics.
+export async function GET() {
+  const report = await readiness();
+  const dependencies = Object.fromEntries(
+    Object.entries(report.dependencies).map(([name, { status, required, latency_ms }]) => [name, { status, required, latency_ms }])
+  );
+  return NextResponse.json({ ...report, dependencies }, {
+    status: report.ready ? 200 : 503,
+    headers: { 'Cache-Control': 'no-store' }
+  });
+}
@@ -1,11 +1,141 @@
 import { NextResponse } from 'next/server';
-import { GoogleGenerativeAI } from '@google/generative-ai';
+import { generateContent, geminiSchedulerRequested } from '@/lib/gemini-scheduler';
+import { preprocessImage, preprocessRequested, preprocessHeaders, type PreprocessedImage } from '@/lib/image-preprocess';
+import { cachedVisionResult, cacheBypassRequested, cacheHeaders } from '@/lib/result-cache';
+import { recognizeWithPool, recognizeOneShot, ocrPoolRequested, OcrPoolBusyError } from '@/lib/ocr-pool';
 import { assertNoMock } from '@/lib/mode';
+import { resolveNutrients, nutrientLookupHeaders, lineCacheRequested, type NutrientLookupStats } from '@/lib/nutrient-resolver';
+import type { CatalogMatch } from '@/lib/food-catalog';
 
 export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
 
-const genAI = new GoogleGenerativeAI(process.env.GEMINI_API_KEY || '');
+const MENU_PROMPT = `You are an expert nutrition coach. Analyze this restaurant menu image and provide food recommendations.
+
+Extract all food items with their prices. For each item, categorize as:
+- "recommended": High protein, balanced nutrition, fits healthy eating
+- "alternate": Moderate choice, acceptable with portion control  
+- "avoid": High calorie, processed, or nutritionally poor
+
+Return JSON format:
+{
+  "ocr_method": "gemini_vision",
+  "text": "extracted menu text",
+  "recommendations": [
+    {
+      "name": "Food Item Name",
+      "price": "₹XX or extracted price", 
+      "category": "recommended|alternate|avoid",
+      "reason": "Brief nutrition reasoning"
+    }
+  ]
+}
+
+Be specific about actual menu items visible. Do NOT invent Indian dishes that aren't on this menu.`;
+
+async function scanMenuWithGemini(image: PreprocessedImage, scheduled: boolean) {
+  const base64 = image.data.toString("base64");
+  
+  console.log('Processing menu image with Gemini Vision OCR...');
+  
+  // Batch priority: a scan that can't get Gemini in time falls back to Tesseract
+  const result = await generateContent([
+    MENU_PROMPT,
+    {
+      inlineData: {
+        data: base64,
+        mimeType: image.mimeType
+      }
+    }
+  ], { priority: 'batch', scheduled });
+  
+  const response = await result.response;
+  const text = response.text();
+  
+  // Parse Gemini response as JSON
+  try {
+    const parsedResponse = JSON.parse(text);
+    return {
+      ...parsedResponse,
+      processing_time: "< 2s",
+      confidence: 0.9
+    };
+  } catch (parseError) {
+    console.error('Failed to parse Gemini response as JSON:', parseError);
+    console.log('Raw Gemini response:', text);
+    
+    assertNoMock("menu scan: failed to parse AI response");
+    
+    // Return structured response even if JSON parsing fails
+    return {
+      ocr_method: "gemini_vision",
+      text: text,
+      recommendations: [
+        {
+          name: "Unable to parse menu items",
+          price: "N/A",
+          category: "alternate", 
+          reason: "Gemini response parsing failed"
+        }
+      ],
+      processing_time: "< 2s",
+      confidence: 0.5,
+      raw_ai_response: text
+    };
+  }
+}
+
+// Gemini unavailable (typically rate limited): plain OCR text, no recommendations
+async function scanMenuWithTesseract(image: PreprocessedImage, usePool: boolean) {
+  console.log('Falling back to Tesseract.js...');
+  const { text, confidence } = usePool
+    ? await recognizeWithPool(image.data)
+    : await recognizeOneShot(image.data);
+  
+  return {
+    ocr_method: "tesseract_fallback",
+    text,
+    recommendations: [],
+    confidence: confidence / 100,
+    degraded: true
+  };
+}
+
+function nutritionOf(match: CatalogMatch | null) {
+  if (!match) return null;
+  const { food, score, matched_term } = match;
+  return {
+    food_id: food.id,
+    name: food.name,
+    kcal: food.kcal,
+    protein_g: food.protein_g,
+    carb_g: food.carb_g,
+    fat_g: food.fat_g,
+    fiber_g: food.fiber_g,
+    sodium_mg: food.sodium_mg,
+    match_score: score,
+    matched_term
+  };
+}
+
+// Nutrition for every item of a scan in one batched lookup (lib/nutrient-resolver.ts):
+// Gemini recommendations by name, or, for plain OCR text, the lines that name a known food
+async function withNutrition(scan: any, cache: boolean): Promise<{ scan: any; stats: NutrientLookupStats }> {
+  if (Array.isArray(scan.recommendations) && scan.recommendations.length > 0) {
+    const { results, stats } = await resolveNutrients(scan.recommendations.map((item: any) => String(item.name ?? '')), { cache });
+    return {
+      scan: {
+        ...scan,
+        recommendations: scan.recommendations.map((item: any, i: number) => ({ ...item, nutrition: nutritionOf(results[i]) }))
+      },
+      stats
+    };
+  }
+  
+  const lines = String(scan.text ?? '').split('\n').filter(line => line.trim().length > 2);
+  const { results, stats } = await resolveNutrients(lines, { cache });
+  return { scan: { ...scan, items: results.map(nutritionOf).filter(Boolean) }, stats };
+}
 
 export async function POST(req: Request) {
   try {
@@ -31,83 +161,49 @@ export async function POST(req: Request) {
       }, { status: 500 });
     }
     
-    // Convert file to base64
-    const bytes = new Uint8Array(await file.arrayBuffer());
-    const base64 = Buffer.from(bytes).toString("base64");
-    
-    console.log('Processing menu image with Gemini Vision OCR...');
+    // Orient, downscale and recompress before base64 (see lib/image-preprocess.ts)
+    const image = await preprocessImage(
+      Buffer.from(await file.arrayBuffer()),
+      file.type,
+      "menu",
+      preprocessRequested(req)
+    );
     
-    const model = genAI.getGenerativeModel({ model: "gemini-1.5-flash" });
-    
-    const prompt = `You are an expert nutrition coach. Analyze this restaurant menu image and provide food recommendations.
-
-Extract all food items with their prices. For each item, categorize as:
-- "recommended": High protein, balanced nutrition, fits healthy eating
-- "alternate": Moderate choice, acceptable with portion control  
-- "avoid": High calorie, processed, or nutritionally poor
-
-Return JSON format:
-{
-  "ocr_method": "gemini_vision",
-  "text": "extracted menu text",
-  "recommendations": [
-    {
-      "name": "Food Item Name",
-      "price": "₹XX or extracted price", 
-      "category": "recommended|alternate|avoid",
-      "reason": "Brief nutrition reasoning"
-    }
-  ]
-}
-
-Be specific about actual menu items visible. Do NOT invent Indian dishes that aren't on this menu.`;
-
-    const result = await model.generateContent([
-      prompt,
-      {
-        inlineData: {
-          data: base64,
-          mimeType: file.type || "image/jpeg"
+    // Repeat scans of the same menu are served from lib/result-cache.ts
+    let lookup: NutrientLookupStats | null = null;
+    const { result, outcome, hash } = await cachedVisionResult(
+      "menu",
+      image,
+      async () => {
+        let scan;
+        try {
+          scan = await scanMenuWithGemini(image, geminiSchedulerRequested(req));
+        } catch (error) {
+          if ((error as Error).message.includes('Mock path blocked')) throw error;
+          console.error('Gemini Vision OCR Error:', error);
+          scan = await scanMenuWithTesseract(image, ocrPoolRequested(req));
         }
+        const enriched = await withNutrition(scan, lineCacheRequested(req));
+        lookup = enriched.stats;
+        return enriched.scan;
+      },
+      {
+        bypass: cacheBypassRequested(req),
+        cacheable: (scan) => !scan.raw_ai_response && !scan.degraded
       }
-    ]);
+    );
     
-    const response = await result.response;
-    const text = response.text();
+    return NextResponse.json(result, {
+      headers: { ...preprocessHeaders(image), ...cacheHeaders(outcome, hash), ...nutrientLookupHeaders(lookup) }
+    });
     
-    // Parse Gemini response as JSON
-    try {
-      const parsedResponse = JSON.parse(text);
-      return NextResponse.json({
-        ...parsedResponse,
-        processing_time: "< 2s",
-        confidence: 0.9
-      });
-    } catch (parseError) {
-      console.error('Failed to parse Gemini response as JSON:', parseError);
-      console.log('Raw Gemini response:', text);
-      
-      assertNoMock("menu scan: failed to parse AI response");
-      
-      // Return structured response even if JSON parsing fails
-      return NextResponse.json({
-        ocr_method: "gemini_vision",
-        text: text,
-        recommendations: [
-          {
-            name: "Unable to parse menu items",
-            price: "N/A",
-            category: "alternate", 
-            reason: "Gemini response parsing failed"
-          }
-        ],
-        processing_time: "< 2s",
-        confidence: 0.5,
-        raw_ai_response: text
-      });
+  } catch (error) {
+    if (error instanceof OcrPoolBusyError) {
+      return NextResponse.json({ 
+        error: "Menu scanning is busy, retry shortly" 
+      }, { status: 503, headers: { 'Retry-After': String(error.retryAfterS) } });
     }
     
-  } catch (error) {
     console.error('Menu scan error:', error);
     
     if (error.message.includes('Mock path blocked')) {
@@ -0,0 +1,25 @@
+import { NextResponse } from 'next/server';
+import { collectMetrics, metricsAccessAllowed } from '@/lib/metrics';
+import '@/lib/image-preprocess';
+import '@/lib/result-cache';
+import '@/lib/idempotency';
+import '@/lib/food-catalog';
+import '@/lib/nutrient-resolver';
+import '@/lib/read-cache';
+import '@/lib/auth-session';
+import '@/lib/tts-cache';
+import '@/lib/health';
+import '@/lib/gemini-scheduler';
+
+export const runtime = "nodejs";
+export const dynamic = "force-dynamic";
+
+export async function GET(req: Request) {
+  if (!metricsAccessAllowed(req.headers)) {
+    // Same answer as a route that does not exist: nothing to probe for
+    return NextResponse.json({ error: "Not found" }, { status: 404 });
+  }
+  return NextResponse.json(collectMetrics(), {
+    headers: { 'Cache-Control': 'no-store' }
+  });
+}
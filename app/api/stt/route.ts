@@ -1,4 +1,5 @@
 import { NextResponse } from 'next/server';
+import { deepgramUrl } from '@/lib/upstreams';
 
 export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
@@ -15,7 +16,7 @@ export async function POST(req: Request) {
       return NextResponse.json({ error: "No audio data provided" }, { status: 400 });
     }
     
-    const response = await fetch('https://api.deepgram.com/v1/listen', {
+    const response = await fetch(deepgramUrl('/v1/listen'), {
       method: 'POST',
       headers: {
         'Authorization': `Token ${process.env.DEEPGRAM_API_KEY}`,
@@ -1,8 +1,19 @@
-import { NextResponse } from 'next/server';
+import { deepgramUrl } from '@/lib/upstreams';
+import { cacheBypassRequested } from '@/lib/result-cache';
+import { cachedAudio, countBypass, streamIntoCache, ttsCacheKey, type TtsCacheOutcome } from '@/lib/tts-cache';
 
 export const runtime = "nodejs";
 export const dynamic = "force-dynamic";
 
+function audioHeaders(outcome: TtsCacheOutcome, extra: Record<string, string> = {}) {
+  return {
+    "Content-Type": "audio/mpeg",
+    "Cache-Control": "no-store",
+    "X-TTS-Cache": outcome,
+    ...extra
+  };
+}
+
 export async function POST(req: Request) {
   try {
     const { text, model = "aura-asteria-en" } = await req.json();
@@ -14,6 +25,14 @@ export async function POST(req: Request) {
       });
     }
     
+    // The phrase cache key normalizes the text, so it has to be a string
+    if (typeof text !== "string") {
+      return new Response(JSON.stringify({ error: "text must be a string" }), {
+        status: 400,
+        headers: { "Content-Type": "application/json" }
+      });
+    }
+    
     if (!process.env.DEEPGRAM_API_KEY) {
       return new Response(JSON.stringify({ error: "Deepgram API key not configured" }), { 
         status: 500,
@@ -21,7 +40,21 @@ export async function POST(req: Request) {
       });
     }
     
-    const response = await fetch(`https://api.deepgram.com/v1/speak?model=${encodeURIComponent(model)}`, {
+    // Stock phrases are served from the phrase cache; `Cache-Control: no-cache` forces synthesis (with BENCH_TOGGLES=true)
+    const key = ttsCacheKey(model, text);
+    const bypass = cacheBypassRequested(req);
+    if (bypass) {
+      countBypass();
+    } else {
+      const audio = cachedAudio(key);
+      if (audio) {
+        return new Response(audio, {
+          headers: audioHeaders('hit', { "Content-Length": String(audio.byteLength) })
+        });
+      }
+    }
+    
+    const response = await fetch(deepgramUrl(`/v1/speak?model=${encodeURIComponent(model)}`), {
       method: "POST",
       headers: { 
         "Content-Type": "application/json",
@@ -30,17 +63,17 @@ export async function POST(req: Request) {
       body: JSON.stringify({ text })
     });
     
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       const errorText = await response.text();
       return new Response(JSON.stringify({ error: `Deepgram API error: ${errorText}` }), { 
-        status: response.status,
+        status: response.ok ? 502 : response.status,
         headers: { "Content-Type": "application/json" }
       });
     }
     
-    const audio = await response.arrayBuffer();
-    return new Response(audio, { 
-      headers: { "Content-Type": "audio/mpeg" }
+    // Pipe the audio through as Deepgram produces it so playback can start on the first bytes
+    return new Response(streamIntoCache(key, response.body), {
+      headers: audioHeaders(bypass ? 'bypass' : 'miss')
     });
     
   } catch (error) {
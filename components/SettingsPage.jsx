@@ -52,41 +52,28 @@ export function SettingsPage({ profile, onUpdateProfile, onBack, mode, onModeCha
 
   const handleExportData = async () => {
     try {
-      // Collect user data (no secrets/PII beyond what user entered)
-      const exportData = {
-        profile: {
-          name: profile?.name,
-          height_cm: profile?.height_cm,
-          weight_kg: profile?.weight_kg,
-          dietary_preferences: dietaryFlags,
-          locale: language
-        },
-        targets: await fetch('/api/me/targets').then(async r => {
-          if (!r.ok) return {};
-          const text = await r.text();
-          try { return JSON.parse(text); } catch { return {}; }
-        }).catch(() => ({})),
-        food_logs: await fetch('/api/logs').then(async r => {
-          if (!r.ok) return [];
-          const text = await r.text();
-          try { return JSON.parse(text); } catch { return []; }
-        }).catch(() => []),
-        exported_at: new Date().toISOString()
-      };
-
-      const dataStr = JSON.stringify(exportData, null, 2);
-      const dataUri = 'data:application/json;charset=utf-8,'+ encodeURIComponent(dataStr);
+      // Full history from the streaming export endpoint (profile, targets, every log)
+      const response = await fetch('/api/export?format=json');
+      if (!response.ok) {
+        const text = await response.text();
+        let message = `Export failed (${response.status})`;
+        try { message = JSON.parse(text).error?.message || message; } catch {}
+        throw new Error(message);
+      }
+      const blob = await response.blob();
+      const blobUrl = URL.createObjectURL(blob);
       
       const exportFileDefaultName = `fitbear-data-${new Date().toISOString().split('T')[0]}.json`;
       
       const linkElement = document.createElement('a');
-      linkElement.setAttribute('href', dataUri);
+      linkElement.setAttribute('href', blobUrl);
       linkElement.setAttribute('download', exportFileDefaultName);
       linkElement.click();
+      setTimeout(() => URL.revokeObjectURL(blobUrl), 0);
 
       track('data_exported', { 
         export_date: new Date().toISOString(),
-        data_size: dataStr.length
+        data_size: blob.size
       });
 
       toast({
@@ -3,24 +3,36 @@
 Critical Fixes Testing - Focus on Menu Scanner and Meal Photo Analyzer
 """
 
-import requests
-import json
-import io
-from PIL import Image
+import os
+import sys
 import time
 
+from tests.http_client import get_client, print_timing_summary
+from tests.image_corpus import create_test_image
+from tests.runner import run_tests
+
 BASE_URL = "http://localhost:3000/api"
 
-def create_test_image():
-    """Create a simple test image"""
-    try:
-        img = Image.new('RGB', (400, 300), color='white')
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        return img_byte_arr.getvalue()
-    except Exception as e:
-        print(f"Error creating test image: {e}")
-        return None
+# Session Cookie for the signed-in steps of the E2E flow (see backend_test.py)
+TEST_COOKIE = os.environ.get("FITBEAR_TEST_COOKIE")
+
+# Shared keep-alive pool (see tests/http_client.py)
+client = get_client()
+
+# Absolute p95 budgets (seconds) for benchmark mode. The old Tesseract path
+# routinely blew through the 60s client timeout; Gemini Vision should not.
+LATENCY_BUDGETS = {
+    "menu_scan": 15.0,
+    "food_analyze": 15.0,
+}
+
+def scan_menu(image, timeout=90, filename='menu.png', content_type='image/png', headers=None):
+    files = {'image': (filename, image, content_type)}
+    return client.post(f"{BASE_URL}/menu/scan", files=files, timeout=timeout, headers=headers)
+
+def analyze_meal(image, timeout=90, headers=None):
+    files = {'image': ('meal.jpg', image, 'image/jpeg')}
+    return client.post(f"{BASE_URL}/food/analyze", files=files, timeout=timeout, headers=headers)
 
 def test_menu_scanner_critical():
     """CRITICAL TEST: Menu Scanner with Gemini Vision OCR"""
@@ -33,12 +45,10 @@ def test_menu_scanner_critical():
         if not test_image:
             return False
         
-        files = {'image': ('menu.png', test_image, 'image/png')}
-        
         print("Testing Menu Scanner with Gemini Vision...")
         start_time = time.time()
         
-        response = requests.post(f"{BASE_URL}/menu/scan", files=files, timeout=90)
+        response = scan_menu(test_image)
         
         end_time = time.time()
         processing_time = end_time - start_time
@@ -83,12 +93,10 @@ def test_meal_photo_analyzer_critical():
         if not test_image:
             return False
         
-        files = {'image': ('meal.jpg', test_image, 'image/jpeg')}
-        
         print("Testing Meal Photo Analyzer...")
         start_time = time.time()
         
-        response = requests.post(f"{BASE_URL}/food/analyze", files=files, timeout=90)
+        response = analyze_meal(test_image)
         
         end_time = time.time()
         processing_time = end_time - start_time
@@ -134,7 +142,7 @@ def test_e2e_flow():
         print("Step 1: Menu Scan...")
         test_image = create_test_image()
         files = {'image': ('menu.png', test_image, 'image/png')}
-        response = requests.post(f"{BASE_URL}/menu/scan", files=files, timeout=60)
+        response = client.post(f"{BASE_URL}/menu/scan", files=files, timeout=60)
         
         if response.status_code != 200:
             print("❌ Menu scan failed")
@@ -147,7 +155,7 @@ def test_e2e_flow():
         # Step 2: Meal Photo Analysis
         print("Step 2: Meal Photo Analysis...")
         files = {'image': ('meal.jpg', test_image, 'image/jpeg')}
-        response = requests.post(f"{BASE_URL}/food/analyze", files=files, timeout=60)
+        response = client.post(f"{BASE_URL}/food/analyze", files=files, timeout=60)
         
         if response.status_code != 200:
             print("❌ Meal analysis failed")
@@ -157,39 +165,58 @@ def test_e2e_flow():
         guesses = meal_data.get('guess', [])
         print(f"✅ Meal analysis: Found {len(guesses)} food guesses")
         
-        # Step 3: Food Logging
+        # Step 3: Food Logging - everything picked from the menu and the
+        # meal in one batch request rather than one POST per item
         print("Step 3: Food Logging...")
-        log_data = {
-            "food_id": "dal tadka",
-            "portion_qty": 1,
-            "portion_unit": "katori",
-            "idempotency_key": f"e2e_test_{int(time.time())}"
-        }
-        
-        response = requests.post(
-            f"{BASE_URL}/logs",
-            json=log_data,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
+        if not TEST_COOKIE:
+            print("⚠️  Set FITBEAR_TEST_COOKIE to run the logging and history steps")
+            print("\n🎉 E2E FLOW SUCCESSFUL (scan and analyze only)")
+            return True
         
-        if response.status_code != 200:
-            print("❌ Food logging failed")
+        auth = {'Cookie': TEST_COOKIE}
+        stamp = int(time.time())
+        picked = [item.get('name') for item in items[:3]] + [guess.get('name') for guess in guesses[:2]]
+        entries = [
+            {
+                "food_id": name or "dal tadka",
+                "portion_qty": 1,
+                "portion_unit": "serving",
+                "idempotency_key": f"e2e_test_{stamp}_{i}"
+            }
+            for i, name in enumerate(picked or [None])
+        ]
+        
+        response = client.post(f"{BASE_URL}/logs/batch", json={"entries": entries}, headers=auth, timeout=30)
+        
+        # 207 means some entries were rejected; each result carries its own status
+        if response.status_code not in (200, 207):
+            print(f"❌ Food logging failed: {response.status_code} {response.text[:200]}")
             return False
         
-        log_result = response.json()
-        print(f"✅ Food logged: {log_result.get('calories')} calories")
+        batch = response.json()
+        created = [r for r in batch['results'] if r['status'] == 'created']
+        rejected = [r for r in batch['results'] if r['status'] not in ('created', 'replayed', 'duplicate')]
+        if not created:
+            print(f"❌ Food logging wrote nothing: {[r['status'] for r in batch['results']]}")
+            return False
+        calories = sum(r.get('calories', 0) for r in created)
+        print(f"✅ Food logged: {len(created)} entries, {calories} calories in one request")
+        for result in rejected:
+            print(f"⚠️  Entry {result['index']} {result['status']}: {result.get('error')}")
         
         # Step 4: View History
         print("Step 4: View History...")
-        response = requests.get(f"{BASE_URL}/logs", timeout=30)
+        response = client.get(f"{BASE_URL}/logs", headers=auth, timeout=30)
         
         if response.status_code != 200:
             print("❌ History retrieval failed")
             return False
         
         history = response.json()
-        print(f"✅ History retrieved: {len(history)} entries")
+        print(f"✅ History retrieved: {len(history['items'])} entries on the first page")
+        
+        for result in created:
+            client.delete(f"{BASE_URL}/logs/{result['log_id']}", headers=auth, timeout=30)
         
         print("\n🎉 COMPLETE E2E FLOW SUCCESSFUL!")
         return True
@@ -198,7 +225,7 @@ def test_e2e_flow():
         print(f"❌ E2E Flow failed: {e}")
         return False
 
-def main():
+def main(serial=False):
     """Run critical tests"""
     print("🔥 CRITICAL FIXES TESTING")
     print("="*60)
@@ -206,12 +233,14 @@ def main():
     print("1. Menu Scanner with Gemini Vision OCR (no more Tesseract timeout)")
     print("2. Meal Photo Analyzer end-to-end functionality")
     
-    results = {}
-    
-    # Test critical fixes
-    results["Menu Scanner (Gemini Vision)"] = test_menu_scanner_critical()
-    results["Meal Photo Analyzer"] = test_meal_photo_analyzer_critical()
-    results["E2E Flow"] = test_e2e_flow()
+    # Test critical fixes. The E2E flow keeps its scan -> analyze -> log ->
+    # history steps in order internally, but is independent of the other two.
+    tests = [
+        ("Menu Scanner (Gemini Vision)", test_menu_scanner_critical),
+        ("Meal Photo Analyzer", test_meal_photo_analyzer_critical),
+        ("E2E Flow", test_e2e_flow),
+    ]
+    results, durations = run_tests(tests, serial=serial)
     
     # Summary
     print("\n" + "="*60)
@@ -220,11 +249,13 @@ def main():
     
     for test_name, result in results.items():
         status = "✅ RESOLVED" if result else "❌ STILL FAILING"
-        print(f"{status}: {test_name}")
+        print(f"{status}: {test_name} ({durations[test_name]:.2f}s)")
     
     passed = sum(1 for result in results.values() if result)
     total = len(results)
     
+    print_timing_summary(client)
+    
     if passed == total:
         print(f"\n🎉 ALL CRITICAL FIXES WORKING! ({passed}/{total})")
         print("✅ Menu Scanner: No more timeout issues with Gemini Vision OCR")
@@ -235,5 +266,427 @@ def main():
         print(f"\n⚠️ {total - passed} critical issues remain")
         return False
 
+def corpus_probes():
+    """One probe per upload size so latency can be read against image bytes"""
+    from tests.image_corpus import CorpusSpec, get_image
+
+    probes = {}
+    for width, height, quality in [(800, 1067, 70), (1600, 2133, 85), (3024, 4032, 95)]:
+        menu, _ = get_image(CorpusSpec(kind="menu", width=width, height=height, quality=quality, script="mixed"))
+        meal, _ = get_image(CorpusSpec(kind="meal", width=width, height=height, quality=quality))
+        label = f"{len(menu) / 1e6:.1f}MB"
+        print(f"🖼  {width}x{height} q{quality}: menu {len(menu) / 1e6:.2f} MB, meal {len(meal) / 1e6:.2f} MB")
+        probes[f"menu_scan@{label}"] = lambda data=menu: scan_menu(data, filename='menu.jpg', content_type='image/jpeg')
+        probes[f"food_analyze@{len(meal) / 1e6:.1f}MB"] = lambda data=meal: analyze_meal(data)
+    return probes
+
+def dish_recall(response_text, dishes):
+    """Fraction of the dishes rendered on a corpus menu that the response mentions"""
+    text = response_text.lower()
+    return sum(1 for dish in dishes if dish.lower() in text) / len(dishes) if dishes else 0.0
+
+def run_preprocess_comparison(args):
+    """
+    Send the same corpus uploads with the server-side image preprocessing
+    stage on and off (X-Image-Preprocess: off) and compare latency, bytes
+    forwarded to Gemini and accuracy: dish recall for menus, share of
+    responses with at least one guess for meals.
+    """
+    from tests.bench import distribution
+    from tests.image_corpus import CorpusSpec, get_image
+
+    print("🖼  IMAGE PREPROCESSING: WITH vs WITHOUT")
+    print("="*60)
+    print(f"Testing API at: {BASE_URL}")
+
+    specs = [
+        CorpusSpec(kind=kind, width=width, height=height, quality=quality, script="mixed", orientation=orientation)
+        for kind in ("menu", "meal")
+        for width, height, quality, orientation in [(1600, 2133, 85, 1), (3024, 4032, 95, 1), (3024, 4032, 90, 6)]
+    ]
+    metrics_before = _preprocess_metrics()
+
+    rows = []
+    ok = True
+    for spec in specs:
+        data, meta = get_image(spec)
+        for mode in ("on", "off"):
+            headers = None if mode == "on" else {"X-Image-Preprocess": "off"}
+            latencies, errors, scores, bytes_out = [], 0, [], []
+            for _ in range(args.reps):
+                start = time.perf_counter()
+                try:
+                    if spec.kind == "menu":
+                        response = scan_menu(data, filename='menu.jpg', content_type='image/jpeg', headers=headers)
+                    else:
+                        response = analyze_meal(data, headers=headers)
+                except Exception as e:
+                    print(f"  {spec!r} [{mode}]: request failed - {e}")
+                    errors += 1
+                    continue
+                elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append(elapsed)
+                bytes_out.append(int(response.headers.get("X-Image-Bytes-Out", len(data))))
+                if spec.kind == "menu":
+                    scores.append(dish_recall(response.text, meta["dishes"]))
+                else:
+                    scores.append(1.0 if response.json().get("guess") else 0.0)
+
+            stats = distribution(latencies, errors)
+            ok = ok and errors == 0
+            rows.append({
+                "image": f"{spec.kind} {spec.width}x{spec.height} q{spec.quality} o{spec.orientation}",
+                "mode": mode,
+                "upload_mb": len(data) / 1e6,
+                "sent_mb": (sum(bytes_out) / len(bytes_out) / 1e6) if bytes_out else None,
+                "p50_ms": stats["p50_ms"],
+                "p95_ms": stats["p95_ms"],
+                "accuracy": (sum(scores) / len(scores)) if scores else None,
+                "errors": errors,
+            })
+
+    header = f"{'image':<28}{'mode':>5}{'upload':>8}{'sent':>8}{'p50':>8}{'p95':>8}{'acc':>6}{'err':>5}"
+    print("\n" + header)
+    print("-" * len(header))
+    for row in rows:
+        sent = "-" if row["sent_mb"] is None else f"{row['sent_mb']:.2f}"
+        acc = "-" if row["accuracy"] is None else f"{row['accuracy']:.2f}"
+        p50 = "-" if row["p50_ms"] is None else f"{row['p50_ms']:.0f}"
+        p95 = "-" if row["p95_ms"] is None else f"{row['p95_ms']:.0f}"
+        print(f"{row['image']:<28}{row['mode']:>5}{row['upload_mb']:>8.2f}{sent:>8}{p50:>8}{p95:>8}{acc:>6}{row['errors']:>5}")
+    print("(sizes in MB, latencies in ms; accuracy = dish recall for menus, guess rate for meals)")
+
+    metrics_after = _preprocess_metrics()
+    if metrics_before is not None and metrics_after is not None:
+        saved = metrics_after.get("bytes_saved", 0) - metrics_before.get("bytes_saved", 0)
+        print(f"\n💾 Server reports {saved / 1e6:.1f} MB saved during this run "
+              f"(lifetime ratio {metrics_after.get('saved_ratio', 0):.0%}, skipped: {metrics_after.get('skipped')})")
+    return ok
+
+def _preprocess_metrics():
+    try:
+        response = client.get(f"{BASE_URL}/metrics", timeout=10)
+        return response.json().get("image_preprocess") if response.status_code == 200 else None
+    except Exception:
+        return None
+
+def run_ocr_fallback_benchmark(args):
+    """
+    Force the Tesseract fallback by making the fake upstream (tests/fake_upstream.py)
+    answer every Gemini call with 429, then load /menu/scan with the warm worker
+    pool and with a fresh worker per request (X-OCR-Pool: off).
+    """
+    from tests.image_corpus import CorpusSpec, get_image
+    from tests.loadgen import Scenario, print_report, run_load
+
+    print("🔤 OCR FALLBACK THROUGHPUT: POOLED vs ONE-SHOT WORKERS")
+    print("="*60)
+    print(f"Testing API at: {BASE_URL} (fake upstream {args.fake_upstream})")
+
+    try:
+        previous = client.get(f"{args.fake_upstream}/__stats", timeout=5).json()["config"]
+        client.post(f"{args.fake_upstream}/__config", json={"rate_limit_rate": 1.0}, timeout=5)
+    except Exception as e:
+        print(f"❌ Fake upstream not reachable at {args.fake_upstream} - {e}")
+        print("   Start it with `python -m tests.fake_upstream` and point GEMINI_BASE_URL at it")
+        return False
+
+    menu_image, _ = get_image(CorpusSpec(kind="menu", width=1200, height=1600, quality=85))
+    ok = True
+    try:
+        probe = scan_menu(menu_image, filename='menu.jpg', content_type='image/jpeg',
+                          headers={'Cache-Control': 'no-cache'}, timeout=180)
+        method = probe.json().get("ocr_method") if probe.status_code == 200 else None
+        print(f"Probe: {probe.status_code}, ocr_method={method}")
+        if method != "tesseract_fallback":
+            print("❌ Fallback not triggered - is the backend using the fake upstream?")
+            return False
+
+        for label, extra in [("pooled", {}), ("one_shot", {"X-OCR-Pool": "off"})]:
+            headers = {'Cache-Control': 'no-cache', **extra}
+
+            def scan(headers=headers):
+                return scan_menu(menu_image, filename='menu.jpg', content_type='image/jpeg',
+                                 headers=headers, timeout=180)
+
+            report = run_load([Scenario("ocr_fallback", f"ocr[{label}]", scan)],
+                              duration=args.duration, concurrency=args.concurrency)
+            print_report(report)
+            row = report["endpoints"][0]
+            completed = row["requests"] - row["errors"]
+            print(f"{label}: {completed / report['duration_s']:.2f} scans/s completed, statuses {row['statuses']}")
+            ok = ok and completed > 0
+    finally:
+        client.post(f"{args.fake_upstream}/__config",
+                    json={"rate_limit_rate": previous.get("rate_limit_rate", 0.0)}, timeout=5)
+
+    metrics = client.get(f"{BASE_URL}/metrics", timeout=10)
+    if metrics.status_code == 200 and "ocr_pool" in metrics.json():
+        print(f"\nServer OCR pool: {metrics.json()['ocr_pool']}")
+    return ok
+
+def _scheduler_metrics():
+    try:
+        response = client.get(f"{BASE_URL}/metrics", timeout=10)
+        return response.json().get("gemini_scheduler") if response.status_code == 200 else None
+    except Exception:
+        return None
+
+COACH_QUESTIONS = [
+    "What should I eat for breakfast to increase my protein intake? I'm vegetarian.",
+    "Is dal chawal a good dinner for weight loss?",
+    "How many rotis should I have at lunch?",
+    "What is a healthy evening snack instead of samosa?",
+]
+
+def run_gemini_quota_benchmark(args):
+    """
+    Cap Gemini at --quota-rps calls per second on the fake upstream (429 beyond
+    that), then load menu scans (batch priority) and coach questions
+    (interactive) with the Gemini scheduler on and off (X-Gemini-Scheduler: off).
+    Scheduled, fewer calls should be refused, fewer scans should fall back to
+    Tesseract, and the coach should not queue behind the scans.
+    """
+    import itertools
+    import threading
+    from tests.image_corpus import CorpusSpec, get_image
+    from tests.loadgen import Scenario, print_report, run_load
+
+    print("🚦 GEMINI SCHEDULER UNDER A RATE LIMIT: SCHEDULED vs DIRECT")
+    print("="*60)
+    print(f"Testing API at: {BASE_URL} (fake upstream {args.fake_upstream}, quota {args.quota_rps}/s)")
+
+    try:
+        previous = client.get(f"{args.fake_upstream}/__stats", timeout=5).json()["config"]
+        client.post(f"{args.fake_upstream}/__config",
+                    json={"gemini_quota_rps": args.quota_rps, "rate_limit_rate": 0.0}, timeout=5)
+    except Exception as e:
+        print(f"❌ Fake upstream not reachable at {args.fake_upstream} - {e}")
+        print("   Start it with `python -m tests.fake_upstream` and point GEMINI_BASE_URL at it")
+        return False
+
+    # Four distinct menus, the last one sent three times as often, so some
+    # identical requests overlap and can share one upstream call
+    menus = [get_image(CorpusSpec(kind="menu", width=1200, height=1600, quality=85, seed=seed))[0]
+             for seed in range(4)]
+    if not TEST_COOKIE:
+        print("⚠️  Set FITBEAR_TEST_COOKIE to load /coach/ask too; measuring menu scans only")
+
+    summary = {}
+    try:
+        for label, extra in [("scheduled", {}), ("direct", {"X-Gemini-Scheduler": "off"})]:
+            time.sleep(1.5)  # start each variant with a fresh quota window
+            client.post(f"{args.fake_upstream}/__reset", timeout=5)
+            before = _scheduler_metrics() or {}
+            methods, methods_lock = {}, threading.Lock()
+            picks = itertools.count()
+
+            def scan(extra=extra):
+                image = menus[min(next(picks) % 6, 3)]
+                response = scan_menu(image, filename='menu.jpg', content_type='image/jpeg',
+                                     headers={'Cache-Control': 'no-cache', **extra}, timeout=180)
+                method = response.json().get("ocr_method") if response.status_code == 200 else None
+                with methods_lock:
+                    methods[method] = methods.get(method, 0) + 1
+                return response
+
+            def ask(extra=extra):
+                question = COACH_QUESTIONS[next(picks) % len(COACH_QUESTIONS)]
+                return client.post(f"{BASE_URL}/coach/ask", json={"message": question},
+                                   headers={'Cookie': TEST_COOKIE, **extra}, timeout=90)
+
+            scenarios = [Scenario("menu_scan", "menu_scan", scan, weight=3)]
+            if TEST_COOKIE:
+                scenarios.append(Scenario("coach_ask", "coach_ask", ask, weight=1))
+            report = run_load(scenarios, duration=args.duration, concurrency=args.concurrency)
+            print(f"\n--- {label} ---")
+            print_report(report)
+
+            counts = client.get(f"{args.fake_upstream}/__stats", timeout=5).json()["counts"]
+            after = _scheduler_metrics() or {}
+            calls = counts.get("gemini:generateContent", 0)
+            refused = counts.get("gemini:429", 0)
+            scans = sum(methods.values())
+            fallbacks = methods.get("tesseract_fallback", 0)
+            rows = {row["scenario"]: row for row in report["endpoints"]}
+            summary[label] = {
+                "upstream_calls": calls,
+                "upstream_429": refused,
+                "refused_ratio": refused / calls if calls else 0.0,
+                "scans": scans,
+                "fallback_ratio": fallbacks / scans if scans else 0.0,
+                "coach_p95_ms": rows.get("coach_ask", {}).get("p95_ms"),
+            }
+            print(f"Upstream: {calls} generateContent calls, {refused} answered 429 "
+                  f"({summary[label]['refused_ratio']:.0%})")
+            print(f"Menu scans: {scans} completed, {fallbacks} fell back to Tesseract "
+                  f"({summary[label]['fallback_ratio']:.0%}), ocr_method {methods}")
+            if label == "scheduled" and after:
+                delta = {key: after.get(key, 0) - before.get(key, 0)
+                         for key in ("retries", "coalesced", "rate_limited", "rejected_queue_full", "rejected_wait")}
+                print(f"Scheduler: {delta}, wait by priority {after.get('wait')}")
+    finally:
+        client.post(f"{args.fake_upstream}/__config", json={
+            "gemini_quota_rps": previous.get("gemini_quota_rps", 0.0),
+            "rate_limit_rate": previous.get("rate_limit_rate", 0.0),
+        }, timeout=5)
+
+    scheduled, direct = summary["scheduled"], summary["direct"]
+    print("\n" + "="*60)
+    for label, row in summary.items():
+        coach = f", coach p95 {row['coach_p95_ms']}ms" if row["coach_p95_ms"] is not None else ""
+        print(f"{label:<10} 429s {row['refused_ratio']:.0%} of calls, "
+              f"scan fallbacks {row['fallback_ratio']:.0%}{coach}")
+    ok = scheduled["scans"] > 0 and scheduled["refused_ratio"] <= direct["refused_ratio"]
+    print("✅ PASS: scheduler keeps Gemini under the quota" if ok
+          else "❌ FAIL: scheduled run was refused more often than direct calls")
+    return ok
+
+def run_menu_line_cache_benchmark(args):
+    """
+    Time what /menu/scan does after OCR - the nutrient lookup for every menu
+    line, reported by the server as X-Nutrient-Lookup-Ms - on a realistic
+    corpus: the fake upstream answers each scan with one of --restaurants
+    OCR'd menus (tests/menu_corpus.py). Runs with the menu line cache off
+    (X-Menu-Line-Cache: off), then on.
+    """
+    from tests.loadgen import percentile
+
+    print("🧾 MENU SCAN POST-OCR TIME: LINE CACHE OFF vs ON")
+    print("="*60)
+    print(f"Testing API at: {BASE_URL} (fake upstream {args.fake_upstream}, "
+          f"{args.restaurants} restaurants, {args.scans} scans per variant)")
+
+    try:
+        previous = client.get(f"{args.fake_upstream}/__stats", timeout=5).json()["config"]
+        client.post(f"{args.fake_upstream}/__config", json={
+            "menu_corpus_size": args.restaurants, "rate_limit_rate": 0.0, "gemini_quota_rps": 0.0,
+        }, timeout=5)
+    except Exception as e:
+        print(f"❌ Fake upstream not reachable at {args.fake_upstream} - {e}")
+        print("   Start it with `python -m tests.fake_upstream` and point GEMINI_BASE_URL at it")
+        return False
+
+    test_image = create_test_image()
+    summary = {}
+    try:
+        for label, extra in [("off", {"X-Menu-Line-Cache": "off"}), ("on", {})]:
+            lookup_ms, names, cache_hits, round_trips = [], 0, 0, 0
+            for _ in range(args.scans):
+                response = scan_menu(test_image, headers={'Cache-Control': 'no-cache', **extra})
+                if response.status_code != 200 or "X-Nutrient-Lookup-Ms" not in response.headers:
+                    print(f"❌ Scan failed: {response.status_code} {response.text[:200]}")
+                    return False
+                lookup_ms.append(float(response.headers["X-Nutrient-Lookup-Ms"]))
+                names += int(response.headers.get("X-Nutrient-Names", 0))
+                cache_hits += int(response.headers.get("X-Nutrient-Cache-Hits", 0))
+                round_trips += int(response.headers.get("X-Nutrient-DB-Round-Trips", 0))
+            lookup_ms.sort()
+            summary[label] = {
+                "p50": percentile(lookup_ms, 50),
+                "p95": percentile(lookup_ms, 95),
+                "lines_per_scan": names / args.scans,
+                "cache_hits_per_scan": cache_hits / args.scans,
+                "round_trips_per_scan": round_trips / args.scans,
+            }
+    finally:
+        client.post(f"{args.fake_upstream}/__config", json={
+            "menu_corpus_size": previous.get("menu_corpus_size", 0),
+            "rate_limit_rate": previous.get("rate_limit_rate", 0.0),
+            "gemini_quota_rps": previous.get("gemini_quota_rps", 0.0),
+        }, timeout=5)
+
+    print(f"\n{'cache':<6} {'p50_ms':>8} {'p95_ms':>8} {'lines':>7} {'hits':>7} {'db_trips':>9}")
+    for label, row in summary.items():
+        print(f"{label:<6} {row['p50']:>8.2f} {row['p95']:>8.2f} {row['lines_per_scan']:>7.1f} "
+              f"{row['cache_hits_per_scan']:>7.1f} {row['round_trips_per_scan']:>9.2f}")
+
+    metrics = client.get(f"{BASE_URL}/metrics", timeout=10)
+    if metrics.status_code == 200 and "nutrient_resolver" in metrics.json():
+        resolver = metrics.json()["nutrient_resolver"]
+        print(f"\nServer line cache: {resolver.get('line_cache_entries')} entries, "
+              f"hit rate {resolver.get('line_cache_hit_rate', 0):.0%}, "
+              f"{resolver.get('line_cache_evictions')} evictions")
+
+    off, on = summary["off"]["p50"], summary["on"]["p50"]
+    speedup = off / on if on else float("inf")
+    ok = on < off
+    print(f"{'✅ PASS' if ok else '❌ FAIL'}: post-OCR p50 {off:.2f}ms -> {on:.2f}ms ({speedup:.1f}x)")
+    return ok
+
+def run_benchmark_mode(args):
+    """Repeat the critical endpoints and check p95 against baseline and budgets"""
+    from tests.bench import run_benchmark
+
+    print("📊 CRITICAL ENDPOINT LATENCY BENCHMARK")
+    print("="*60)
+    print(f"Testing API at: {BASE_URL}")
+
+    test_image = create_test_image()
+    probes = {
+        "menu_scan": lambda: scan_menu(test_image),
+        "food_analyze": lambda: analyze_meal(test_image),
+    }
+    if args.corpus:
+        probes.update(corpus_probes())
+    return run_benchmark(
+        probes,
+        reps=args.reps,
+        base_url=BASE_URL,
+        baseline_path=args.baseline,
+        tolerance=args.tolerance,
+        budgets=None if args.no_budget else LATENCY_BUDGETS,
+        update_baseline=args.update_baseline
+    )
+
+def parse_args(argv=None):
+    import argparse
+    from tests.bench import DEFAULT_BASELINE_PATH, DEFAULT_TOLERANCE
+
+    parser = argparse.ArgumentParser(description="Fitbear AI critical fixes tests")
+    parser.add_argument("--base-url", help="API base URL (default: localhost)")
+    parser.add_argument("--serial", action="store_true", help="Run tests one at a time")
+    parser.add_argument("--bench", action="store_true", help="Benchmark latency instead of functional tests")
+    parser.add_argument("--reps", type=int, default=10, help="Bench: repetitions per endpoint")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Bench: baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Bench: record this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Bench: allowed p95 regression as a fraction (0.25 = 25%%)")
+    parser.add_argument("--no-budget", action="store_true", help="Bench: skip absolute latency budgets")
+    parser.add_argument("--compare-preprocess", action="store_true",
+                        help="Compare latency/accuracy with and without server-side image preprocessing")
+    parser.add_argument("--ocr-fallback-bench", action="store_true",
+                        help="Force the Tesseract fallback and compare pooled vs one-shot worker throughput")
+    parser.add_argument("--gemini-quota-bench", action="store_true",
+                        help="Rate-limit Gemini on the fake upstream and compare the scheduler on vs off")
+    parser.add_argument("--quota-rps", type=float, default=5, help="Gemini bench: fake upstream calls/s before 429")
+    parser.add_argument("--menu-lines-bench", action="store_true",
+                        help="Time the post-OCR nutrient lookup on a realistic menu corpus, line cache off vs on")
+    parser.add_argument("--restaurants", type=int, default=50, help="Menu lines bench: distinct menus in the corpus")
+    parser.add_argument("--scans", type=int, default=100, help="Menu lines bench: scans per variant")
+    parser.add_argument("--fake-upstream", default="http://127.0.0.1:8090",
+                        help="OCR/Gemini/menu lines bench: fake upstream standing in for Gemini")
+    parser.add_argument("--concurrency", type=int, default=6, help="OCR/Gemini bench: concurrent clients")
+    parser.add_argument("--duration", type=float, default=60, help="OCR/Gemini bench: seconds per variant")
+    parser.add_argument("--corpus", action="store_true",
+                        help="Bench: also probe realistic phone-photo sizes from tests/image_corpus.py")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.base_url:
+        BASE_URL = args.base_url.rstrip("/")
+    if args.ocr_fallback_bench:
+        sys.exit(0 if run_ocr_fallback_benchmark(args) else 1)
+    if args.gemini_quota_bench:
+        sys.exit(0 if run_gemini_quota_benchmark(args) else 1)
+    if args.menu_lines_bench:
+        sys.exit(0 if run_menu_line_cache_benchmark(args) else 1)
+    if args.compare_preprocess:
+        sys.exit(0 if run_preprocess_comparison(args) else 1)
+    if args.bench:
+        sys.exit(0 if run_benchmark_mode(args) else 1)
+    main(serial=args.serial)
\ No newline at end of file
@@ -0,0 +1,15 @@
+/**
+ * Next.js startup hook: runs once per server process before requests are served
+ */
+export async function register() {
+  if (process.env.NEXT_RUNTIME === 'nodejs') {
+    const { warmMongoPool } = await import('./lib/repos/mongo/connection');
+    await warmMongoPool();
+
+    // Tesseract workers load eng+hin traineddata for seconds: warm them without holding up startup
+    if ((process.env.TESSERACT_PREWARM ?? 'on').toLowerCase() !== 'off') {
+      const { warmOcrPool } = await import('./lib/ocr-pool');
+      void warmOcrPool();
+    }
+  }
+}
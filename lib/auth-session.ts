@@ -0,0 +1,367 @@
+/**
+ * Local Supabase Session Verification
+ *
+ * requireUser used to call supabase.auth.getUser() on every request: a round
+ * trip to Supabase Auth (~100 ms) before any handler work. The access token
+ * is a JWT, so it is now verified here instead:
+ *
+ *   - HS256 tokens against SUPABASE_JWT_SECRET
+ *   - ES256 / RS256 tokens against the project's JWKS
+ *     (<SUPABASE_URL>/auth/v1/.well-known/jwks.json, cached, refetched for an
+ *     unknown key id)
+ *
+ * then checked for expiry, issuer and audience. Verified sessions are cached
+ * for AUTH_SESSION_CACHE_S (never past the token's own expiry), so repeat
+ * requests skip even the signature check.
+ *
+ * The remote check is still used when it is needed:
+ *   - the token cannot be verified locally (no secret / key, unknown
+ *     algorithm) or has expired (getUser() refreshes it from the refresh token)
+ *   - AUTH_VERIFY_MODE=remote, an `X-Auth-Verify: remote` request header, or
+ *     a caller asking for it on a sensitive operation
+ *   - revocation: a session verified locally is re-checked remotely in the
+ *     background every AUTH_REVALIDATE_S; a revoked one is refused from then on
+ */
+
+import { createHash, createHmac, createPublicKey, timingSafeEqual, verify, type KeyObject } from 'crypto';
+import { processSingleton, registerMetrics } from './metrics';
+
+const SESSION_CACHE_MS = Number(process.env.AUTH_SESSION_CACHE_S || 60) * 1000;
+const REVALIDATE_MS = Number(process.env.AUTH_REVALIDATE_S || 300) * 1000;
+const VERIFY_MODE = (process.env.AUTH_VERIFY_MODE || 'local').toLowerCase();
+const JWKS_TTL_MS = 10 * 60 * 1000;
+const JWKS_MIN_REFETCH_MS = 30 * 1000;
+const MAX_SESSIONS = 10000;
+const CLOCK_SKEW_S = 5;
+
+export type VerifySource = 'cache' | 'local' | 'remote';
+
+export interface SessionUser {
+  id: string;
+  aud?: string;
+  role?: string;
+  email?: string;
+  phone?: string;
+  app_metadata?: Record<string, unknown>;
+  user_metadata?: Record<string, unknown>;
+  session_id?: string;
+  [key: string]: unknown;
+}
+
+// What requireUser's remote path returns: the supabase.auth.getUser(token) result.
+// `token` is passed for the background re-check of an already verified token;
+// without it Supabase reads the session from the request cookies.
+export type RemoteCheck = (token?: string) => Promise<{
+  user: SessionUser | null;
+  error?: { message: string; status?: number; code?: string } | null;
+}>;
+
+export interface VerifiedSession {
+  user: SessionUser | null;
+  error: string | null;
+  source: VerifySource;
+}
+
+interface CachedSession {
+  user: SessionUser;
+  tokenExpiresAt: number;
+  freshUntil: number; // trusted without re-checking the signature until then
+  revalidateAt: number; // next background remote check
+  revoked: boolean;
+}
+
+const state = processSingleton('__fitbearAuthSessions', () => ({
+  sessions: new Map<string, CachedSession>(), // Map iteration order doubles as recency order
+  jwks: { keys: new Map<string, KeyObject>(), fetchedAt: 0, fetching: null as Promise<void> | null },
+  counts: {
+    cache: 0,
+    local: 0,
+    remote: 0,
+    remote_fallbacks: 0,
+    rejected: 0,
+    revoked: 0,
+    background_checks: 0,
+    jwks_fetches: 0,
+    cache_ms_total: 0,
+    local_ms_total: 0,
+    remote_ms_total: 0,
+  },
+}));
+
+registerMetrics('auth', () => {
+  const { counts } = state;
+  const avg = (total: number, n: number) => (n ? Number((total / n).toFixed(3)) : 0);
+  return {
+    mode: VERIFY_MODE,
+    ...counts,
+    sessions: state.sessions.size,
+    jwks_keys: state.jwks.keys.size,
+    avg_cache_ms: avg(counts.cache_ms_total, counts.cache),
+    avg_local_ms: avg(counts.local_ms_total, counts.local),
+    avg_remote_ms: avg(counts.remote_ms_total, counts.remote),
+  };
+});
+
+/**
+ * The access token from `Authorization: Bearer ...` or the Supabase auth
+ * cookie (sb-<ref>-auth-token, possibly split into .0/.1 chunks, either
+ * "base64-" encoded or JSON)
+ */
+export function accessTokenFrom(authorization: string | null, cookies: { name: string; value: string }[]): string | null {
+  const bearer = authorization?.match(/^Bearer\s+(.+)$/i)?.[1];
+  if (bearer) return bearer.trim();
+
+  const chunks = cookies
+    .map(cookie => ({ ...cookie, match: cookie.name.match(/^sb-.+-auth-token(?:\.(\d+))?$/) }))
+    .filter(cookie => cookie.match)
+    .sort((a, b) => Number(a.match![1] ?? -1) - Number(b.match![1] ?? -1));
+  if (!chunks.length) return null;
+
+  try {
+    let raw = decodeURIComponent(chunks.map(chunk => chunk.value).join(''));
+    if (raw.startsWith('base64-')) {
+      raw = Buffer.from(raw.slice('base64-'.length), 'base64url').toString('utf8');
+    }
+    const session = JSON.parse(raw);
+    return (Array.isArray(session) ? session[0] : session?.access_token) || null;
+  } catch {
+    return null;
+  }
+}
+
+export function parseCookieHeader(header: string | null): { name: string; value: string }[] {
+  if (!header) return [];
+  return header.split(';').map(part => {
+    const index = part.indexOf('=');
+    return index < 0
+      ? { name: part.trim(), value: '' }
+      : { name: part.slice(0, index).trim(), value: part.slice(index + 1).trim() };
+  });
+}
+
+function decodePart(part: string): any {
+  return JSON.parse(Buffer.from(part, 'base64url').toString('utf8'));
+}
+
+async function refreshJwks(): Promise<void> {
+  const url = process.env.SUPABASE_URL || process.env.NEXT_PUBLIC_SUPABASE_URL;
+  if (!url || Date.now() - state.jwks.fetchedAt < JWKS_MIN_REFETCH_MS) return;
+  if (!state.jwks.fetching) {
+    state.jwks.fetching = (async () => {
+      try {
+        state.counts.jwks_fetches += 1;
+        const response = await fetch(`${url.replace(/\/$/, '')}/auth/v1/.well-known/jwks.json`);
+        if (!response.ok) throw new Error(`JWKS fetch returned ${response.status}`);
+        const { keys = [] } = await response.json();
+        const parsed = new Map<string, KeyObject>();
+        for (const jwk of keys) {
+          if (jwk.kid) parsed.set(jwk.kid, createPublicKey({ key: jwk, format: 'jwk' }));
+        }
+        state.jwks.keys = parsed;
+      } catch (error) {
+        console.warn('Supabase JWKS fetch failed:', (error as Error).message);
+      } finally {
+        state.jwks.fetchedAt = Date.now();
+        state.jwks.fetching = null;
+      }
+    })();
+  }
+  await state.jwks.fetching;
+}
+
+async function publicKey(kid: string | undefined): Promise<KeyObject | null> {
+  if (!kid) return null;
+  if (!state.jwks.keys.has(kid) || Date.now() - state.jwks.fetchedAt > JWKS_TTL_MS) {
+    await refreshJwks();
+  }
+  return state.jwks.keys.get(kid) ?? null;
+}
+
+type LocalResult =
+  | { status: 'valid'; user: SessionUser; exp: number }
+  | { status: 'invalid'; reason: string }
+  | { status: 'unverifiable'; reason: string };
+
+/**
+ * Signature and claims of a Supabase access token, without a network call
+ * (other than an occasional JWKS fetch)
+ */
+export async function verifyAccessToken(token: string): Promise<LocalResult> {
+  const parts = token.split('.');
+  if (parts.length !== 3) return { status: 'invalid', reason: 'malformed token' };
+
+  let header: any;
+  let payload: any;
+  try {
+    header = decodePart(parts[0]);
+    payload = decodePart(parts[1]);
+  } catch {
+    return { status: 'invalid', reason: 'malformed token' };
+  }
+
+  const data = Buffer.from(`${parts[0]}.${parts[1]}`);
+  const signature = Buffer.from(parts[2], 'base64url');
+  if (header.alg === 'HS256') {
+    const secret = process.env.SUPABASE_JWT_SECRET;
+    if (!secret) return { status: 'unverifiable', reason: 'SUPABASE_JWT_SECRET not set' };
+    const expected = createHmac('sha256', secret).update(data).digest();
+    if (expected.length !== signature.length || !timingSafeEqual(expected, signature)) {
+      return { status: 'invalid', reason: 'bad signature' };
+    }
+  } else if (header.alg === 'ES256' || header.alg === 'RS256') {
+    const key = await publicKey(header.kid);
+    if (!key) return { status: 'unverifiable', reason: `no JWKS key for kid ${header.kid}` };
+    const ok = header.alg === 'ES256'
+      ? verify('sha256', data, { key, dsaEncoding: 'ieee-p1363' }, signature)
+      : verify('sha256', data, key, signature);
+    if (!ok) return { status: 'invalid', reason: 'bad signature' };
+  } else {
+    return { status: 'unverifiable', reason: `unsupported alg ${header.alg}` };
+  }
+
+  const now = Date.now() / 1000;
+  if (typeof payload.exp !== 'number' || payload.exp + CLOCK_SKEW_S < now) {
+    return { status: 'unverifiable', reason: 'expired' }; // the remote path can refresh it
+  }
+  if (typeof payload.nbf === 'number' && payload.nbf - CLOCK_SKEW_S > now) {
+    return { status: 'invalid', reason: 'not yet valid' };
+  }
+  const audiences = Array.isArray(payload.aud) ? payload.aud : [payload.aud];
+  if (!payload.sub || !audiences.includes('authenticated')) {
+    return { status: 'invalid', reason: 'not an authenticated user token' };
+  }
+  const supabaseUrl = process.env.SUPABASE_URL || process.env.NEXT_PUBLIC_SUPABASE_URL;
+  if (supabaseUrl && payload.iss && payload.iss !== `${supabaseUrl.replace(/\/$/, '')}/auth/v1`) {
+    return { status: 'invalid', reason: 'wrong issuer' };
+  }
+
+  return {
+    status: 'valid',
+    exp: payload.exp,
+    user: {
+      id: payload.sub,
+      aud: payload.aud,
+      role: payload.role,
+      email: payload.email,
+      phone: payload.phone,
+      app_metadata: payload.app_metadata ?? {},
+      user_metadata: payload.user_metadata ?? {},
+      session_id: payload.session_id,
+    },
+  };
+}
+
+function tokenKey(token: string): string {
+  return createHash('sha256').update(token).digest('base64url');
+}
+
+function remember(key: string, user: SessionUser, exp: number, previous?: CachedSession): CachedSession {
+  const entry = {
+    user,
+    tokenExpiresAt: exp * 1000,
+    freshUntil: Math.min(Date.now() + SESSION_CACHE_MS, exp * 1000),
+    revalidateAt: previous?.revalidateAt ?? Date.now() + REVALIDATE_MS,
+    revoked: false,
+  };
+  state.sessions.delete(key);
+  state.sessions.set(key, entry);
+  while (state.sessions.size > MAX_SESSIONS) {
+    state.sessions.delete(state.sessions.keys().next().value);
+  }
+  return entry;
+}
+
+async function remoteVerify(remote: RemoteCheck, started: number): Promise<VerifiedSession> {
+  const { user, error } = await remote();
+  state.counts.remote += 1;
+  state.counts.remote_ms_total += performance.now() - started;
+  return { user: error ? null : user, error: error?.message ?? null, source: 'remote' };
+}
+
+// Supabase answers that mean the session is gone
+const REVOKED_STATUSES = new Set([401, 403, 404]);
+const REVOKED_CODES = new Set(['user_not_found', 'session_not_found', 'bad_jwt']);
+
+function isRevocation(error: { status?: number; code?: string }): boolean {
+  return REVOKED_STATUSES.has(error.status ?? 0) || REVOKED_CODES.has(error.code ?? '');
+}
+
+/**
+ * Re-ask Supabase whether a locally verified session is still live, with the
+ * token itself (so Bearer sessions are checked too); mark it revoked (until
+ * the token expires) only on a definitive answer. Never throws, never blocks
+ * the request.
+ */
+function revalidateInBackground(entry: CachedSession, token: string, remote: RemoteCheck): void {
+  entry.revalidateAt = Date.now() + REVALIDATE_MS;
+  state.counts.background_checks += 1;
+  remote(token)
+    .then(({ error }) => {
+      if (!error) return;
+      if (isRevocation(error)) {
+        entry.revoked = true;
+        state.counts.revoked += 1;
+      } else {
+        // 5xx / network trouble: leave the session alone, it is re-checked next interval
+        console.warn('Background session check failed:', error.message);
+      }
+    })
+    .catch(error => console.warn('Background session check failed:', (error as Error).message));
+}
+
+/**
+ * The user behind `token`: from the session cache, verified locally, or via
+ * `remote` (supabase.auth.getUser()) when local verification cannot decide
+ * or `forceRemote` is set
+ */
+export async function verifySession(token: string | null, remote: RemoteCheck, forceRemote = false): Promise<VerifiedSession> {
+  const started = performance.now();
+  if (forceRemote || VERIFY_MODE === 'remote') {
+    return remoteVerify(remote, started);
+  }
+  if (!token) {
+    // No token we can read: let Supabase decide (it may find a session we could not parse)
+    state.counts.remote_fallbacks += 1;
+    return remoteVerify(remote, started);
+  }
+
+  const key = tokenKey(token);
+  let cached = state.sessions.get(key);
+  if (cached && cached.tokenExpiresAt <= Date.now()) {
+    state.sessions.delete(key);
+    cached = undefined;
+  }
+  if (cached?.revoked) {
+    state.counts.rejected += 1;
+    return { user: null, error: 'Session revoked', source: 'cache' };
+  }
+  if (cached && cached.freshUntil > Date.now()) {
+    if (cached.revalidateAt <= Date.now()) revalidateInBackground(cached, token, remote);
+    state.counts.cache += 1;
+    state.counts.cache_ms_total += performance.now() - started;
+    return { user: cached.user, error: null, source: 'cache' };
+  }
+
+  const result = await verifyAccessToken(token);
+  if (result.status === 'valid') {
+    const entry = remember(key, result.user, result.exp, cached);
+    if (entry.revalidateAt <= Date.now()) revalidateInBackground(entry, token, remote);
+    state.counts.local += 1;
+    state.counts.local_ms_total += performance.now() - started;
+    return { user: result.user, error: null, source: 'local' };
+  }
+  if (result.status === 'invalid') {
+    state.counts.rejected += 1;
+    return { user: null, error: `Invalid access token: ${result.reason}`, source: 'local' };
+  }
+  state.counts.remote_fallbacks += 1;
+  return remoteVerify(remote, started);
+}
+
+/**
+ * `X-Auth-Verify: remote` forces the Supabase round trip for one request
+ * (benchmarks, and clients that must not be served a revoked session)
+ */
+export function remoteVerifyRequested(headers: Headers): boolean {
+  return (headers.get('x-auth-verify') || '').toLowerCase() === 'remote';
+}
@@ -1,5 +1,6 @@
 import { createServerClient } from '@supabase/ssr'
 import { NextResponse } from 'next/server'
+import { verifySession, accessTokenFrom, parseCookieHeader, remoteVerifyRequested } from './auth-session'
 
 /**
  * Create Supabase client for server-side operations
@@ -27,18 +28,32 @@ function createSupabaseServerClient(request) {
 
 /**
  * Require authenticated user for API routes
+ * The access token is verified locally when possible (lib/auth-session.ts);
+ * Supabase Auth is only asked when that cannot decide, or when `remote` is set
  * @param {Request} request - Next.js request object
+ * @param {{remote?: boolean}} [options] - remote: always check with Supabase (revocation-sensitive operations)
  * @returns {Promise<{user: Object, error: NextResponse|null}>}
  */
-export async function requireUser(request) {
+export async function requireUser(request, { remote = false } = {}) {
   try {
-    const supabase = createSupabaseServerClient(request)
+    const token = accessTokenFrom(
+      request.headers.get('authorization'),
+      parseCookieHeader(request.headers.get('cookie'))
+    )
     
-    // Get user from session
-    const { data: { user }, error } = await supabase.auth.getUser()
+    const { user, error } = await verifySession(
+      token,
+      async (verifiedToken) => {
+        // Get user from the given token, or from the session cookies
+        const supabase = createSupabaseServerClient(request)
+        const { data: { user }, error } = await supabase.auth.getUser(verifiedToken)
+        return { user, error }
+      },
+      remote || remoteVerifyRequested(request.headers)
+    )
     
     if (error) {
-      console.error('Auth error:', error.message)
+      console.error('Auth error:', error)
       return {
         user: null,
         error: NextResponse.json(
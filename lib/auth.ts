@@ -1,18 +1,28 @@
-import { cookies } from "next/headers";
+import { cookies, headers } from "next/headers";
 import { createServerClient } from "@supabase/ssr";
+import { verifySession, accessTokenFrom, remoteVerifyRequested } from "./auth-session";
 
-export async function requireUser() {
-  const supabase = createServerClient(
-    process.env.NEXT_PUBLIC_SUPABASE_URL!,
-    process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!,
-    {
-      cookies: {
-        get: (name) => cookies().get(name)?.value,
-        set: () => {}, remove: () => {}
-      }
-    }
+// Verified locally when possible (lib/auth-session.ts); Supabase Auth is asked
+// only when that cannot decide, or when `remote` is set
+export async function requireUser({ remote = false }: { remote?: boolean } = {}) {
+  const { user } = await verifySession(
+    accessTokenFrom(headers().get("authorization"), cookies().getAll()),
+    async (verifiedToken) => {
+      const supabase = createServerClient(
+        process.env.NEXT_PUBLIC_SUPABASE_URL!,
+        process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!,
+        {
+          cookies: {
+            get: (name) => cookies().get(name)?.value,
+            set: () => {}, remove: () => {}
+          }
+        }
+      );
+      const { data: { user }, error } = await supabase.auth.getUser(verifiedToken);
+      return { user, error };
+    },
+    remote || remoteVerifyRequested(headers())
   );
-  const { data: { user } } = await supabase.auth.getUser();
   if (!user) throw new Error("unauthorized");
   return user;
 }
\ No newline at end of file
@@ -0,0 +1,215 @@
+/**
+ * Streaming User Data Export
+ *
+ * GET /api/export used to load the profile, every target and every log into
+ * one object before serializing it. Here the targets and logs are read off
+ * Mongo cursors (date / ts order) and written to the response a batch at a
+ * time, pulled by the client, so memory stays flat however long the history.
+ *
+ * Formats:
+ *   json   - the original document shape, written incrementally; metadata last
+ *   ndjson - one {"type": "profile" | "target" | "log" | "metadata", ...} per line
+ *   csv    - one section (logs by default, or ?section=targets) with a header row
+ */
+
+import { repositories } from './repos';
+
+export type ExportFormat = 'json' | 'ndjson' | 'csv';
+export type ExportSection = 'logs' | 'targets';
+
+export interface ExportOptions {
+  format: ExportFormat;
+  section: ExportSection;
+  from?: string; // YYYY-MM-DD or ISO timestamp
+  to?: string;
+}
+
+const RECORDS_PER_CHUNK = 500;
+
+const LOG_COLUMNS = [
+  'id', 'ts', 'source_enum', 'food_id', 'menu_item_id', 'portion_qty_numeric', 'portion_units',
+  'kcal', 'protein_g', 'carb_g', 'fat_g', 'fiber_g', 'sodium_mg', 'notes'
+];
+const TARGET_COLUMNS = [
+  'date', 'tdee_kcal', 'kcal_budget', 'protein_g', 'carb_g', 'fat_g', 'sugar_g', 'fiber_g',
+  'sodium_mg', 'water_ml', 'steps'
+];
+
+const DATE_ONLY = /^\d{4}-\d{2}-\d{2}$/;
+
+/**
+ * Read format/section/from/to from the query string; returns an error message for bad input
+ */
+export function parseExportOptions(url: URL): ExportOptions | { error: string } {
+  const format = (url.searchParams.get('format') || 'json').toLowerCase();
+  if (!['json', 'ndjson', 'csv'].includes(format)) {
+    return { error: `Unsupported export format: ${format} (use json, ndjson or csv)` };
+  }
+
+  const section = (url.searchParams.get('section') || 'logs').toLowerCase();
+  if (!['logs', 'targets'].includes(section)) {
+    return { error: `Unsupported export section: ${section} (use logs or targets)` };
+  }
+
+  const from = url.searchParams.get('from') || undefined;
+  const to = url.searchParams.get('to') || undefined;
+  for (const [name, value] of [['from', from], ['to', to]]) {
+    if (value && Number.isNaN(Date.parse(value))) {
+      return { error: `Invalid ${name} date: ${value}` };
+    }
+  }
+
+  return { format: format as ExportFormat, section: section as ExportSection, from, to };
+}
+
+function logRange(options: ExportOptions) {
+  const from = options.from ? new Date(options.from) : undefined;
+  let to = options.to ? new Date(options.to) : undefined;
+  if (to && DATE_ONLY.test(options.to!)) {
+    to = new Date(to.getTime() + 24 * 3600 * 1000 - 1); // whole end day
+  }
+  return { from, to };
+}
+
+function targetRange(options: ExportOptions) {
+  return {
+    from: options.from?.slice(0, 10),
+    to: options.to?.slice(0, 10),
+  };
+}
+
+function withoutMongoId<T extends Record<string, any>>(doc: T | null): Record<string, any> {
+  if (!doc) return {};
+  const { _id, ...fields } = doc;
+  return fields;
+}
+
+function csvCell(value: unknown): string {
+  if (value === undefined || value === null) return '';
+  const text = value instanceof Date ? value.toISOString() : typeof value === 'object' ? JSON.stringify(value) : String(value);
+  return /[",\n\r]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
+/**
+ * Serialize `records` with `write`, grouping output into chunks of RECORDS_PER_CHUNK
+ */
+async function* batched<T>(records: AsyncIterable<T>, write: (record: T, index: number) => string) {
+  let parts: string[] = [];
+  let index = 0;
+  for await (const record of records) {
+    parts.push(write(record, index++));
+    if (parts.length >= RECORDS_PER_CHUNK) {
+      yield parts.join('');
+      parts = [];
+    }
+  }
+  if (parts.length) {
+    yield parts.join('');
+  }
+}
+
+async function* jsonExport(userId: string, options: ExportOptions): AsyncGenerator<string> {
+  const profile = await repositories.profiles.findByUserId(userId);
+  const stats = { targets: 0, logs: 0, earliest: null as any, latest: null as any };
+
+  yield `{"user_id":${JSON.stringify(userId)},"exported_at":${JSON.stringify(new Date().toISOString())},` +
+    `"profile":${JSON.stringify(withoutMongoId(profile))},"targets":[`;
+
+  yield* batched(repositories.targets.iterateByUserId(userId, targetRange(options)), (target, i) => {
+    stats.targets += 1;
+    return (i ? ',' : '') + JSON.stringify(target);
+  });
+
+  yield '],"logs":[';
+
+  yield* batched(repositories.foodLogs.iterateByUserId(userId, logRange(options)), (log, i) => {
+    stats.logs += 1;
+    stats.earliest = stats.earliest ?? log.ts;
+    stats.latest = log.ts;
+    return (i ? ',' : '') + JSON.stringify(log);
+  });
+
+  yield `],"metadata":${JSON.stringify({
+    total_targets: stats.targets,
+    total_logs: stats.logs,
+    date_range: { earliest_log: stats.earliest, latest_log: stats.latest },
+    filters: { from: options.from ?? null, to: options.to ?? null }
+  })}}`;
+}
+
+async function* ndjsonExport(userId: string, options: ExportOptions): AsyncGenerator<string> {
+  const profile = await repositories.profiles.findByUserId(userId);
+  let totalTargets = 0;
+  let totalLogs = 0;
+
+  yield JSON.stringify({ type: 'profile', user_id: userId, exported_at: new Date().toISOString(), ...withoutMongoId(profile) }) + '\n';
+
+  yield* batched(repositories.targets.iterateByUserId(userId, targetRange(options)), (target) => {
+    totalTargets += 1;
+    return JSON.stringify({ type: 'target', ...target }) + '\n';
+  });
+
+  yield* batched(repositories.foodLogs.iterateByUserId(userId, logRange(options)), (log) => {
+    totalLogs += 1;
+    return JSON.stringify({ type: 'log', ...log }) + '\n';
+  });
+
+  yield JSON.stringify({ type: 'metadata', total_targets: totalTargets, total_logs: totalLogs }) + '\n';
+}
+
+async function* csvExport(userId: string, options: ExportOptions): AsyncGenerator<string> {
+  const columns = options.section === 'targets' ? TARGET_COLUMNS : LOG_COLUMNS;
+  const records: AsyncIterable<Record<string, any>> = options.section === 'targets'
+    ? repositories.targets.iterateByUserId(userId, targetRange(options))
+    : repositories.foodLogs.iterateByUserId(userId, logRange(options));
+
+  yield columns.join(',') + '\n';
+  yield* batched(records, (record) => columns.map((column) => csvCell(record[column])).join(',') + '\n');
+}
+
+const CONTENT_TYPES: Record<ExportFormat, string> = {
+  json: 'application/json; charset=utf-8',
+  ndjson: 'application/x-ndjson; charset=utf-8',
+  csv: 'text/csv; charset=utf-8',
+};
+
+/**
+ * A Response whose body is produced on demand: the next batch is read from
+ * Mongo only when the client has consumed the previous one.
+ */
+export function exportResponse(userId: string, options: ExportOptions): Response {
+  const generator = options.format === 'csv'
+    ? csvExport(userId, options)
+    : options.format === 'ndjson' ? ndjsonExport(userId, options) : jsonExport(userId, options);
+  const encoder = new TextEncoder();
+
+  const body = new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      try {
+        const { value, done } = await generator.next();
+        if (done) {
+          controller.close();
+        } else {
+          controller.enqueue(encoder.encode(value));
+        }
+      } catch (error) {
+        console.error('Export stream error:', error);
+        controller.error(error);
+      }
+    },
+    async cancel() {
+      await generator.return(undefined); // closes the Mongo cursor
+    }
+  });
+
+  const day = new Date().toISOString().split('T')[0];
+  const suffix = options.format === 'csv' ? `-${options.section}.csv` : `.${options.format}`;
+  return new Response(body, {
+    headers: {
+      'Content-Type': CONTENT_TYPES[options.format],
+      'Content-Disposition': `attachment; filename="fitbear-export-${userId}-${day}${suffix}"`,
+      'Cache-Control': 'no-store',
+      'X-Accel-Buffering': 'no'
+    }
+  });
+}
@@ -0,0 +1,405 @@
+/**
+ * In-memory Food Catalog
+ *
+ * Food search used to be an unanchored case-insensitive $regex OR'd with
+ * $text on food_items, which cannot use idx_food_items_name and scans the
+ * collection on every query; menu OCR lines were matched against the
+ * built-in dish list with substring checks. The catalog loads food_items and
+ * dish_synonyms once per process (on top of the built-in dishes) and answers
+ * both from two in-memory indexes over foldText() keys:
+ *
+ *   prefix   - every key and every word-suffix of it, sorted; a query is a
+ *              binary search plus a scan of the keys that start with it
+ *   trigram  - postings per padded-word trigram, for misspellings and for
+ *              menu lines that carry prices and descriptions around the name
+ *
+ * Keys are folded (lib/transliterate.ts), so "पनीर टिक्का", "paneer tikka"
+ * and "panir tika" are the same key. The collections are re-read when their
+ * change marker (count + newest timestamp) moves, checked at most every
+ * CATALOG_CHECK_S; until the first load finishes the built-in dishes answer.
+ */
+
+import { repositories } from './repos';
+import type { FoodItem, DishSynonym } from './repos/types';
+import { INDIAN_FOOD_DB, BUILTIN_SYNONYMS } from './indian-foods';
+import { foldText } from './transliterate';
+import { processSingleton, registerMetrics } from './metrics';
+
+const CHECK_MS = Number(process.env.CATALOG_CHECK_S || 60) * 1000;
+// How long the first request waits for the database before using built-ins
+const FIRST_LOAD_WAIT_MS = Number(process.env.CATALOG_FIRST_LOAD_WAIT_MS || 500);
+const MAX_ITEMS = Number(process.env.CATALOG_MAX_ITEMS || 50000);
+const MIN_SEARCH_SCORE = 0.35;
+const MIN_LINE_SCORE = 0.5;
+const PREFIX_SCAN_LIMIT = 200;
+
+export interface CatalogFood {
+  id: string; // food_items id, or "builtin:<name>"
+  name: string;
+  category: string;
+  unit: string;
+  kcal: number;
+  protein_g: number;
+  carb_g: number;
+  fat_g: number;
+  fiber_g: number;
+  sodium_mg: number;
+  source: 'builtin' | 'food_items';
+}
+
+export interface CatalogMatch {
+  food: CatalogFood;
+  score: number; // 0-1
+  matched_term: string;
+}
+
+interface Term {
+  food: number;
+  term: string;
+  key: string;
+  weight: number; // 0-1
+  grams: number;
+}
+
+interface PrefixKey {
+  key: string;
+  term: number;
+  wordStart: boolean; // key is a suffix of the term starting at a later word
+}
+
+function trigrams(key: string): Set<string> {
+  const grams = new Set<string>();
+  for (const word of key.split(' ')) {
+    const padded = `  ${word} `;
+    for (let i = 0; i + 3 <= padded.length; i++) {
+      grams.add(padded.slice(i, i + 3));
+    }
+  }
+  return grams;
+}
+
+function lowerBound(keys: PrefixKey[], query: string): number {
+  let lo = 0;
+  let hi = keys.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (keys[mid].key < query) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+export class FoodCatalog {
+  readonly foods: CatalogFood[] = [];
+  private terms: Term[] = [];
+  private exact = new Map<string, number[]>();
+  private prefixKeys: PrefixKey[] = [];
+  private postings = new Map<string, number[]>();
+
+  constructor(foods: CatalogFood[], terms: { food: number; term: string; weight?: number }[]) {
+    this.foods = foods;
+    const seen = new Set<string>();
+    for (const { food, term, weight } of terms) {
+      const key = foldText(term);
+      if (!key || seen.has(`${food}:${key}`)) continue;
+      seen.add(`${food}:${key}`);
+      const index = this.terms.length;
+      const grams = trigrams(key);
+      this.terms.push({ food, term, key, weight: Math.min(Math.max(weight ?? 1, 0.01), 1), grams: grams.size });
+
+      this.exact.set(key, [...(this.exact.get(key) || []), index]);
+      const words = key.split(' ');
+      for (let w = 0; w < words.length; w++) {
+        this.prefixKeys.push({ key: words.slice(w).join(' '), term: index, wordStart: w > 0 });
+      }
+      for (const gram of grams) {
+        const list = this.postings.get(gram);
+        if (list) list.push(index);
+        else this.postings.set(gram, [index]);
+      }
+    }
+    this.prefixKeys.sort((a, b) => (a.key < b.key ? -1 : a.key > b.key ? 1 : 0));
+  }
+
+  get size() {
+    return { foods: this.foods.length, terms: this.terms.length, trigrams: this.postings.size };
+  }
+
+  private candidates(query: string): Map<number, number> {
+    const scores = new Map<number, number>();
+    const offer = (term: number, score: number) => {
+      if (score > (scores.get(term) ?? 0)) scores.set(term, score);
+    };
+
+    for (const term of this.exact.get(query) || []) offer(term, 1);
+
+    for (let i = lowerBound(this.prefixKeys, query), n = 0; i < this.prefixKeys.length && n < PREFIX_SCAN_LIMIT; i++, n++) {
+      const { key, term, wordStart } = this.prefixKeys[i];
+      if (!key.startsWith(query)) break;
+      const termKey = this.terms[term].key;
+      offer(term, (wordStart ? 0.7 : 0.8) + 0.19 * (query.length / termKey.length));
+    }
+
+    // Trigram overlap: misspellings, and lines that contain a dish name among other words
+    const queryGrams = trigrams(query);
+    const shared = new Map<number, number>();
+    for (const gram of queryGrams) {
+      for (const term of this.postings.get(gram) || []) {
+        shared.set(term, (shared.get(term) ?? 0) + 1);
+      }
+    }
+    const paddedQuery = ` ${query} `;
+    for (const [term, count] of shared) {
+      const { key, grams } = this.terms[term];
+      if (key.length < query.length && paddedQuery.includes(` ${key} `)) {
+        offer(term, 0.75 + 0.2 * (key.length / query.length));
+        continue;
+      }
+      const dice = (2 * count) / (queryGrams.size + grams);
+      const coverage = count / grams;
+      offer(term, 0.9 * (0.6 * dice + 0.4 * coverage));
+    }
+    return scores;
+  }
+
+  /**
+   * Best matches for a free-text query, one per food, best first
+   */
+  search(query: string, limit = 10, minScore = MIN_SEARCH_SCORE): CatalogMatch[] {
+    const key = foldText(query);
+    if (!key) return [];
+
+    const best = new Map<number, CatalogMatch>();
+    for (const [index, raw] of this.candidates(key)) {
+      const term = this.terms[index];
+      const score = raw * (0.8 + 0.2 * term.weight);
+      if (score < minScore) continue;
+      const current = best.get(term.food);
+      if (!current || score > current.score) {
+        best.set(term.food, { food: this.foods[term.food], score: Number(score.toFixed(3)), matched_term: term.term });
+      }
+    }
+    return [...best.values()]
+      .sort((a, b) => b.score - a.score || a.food.name.length - b.food.name.length)
+      .slice(0, limit);
+  }
+
+  /**
+   * The food a menu line names, if any
+   */
+  matchLine(line: string): CatalogMatch | null {
+    const name = menuLineName(line);
+    if (foldText(name).length < 3) return null;
+    return this.search(name, 1, MIN_LINE_SCORE)[0] ?? null;
+  }
+}
+
+const DEVANAGARI_DIGIT_ZERO = 0x0966;
+// Portions printed next to the dish: "(2 pcs)", "250 ml", "Half/Full", "x2"
+const QUANTITY_UNITS = 'pcs?|pieces?|nos?|g|gms?|grams?|kg|ml|ltrs?|l|oz|plates?|bowls?|katori|glass(?:es)?|cups?|serves?|persons?';
+const PORTION_WORDS = 'half|full|quarter|qtr|regular|small|medium|large';
+const PARENTHESIZED_QUANTITY = new RegExp(`\\(\\s*\\d+([.,]\\d+)?\\s*(${QUANTITY_UNITS})?\\.?\\s*\\)`, 'gi');
+const QUANTITY = new RegExp(`\\b\\d+([.,]\\d+)?\\s*(${QUANTITY_UNITS})\\b\\.?`, 'gi');
+const PORTION = new RegExp(`\\(?\\b(${PORTION_WORDS})\\b(\\s*[/|]\\s*\\b(${PORTION_WORDS})\\b)*(\\s*plate)?\\)?`, 'gi');
+
+/**
+ * A menu line as OCR returns it, without its price ("₹250", "Rs. 120",
+ * "180/-", "₹२८०"), portion ("(2 pcs)", "Half/Full", "250 ml"), serial
+ * number or bullet. Compatibility forms are folded (NFKC), Devanagari digits
+ * become ASCII and zero-width joiners are dropped, so the same dish printed
+ * by two menus leaves the same name.
+ */
+export function menuLineName(line: string): string {
+  return line
+    .normalize('NFKC')
+    .replace(/[\u200B-\u200D\uFEFF]/g, '')
+    .replace(/[०-९]/g, digit => String(digit.charCodeAt(0) - DEVANAGARI_DIGIT_ZERO))
+    .replace(/^\s*(\d{1,3}[.)]|[-*•·]+)\s+/, '')
+    .replace(/(₹|\brs\.?|\binr)\s*\d+([.,]\d+)?/gi, ' ')
+    .replace(/\d+([.,]\d+)?\s*\/-/g, ' ')
+    .replace(/\b\d+([.,]\d+)?(\s*\/\s*\d+([.,]\d+)?)+\b/g, ' ')
+    .replace(PARENTHESIZED_QUANTITY, ' ')
+    .replace(QUANTITY, ' ')
+    .replace(/\b(x\s*\d+|\d+\s*x)\b/gi, ' ')
+    .replace(PORTION, ' ')
+    .replace(/[\d\s\-–—:|/.,]+$/, ' ')
+    .replace(/\s+/g, ' ')
+    .trim();
+}
+
+function builtinFood(name: string): CatalogFood {
+  const data = INDIAN_FOOD_DB[name];
+  return {
+    id: `builtin:${name}`,
+    name,
+    category: data.category,
+    unit: 'serving',
+    kcal: data.calories,
+    protein_g: data.protein_g,
+    carb_g: data.carb_g ?? 0,
+    fat_g: data.fat_g ?? 0,
+    fiber_g: data.fiber_g,
+    sodium_mg: data.sodium_mg,
+    source: 'builtin',
+  };
+}
+
+export function storedFood(item: FoodItem): CatalogFood {
+  return {
+    id: item.id,
+    name: item.canonical_name,
+    category: item.category_enum,
+    unit: item.unit_default || 'serving',
+    kcal: Number(item.kcal_per_unit) || 0,
+    protein_g: Number(item.protein_g) || 0,
+    carb_g: Number(item.carb_g) || 0,
+    fat_g: Number(item.fat_g) || 0,
+    fiber_g: Number(item.fiber_g) || 0,
+    sodium_mg: Number(item.sodium_mg) || 0,
+    source: 'food_items',
+  };
+}
+
+/**
+ * Built-in dishes first; a food_items row with the same folded name replaces
+ * the built-in entry and inherits its synonyms
+ */
+export function buildCatalog(items: FoodItem[] = [], synonyms: DishSynonym[] = []): FoodCatalog {
+  const foods: CatalogFood[] = [];
+  const terms: { food: number; term: string; weight?: number }[] = [];
+  const byKey = new Map<string, number>();
+  const byId = new Map<string, number>();
+
+  for (const name of Object.keys(INDIAN_FOOD_DB)) {
+    byKey.set(foldText(name), foods.length);
+    terms.push({ food: foods.length, term: name });
+    for (const synonym of BUILTIN_SYNONYMS[name] || []) {
+      terms.push({ food: foods.length, term: synonym });
+    }
+    foods.push(builtinFood(name));
+  }
+
+  for (const item of items) {
+    if (!item.canonical_name) continue;
+    const key = foldText(item.canonical_name);
+    let index = byKey.get(key);
+    if (index === undefined) {
+      index = foods.length;
+      foods.push(storedFood(item));
+      byKey.set(key, index);
+    } else {
+      foods[index] = storedFood(item);
+    }
+    byId.set(String(item.id), index);
+    terms.push({ food: index, term: item.canonical_name });
+  }
+
+  for (const synonym of synonyms) {
+    const index = byId.get(String(synonym.food_id));
+    if (index === undefined || !synonym.term) continue;
+    terms.push({ food: index, term: synonym.term, weight: (synonym.weight ?? 100) / 100 });
+  }
+
+  return new FoodCatalog(foods, terms);
+}
+
+const state = processSingleton('__fitbearFoodCatalog', () => ({
+  catalog: buildCatalog(),
+  source: 'builtin' as 'builtin' | 'database',
+  truncated: false, // food_items had CATALOG_MAX_ITEMS rows or more, not all are loaded
+  marker: null as string | null,
+  firstLoad: null as Promise<void> | null,
+  refreshing: null as Promise<void> | null,
+  checkedAt: 0,
+  loadedAt: null as string | null,
+  counts: {
+    searches: 0,
+    search_us_total: 0,
+    reloads: 0,
+    load_errors: 0,
+    last_load_ms: 0,
+  },
+}));
+
+registerMetrics('food_catalog', () => {
+  const { counts } = state;
+  return {
+    ...counts,
+    ...state.catalog.size,
+    source: state.source,
+    truncated: state.truncated,
+    loaded_at: state.loadedAt,
+    avg_search_us: counts.searches ? Math.round(counts.search_us_total / counts.searches) : 0,
+  };
+});
+
+async function refresh(): Promise<void> {
+  state.checkedAt = Date.now();
+  const started = Date.now();
+  try {
+    const markers = await Promise.all([
+      repositories.foodItems.changeMarker(),
+      repositories.dishSynonyms.changeMarker(),
+    ]);
+    const marker = JSON.stringify(markers);
+    if (marker === state.marker) return;
+
+    const [items, synonyms] = await Promise.all([
+      repositories.foodItems.findAll(MAX_ITEMS),
+      repositories.dishSynonyms.findAll(),
+    ]);
+    state.catalog = buildCatalog(items, synonyms);
+    state.source = 'database';
+    state.truncated = items.length >= MAX_ITEMS;
+    state.marker = marker;
+    state.loadedAt = new Date().toISOString();
+    state.counts.reloads += 1;
+    state.counts.last_load_ms = Date.now() - started;
+  } catch (error) {
+    state.counts.load_errors += 1;
+    console.warn('Food catalog load failed, keeping current entries:', (error as Error).message);
+  }
+}
+
+function refreshInBackground(): Promise<void> {
+  if (!state.refreshing) {
+    state.refreshing = refresh().finally(() => {
+      state.refreshing = null;
+    });
+  }
+  return state.refreshing;
+}
+
+/**
+ * The current catalog. The first call waits briefly for the database; later
+ * calls never wait, and trigger a change check when one is due.
+ */
+export async function getFoodCatalog(): Promise<FoodCatalog> {
+  if (!state.firstLoad) {
+    state.firstLoad = refreshInBackground();
+    await Promise.race([
+      state.firstLoad,
+      new Promise(resolve => setTimeout(resolve, FIRST_LOAD_WAIT_MS)),
+    ]);
+  } else if (Date.now() - state.checkedAt > CHECK_MS) {
+    void refreshInBackground();
+  }
+  return state.catalog;
+}
+
+/**
+ * Whether `catalog` is the current one and holds every food_items row, so a
+ * name it cannot place is not in the database either
+ */
+export function catalogCoversDatabase(catalog: FoodCatalog): boolean {
+  return catalog === state.catalog && state.source === 'database' && !state.truncated;
+}
+
+export async function searchFoods(query: string, limit = 10): Promise<CatalogMatch[]> {
+  const catalog = await getFoodCatalog();
+  const started = process.hrtime.bigint();
+  const results = catalog.search(query, limit);
+  state.counts.searches += 1;
+  state.counts.search_us_total += Number(process.hrtime.bigint() - started) / 1000;
+  return results;
+}
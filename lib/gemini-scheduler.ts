@@ -0,0 +1,330 @@
+/**
+ * Gemini Call Scheduler
+ *
+ * Menu scans, meal photos and Coach C each called generateContent directly,
+ * so a burst of scans could spend the whole per-key quota and leave the coach
+ * answering with 429s. Every Gemini call now goes through one per-process
+ * scheduler:
+ *
+ *   - a token bucket (GEMINI_RPS, GEMINI_BURST) and a concurrency cap
+ *     (GEMINI_MAX_CONCURRENCY) keep us under the quota instead of finding it
+ *   - waiting calls are started by priority: interactive (the coach) before
+ *     batch (vision scans, which can fall back to Tesseract)
+ *   - identical requests already in flight share one upstream call
+ *   - a 429 or 5xx is retried with jittered exponential backoff; a 429 also
+ *     pauses the bucket for the delay Gemini asks for, so every caller backs
+ *     off rather than just the one that was refused
+ *
+ * A call that cannot start within GEMINI_MAX_WAIT_MS, or finds GEMINI_QUEUE_MAX
+ * calls already waiting, fails with GeminiBusyError.
+ */
+
+import { createHash } from 'crypto';
+import {
+  GoogleGenerativeAI,
+  type GenerateContentRequest,
+  type GenerateContentResult,
+  type GenerateContentStreamResult,
+  type Part,
+} from '@google/generative-ai';
+import { geminiRequestOptions } from './upstreams';
+import { processSingleton, registerMetrics } from './metrics';
+import { benchToggle } from './mode';
+
+export type GeminiPriority = 'interactive' | 'batch';
+export type GeminiRequest = GenerateContentRequest | string | Array<string | Part>;
+
+export interface GeminiCallOptions {
+  priority: GeminiPriority;
+  model?: string;
+  // false calls Gemini directly, as before the scheduler (X-Gemini-Scheduler: off)
+  scheduled?: boolean;
+}
+
+export const GEMINI_MODEL = 'gemini-1.5-flash';
+
+const RPS = Math.max(0.1, Number(process.env.GEMINI_RPS || 5));
+const BURST = Math.max(1, Number(process.env.GEMINI_BURST || 10));
+const MAX_CONCURRENCY = Math.max(1, Number(process.env.GEMINI_MAX_CONCURRENCY || 8));
+const MAX_QUEUE = Math.max(0, Number(process.env.GEMINI_QUEUE_MAX || 64));
+const MAX_WAIT_MS = Number(process.env.GEMINI_MAX_WAIT_MS || 15000);
+const MAX_RETRIES = Math.max(0, Number(process.env.GEMINI_MAX_RETRIES || 3));
+const BACKOFF_BASE_MS = 250;
+const BACKOFF_CAP_MS = 8000;
+const RETRYABLE_STATUS = new Set([429, 500, 502, 503, 504]);
+const PRIORITIES: GeminiPriority[] = ['interactive', 'batch'];
+
+export class GeminiBusyError extends Error {
+  retryAfterS: number;
+
+  constructor(retryAfterS: number) {
+    super('Gemini is at capacity, retry shortly');
+    this.name = 'GeminiBusyError';
+    this.retryAfterS = retryAfterS;
+  }
+}
+
+interface Job {
+  run: () => Promise<unknown>;
+  resolve: (value: any) => void;
+  reject: (error: Error) => void;
+  priority: GeminiPriority;
+  enqueuedAt: number;
+  notBefore: number; // set while backing off before a retry
+  attempt: number;
+}
+
+const genAI = new GoogleGenerativeAI(process.env.GEMINI_API_KEY || '');
+
+const state = processSingleton('__fitbearGeminiScheduler', () => ({
+  queues: { interactive: [] as Job[], batch: [] as Job[] },
+  tokens: BURST,
+  refilledAt: Date.now(),
+  pausedUntil: 0,
+  active: 0,
+  timer: null as NodeJS.Timeout | null,
+  inflight: new Map<string, Promise<unknown>>(),
+  counts: {
+    submitted: 0,
+    upstream_calls: 0,
+    completed: 0,
+    failed: 0,
+    coalesced: 0,
+    retries: 0,
+    rate_limited: 0,
+    server_errors: 0,
+    rejected_queue_full: 0,
+    rejected_wait: 0,
+    unscheduled: 0,
+    peak_queued: 0,
+  },
+  waits: {
+    interactive: { started: 0, wait_ms_total: 0, max_wait_ms: 0 },
+    batch: { started: 0, wait_ms_total: 0, max_wait_ms: 0 },
+  },
+}));
+
+function queuedCount(): number {
+  return state.queues.interactive.length + state.queues.batch.length;
+}
+
+registerMetrics('gemini_scheduler', () => ({
+  ...state.counts,
+  rps: RPS,
+  burst: BURST,
+  max_concurrency: MAX_CONCURRENCY,
+  active: state.active,
+  queued: queuedCount(),
+  tokens: Number(state.tokens.toFixed(2)),
+  paused_ms: Math.max(0, state.pausedUntil - Date.now()),
+  wait: Object.fromEntries(PRIORITIES.map(priority => {
+    const { started, wait_ms_total, max_wait_ms } = state.waits[priority];
+    return [priority, { started, avg_wait_ms: started ? Math.round(wait_ms_total / started) : 0, max_wait_ms }];
+  })),
+}));
+
+function refill(now: number): void {
+  if (now <= state.refilledAt) return; // refilling resumes when a 429 pause ends
+  state.tokens = Math.min(BURST, state.tokens + ((now - state.refilledAt) * RPS) / 1000);
+  state.refilledAt = now;
+}
+
+function retryAfterSeconds(): number {
+  const pausedMs = Math.max(0, state.pausedUntil - Date.now());
+  return Math.max(1, Math.ceil(pausedMs / 1000 + (queuedCount() + 1) / RPS));
+}
+
+function upstreamStatus(error: unknown): number | undefined {
+  const status = (error as { status?: unknown })?.status;
+  if (typeof status === 'number') return status;
+  // Older SDK errors only carry it in the message: "[429 Too Many Requests] ..."
+  const match = /\[(\d{3})\b/.exec((error as Error)?.message || '');
+  return match ? Number(match[1]) : undefined;
+}
+
+/**
+ * The delay Gemini asked for, from the google.rpc.RetryInfo error detail
+ */
+function retryInfoMs(error: unknown): number | undefined {
+  const details = (error as { errorDetails?: Array<{ '@type'?: string; retryDelay?: string }> })?.errorDetails;
+  const info = details?.find(detail => detail['@type']?.endsWith('RetryInfo'));
+  const seconds = parseFloat(info?.retryDelay ?? '');
+  return Number.isFinite(seconds) ? seconds * 1000 : undefined;
+}
+
+function backoffMs(attempt: number, retryAfterMs?: number): number {
+  // Full jitter; on top of Retry-After, a little spread so waiters don't return together
+  if (retryAfterMs !== undefined) return retryAfterMs + Math.random() * BACKOFF_BASE_MS;
+  return Math.random() * Math.min(BACKOFF_CAP_MS, BACKOFF_BASE_MS * 2 ** attempt);
+}
+
+function dispatch(job: Job, now: number): void {
+  if (job.attempt === 0) {
+    const waited = now - job.enqueuedAt;
+    const waits = state.waits[job.priority];
+    waits.started += 1;
+    waits.wait_ms_total += waited;
+    waits.max_wait_ms = Math.max(waits.max_wait_ms, waited);
+  }
+  state.active += 1;
+  state.counts.upstream_calls += 1;
+
+  job.run().then(
+    (value) => {
+      state.counts.completed += 1;
+      job.resolve(value);
+    },
+    (error) => {
+      const failedAt = Date.now();
+      const status = upstreamStatus(error);
+      const retryAfterMs = status === 429 ? retryInfoMs(error) : undefined;
+      if (status === 429) {
+        state.counts.rate_limited += 1;
+        // Out of quota for everyone: stop starting calls and drop the burst
+        state.pausedUntil = Math.max(state.pausedUntil, failedAt + (retryAfterMs ?? BACKOFF_BASE_MS));
+        state.tokens = 0;
+        state.refilledAt = Math.max(failedAt, state.pausedUntil);
+      } else if (status !== undefined && status >= 500) {
+        state.counts.server_errors += 1;
+      }
+
+      const delay = backoffMs(job.attempt, retryAfterMs);
+      const retryable = status !== undefined && RETRYABLE_STATUS.has(status);
+      if (retryable && job.attempt < MAX_RETRIES && failedAt + delay < job.enqueuedAt + MAX_WAIT_MS) {
+        job.attempt += 1;
+        job.notBefore = failedAt + delay;
+        state.counts.retries += 1;
+        state.queues[job.priority].unshift(job);
+        return;
+      }
+      state.counts.failed += 1;
+      job.reject(error);
+    }
+  ).finally(() => {
+    state.active -= 1;
+    pump();
+  });
+}
+
+/**
+ * Start whatever may start now, then sleep until the next token, retry or
+ * wait deadline
+ */
+function pump(): void {
+  if (state.timer) {
+    clearTimeout(state.timer);
+    state.timer = null;
+  }
+  const now = Date.now();
+  refill(now);
+  let wakeAt = Infinity;
+
+  for (const priority of PRIORITIES) {
+    const queue = state.queues[priority];
+    for (let i = queue.length - 1; i >= 0; i--) {
+      const job = queue[i];
+      const deadline = job.enqueuedAt + MAX_WAIT_MS;
+      if (job.attempt === 0 && deadline <= now) {
+        queue.splice(i, 1);
+        state.counts.rejected_wait += 1;
+        job.reject(new GeminiBusyError(retryAfterSeconds()));
+      } else if (job.attempt === 0) {
+        wakeAt = Math.min(wakeAt, deadline);
+      }
+    }
+  }
+
+  while (state.active < MAX_CONCURRENCY) {
+    let next: { queue: Job[]; index: number } | null = null;
+    for (const priority of PRIORITIES) {
+      const queue = state.queues[priority];
+      const index = queue.findIndex(job => job.notBefore <= now);
+      queue.forEach(job => { if (job.notBefore > now) wakeAt = Math.min(wakeAt, job.notBefore); });
+      if (index >= 0) {
+        next = { queue, index };
+        break;
+      }
+    }
+    if (!next) break;
+    if (now < state.pausedUntil) {
+      wakeAt = Math.min(wakeAt, state.pausedUntil);
+      break;
+    }
+    if (state.tokens < 1) {
+      wakeAt = Math.min(wakeAt, now + ((1 - state.tokens) * 1000) / RPS);
+      break;
+    }
+    state.tokens -= 1;
+    const [job] = next.queue.splice(next.index, 1);
+    dispatch(job, now);
+  }
+
+  if (queuedCount() > 0 && wakeAt < Infinity) {
+    state.timer = setTimeout(pump, Math.max(1, Math.ceil(wakeAt - now)));
+  }
+}
+
+function schedule<T>(run: () => Promise<T>, priority: GeminiPriority): Promise<T> {
+  state.counts.submitted += 1;
+  if (queuedCount() >= MAX_QUEUE) {
+    state.counts.rejected_queue_full += 1;
+    return Promise.reject(new GeminiBusyError(retryAfterSeconds()));
+  }
+  return new Promise<T>((resolve, reject) => {
+    const now = Date.now();
+    state.queues[priority].push({ run, resolve, reject, priority, enqueuedAt: now, notBefore: now, attempt: 0 });
+    state.counts.peak_queued = Math.max(state.counts.peak_queued, queuedCount());
+    pump();
+  });
+}
+
+function requestKey(model: string, request: GeminiRequest): string {
+  return createHash('sha256').update(`${model}\0`).update(JSON.stringify(request)).digest('hex');
+}
+
+/**
+ * model.generateContent(request) through the scheduler; concurrent identical
+ * requests (same model, prompt and inline data) share one upstream call
+ */
+export async function generateContent(
+  request: GeminiRequest,
+  { priority, model = GEMINI_MODEL, scheduled = true }: GeminiCallOptions
+): Promise<GenerateContentResult> {
+  const call = () => genAI.getGenerativeModel({ model }, geminiRequestOptions).generateContent(request);
+  if (!scheduled) {
+    state.counts.unscheduled += 1;
+    return call();
+  }
+
+  const key = requestKey(model, request);
+  const pending = state.inflight.get(key);
+  if (pending) {
+    state.counts.coalesced += 1;
+    return pending as Promise<GenerateContentResult>;
+  }
+  const work = schedule(call, priority).finally(() => state.inflight.delete(key));
+  state.inflight.set(key, work);
+  return work;
+}
+
+/**
+ * model.generateContentStream(request) through the scheduler. Streams are not
+ * shared; the call holds its concurrency slot until the response starts, which
+ * is also when a 429 would arrive.
+ */
+export async function generateContentStream(
+  request: GeminiRequest,
+  { priority, model = GEMINI_MODEL, scheduled = true }: GeminiCallOptions
+): Promise<GenerateContentStreamResult> {
+  const call = () => genAI.getGenerativeModel({ model }, geminiRequestOptions).generateContentStream(request);
+  if (!scheduled) {
+    state.counts.unscheduled += 1;
+    return call();
+  }
+  return schedule(call, priority);
+}
+
+// `X-Gemini-Scheduler: off` calls Gemini directly (benchmarks; needs BENCH_TOGGLES=true)
+export function geminiSchedulerRequested(req: Request): boolean {
+  return benchToggle(req.headers, 'x-gemini-scheduler') !== 'off';
+}
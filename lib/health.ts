@@ -0,0 +1,191 @@
+/**
+ * Liveness and Readiness Probes
+ *
+ * Load balancers poll health every few seconds, and the old GET
+ * /api/health/app opened, pinged and closed a fresh MongoClient per poll.
+ * Probes now go through the shared pool (lib/repos/mongo/connection.ts), and
+ * each dependency's result is reused for HEALTH_CACHE_S; probes that overlap
+ * share one check. Every check is bounded by HEALTH_PROBE_TIMEOUT_MS.
+ *
+ *   liveness  - this process is serving requests; touches no dependency
+ *   readiness - MongoDB answers (required), plus the latency and reachability
+ *               of Supabase Auth, Gemini and Deepgram (reported; a slow or
+ *               unreachable one degrades features but does not fail readiness)
+ */
+
+import { monitorEventLoopDelay } from 'perf_hooks';
+import { getDatabase } from './repos/mongo/connection';
+import { deepgramUrl, geminiUrl } from './upstreams';
+import { processSingleton, registerMetrics } from './metrics';
+
+export type DependencyName = 'mongo' | 'supabase' | 'gemini' | 'deepgram';
+export type DependencyStatus = 'ok' | 'degraded' | 'down' | 'skipped';
+
+export interface DependencyHealth {
+  status: DependencyStatus;
+  required: boolean;
+  latency_ms: number | null;
+  checked_at: string;
+  error?: string;
+}
+
+type ProbeOutcome = Pick<DependencyHealth, 'status' | 'error'>;
+
+const CACHE_MS = Number(process.env.HEALTH_CACHE_S || 5) * 1000;
+const PROBE_TIMEOUT_MS = Number(process.env.HEALTH_PROBE_TIMEOUT_MS || 2000);
+const LOOP_DELAY_WINDOW_MS = 10 * 1000;
+
+interface Cached {
+  result: DependencyHealth;
+  expiresAt: number;
+}
+
+const state = processSingleton('__fitbearHealth', () => {
+  const loopDelay = monitorEventLoopDelay({ resolution: 20 });
+  loopDelay.enable();
+  // Event loop delay over fixed windows, so concurrent pollers all read the same sample
+  const lastWindow = { p99Ms: 0 };
+  setInterval(() => {
+    lastWindow.p99Ms = Number((loopDelay.percentile(99) / 1e6).toFixed(1));
+    loopDelay.reset();
+  }, LOOP_DELAY_WINDOW_MS).unref();
+  return {
+    loopDelay,
+    loopDelayWindow: lastWindow,
+    cache: new Map<DependencyName, Cached>(),
+    inflight: new Map<DependencyName, Promise<DependencyHealth>>(),
+    counts: { readiness_checks: 0, probes: 0, cached: 0, coalesced: 0, failures: 0 },
+  };
+});
+
+registerMetrics('health', () => ({
+  ...state.counts,
+  cache_s: CACHE_MS / 1000,
+  probe_timeout_ms: PROBE_TIMEOUT_MS,
+}));
+
+/**
+ * An HTTP dependency is reachable if it answers at all; 5xx means down, a
+ * rejected key (4xx) means degraded
+ */
+async function httpProbe(url: string, headers: Record<string, string>): Promise<ProbeOutcome> {
+  const response = await fetch(url, { headers, signal: AbortSignal.timeout(PROBE_TIMEOUT_MS), cache: 'no-store' });
+  await response.body?.cancel();
+  if (response.ok) return { status: 'ok' };
+  return {
+    status: response.status >= 500 ? 'down' : 'degraded',
+    error: `HTTP ${response.status}`,
+  };
+}
+
+const PROBES: Record<DependencyName, { required: boolean; check: () => Promise<ProbeOutcome> }> = {
+  mongo: {
+    required: true,
+    async check() {
+      let timer: NodeJS.Timeout | undefined;
+      const timeout = new Promise<never>((_, reject) => {
+        timer = setTimeout(() => reject(new Error(`ping exceeded ${PROBE_TIMEOUT_MS}ms`)), PROBE_TIMEOUT_MS);
+      });
+      // Bounds the first connect too, not just the ping
+      await Promise.race([getDatabase().then(db => db.command({ ping: 1 })), timeout]).finally(() => clearTimeout(timer));
+      return { status: 'ok' };
+    },
+  },
+  supabase: {
+    required: false,
+    async check() {
+      const url = process.env.SUPABASE_URL || process.env.NEXT_PUBLIC_SUPABASE_URL;
+      const key = process.env.SUPABASE_ANON_KEY || process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY;
+      if (!url || !key) return { status: 'skipped', error: 'SUPABASE_URL / SUPABASE_ANON_KEY not set' };
+      return httpProbe(`${url.replace(/\/$/, '')}/auth/v1/health`, { apikey: key });
+    },
+  },
+  gemini: {
+    required: false,
+    async check() {
+      if (!process.env.GEMINI_API_KEY) return { status: 'skipped', error: 'GEMINI_API_KEY not set' };
+      // Listing models is free; it checks reachability and the key without spending quota
+      return httpProbe(geminiUrl('/v1beta/models?pageSize=1'), { 'x-goog-api-key': process.env.GEMINI_API_KEY });
+    },
+  },
+  deepgram: {
+    required: false,
+    async check() {
+      if (!process.env.DEEPGRAM_API_KEY) return { status: 'skipped', error: 'DEEPGRAM_API_KEY not set' };
+      return httpProbe(deepgramUrl('/v1/projects'), { 'Authorization': `Token ${process.env.DEEPGRAM_API_KEY}` });
+    },
+  },
+};
+
+async function runProbe(name: DependencyName): Promise<DependencyHealth> {
+  const { required, check } = PROBES[name];
+  const started = performance.now();
+  state.counts.probes += 1;
+  let outcome: ProbeOutcome;
+  try {
+    outcome = await check();
+  } catch (error) {
+    outcome = { status: 'down', error: (error as Error).message };
+  }
+  if (outcome.status === 'down') state.counts.failures += 1;
+  return {
+    ...outcome,
+    required,
+    latency_ms: outcome.status === 'skipped' ? null : Number((performance.now() - started).toFixed(1)),
+    checked_at: new Date().toISOString(),
+  };
+}
+
+async function probe(name: DependencyName): Promise<DependencyHealth> {
+  const cached = state.cache.get(name);
+  if (cached && cached.expiresAt > Date.now()) {
+    state.counts.cached += 1;
+    return cached.result;
+  }
+  const pending = state.inflight.get(name);
+  if (pending) {
+    state.counts.coalesced += 1;
+    return pending;
+  }
+  const work = runProbe(name)
+    .then(result => {
+      state.cache.set(name, { result, expiresAt: Date.now() + CACHE_MS });
+      return result;
+    })
+    .finally(() => state.inflight.delete(name));
+  state.inflight.set(name, work);
+  return work;
+}
+
+/**
+ * Process vitals only; event loop delay is the p99 of the last completed
+ * LOOP_DELAY_WINDOW_MS window (reading it does not reset anything)
+ */
+export function liveness() {
+  const memory = process.memoryUsage();
+  return {
+    ok: true,
+    uptime_s: Math.round(process.uptime()),
+    event_loop_delay_p99_ms: state.loopDelayWindow.p99Ms,
+    event_loop_delay_window_s: LOOP_DELAY_WINDOW_MS / 1000,
+    rss_mb: Math.round(memory.rss / 1024 / 1024),
+    heap_used_mb: Math.round(memory.heapUsed / 1024 / 1024),
+  };
+}
+
+/**
+ * Every dependency's (possibly cached) probe; ready when all required ones are ok
+ */
+export async function readiness() {
+  state.counts.readiness_checks += 1;
+  const names = Object.keys(PROBES) as DependencyName[];
+  const results = await Promise.all(names.map(name => probe(name)));
+  const dependencies = Object.fromEntries(names.map((name, i) => [name, results[i]])) as Record<DependencyName, DependencyHealth>;
+  const ready = results.every(result => !result.required || result.status === 'ok');
+  return {
+    ready,
+    status: !ready ? 'unavailable' : results.every(r => r.status === 'ok' || r.status === 'skipped') ? 'ok' : 'degraded',
+    dependencies,
+    checked_at: new Date().toISOString(),
+  };
+}
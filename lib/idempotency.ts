@@ -0,0 +1,322 @@
+/**
+ * Idempotency Keys for Log Writes
+ *
+ * A phone on a flaky network retries POST /api/logs and the entry used to be
+ * written twice. A request carrying an idempotency key (the body's
+ * `idempotency_key` or an `Idempotency-Key` header) now claims that key in
+ * the idempotency_keys collection before writing; retries get the stored
+ * response back instead of a second write. Duplicates that arrive while the
+ * first is still running wait for it (in-process on its promise, across
+ * instances by polling the record) rather than racing it.
+ *
+ * Finished responses are also kept in an in-process LRU so the common retry
+ * is answered without a database round trip. If the store is unreachable the
+ * write goes ahead with in-process protection only.
+ */
+
+import { createHash } from 'crypto';
+import { repositories } from './repos';
+import { processSingleton, registerMetrics } from './metrics';
+
+const TTL_MS = Number(process.env.IDEMPOTENCY_TTL_S || 24 * 3600) * 1000;
+// How long a pending claim is honoured before another request may take it over
+const LOCK_MS = Number(process.env.IDEMPOTENCY_LOCK_S || 30) * 1000;
+// How long a duplicate waits for the original before giving up with 409
+const WAIT_MS = Number(process.env.IDEMPOTENCY_WAIT_MS || 10000);
+const POLL_MS = 50;
+const MEMORY_MAX_ENTRIES = Number(process.env.IDEMPOTENCY_MEMORY_MAX_ENTRIES || 1000);
+
+export interface IdempotentResult {
+  status: number;
+  body: any;
+}
+
+export interface IdempotencyOutcome extends IdempotentResult {
+  replayed: boolean;
+}
+
+export class IdempotencyConflictError extends Error {
+  status: 409 | 422;
+
+  constructor(status: 409 | 422, message: string) {
+    super(message);
+    this.name = 'IdempotencyConflictError';
+    this.status = status;
+  }
+}
+
+interface Remembered {
+  result: IdempotentResult;
+  requestHash: string;
+  expiresAt: number;
+}
+
+const state = processSingleton('__fitbearIdempotency', () => ({
+  done: new Map<string, Remembered>(), // Map iteration order doubles as recency order
+  inflight: new Map<string, { requestHash: string; work: Promise<IdempotentResult> }>(),
+  counts: {
+    requests: 0,
+    memory_replays: 0,
+    store_replays: 0,
+    coalesced: 0,
+    waited: 0,
+    takeovers: 0,
+    conflicts: 0,
+    store_errors: 0,
+    lookup_ms_total: 0,
+    lookups: 0,
+  },
+}));
+
+registerMetrics('idempotency', () => {
+  const { counts } = state;
+  return {
+    ...counts,
+    remembered: state.done.size,
+    inflight: state.inflight.size,
+    avg_lookup_ms: counts.lookups ? Number((counts.lookup_ms_total / counts.lookups).toFixed(2)) : 0,
+  };
+});
+
+function requestHash(request: unknown): string {
+  return createHash('sha256').update(JSON.stringify(request ?? null)).digest('hex');
+}
+
+function remember(id: string, result: IdempotentResult, hash: string): void {
+  state.done.delete(id);
+  state.done.set(id, { result, requestHash: hash, expiresAt: Date.now() + TTL_MS });
+  while (state.done.size > MEMORY_MAX_ENTRIES) {
+    state.done.delete(state.done.keys().next().value);
+  }
+}
+
+function recalled(id: string): Remembered | undefined {
+  const entry = state.done.get(id);
+  if (entry && entry.expiresAt <= Date.now()) {
+    state.done.delete(id);
+    return undefined;
+  }
+  return entry;
+}
+
+function checkSameRequest(storedHash: string, hash: string): void {
+  if (storedHash !== hash) {
+    state.counts.conflicts += 1;
+    throw new IdempotencyConflictError(422, 'Idempotency key was already used for a different request');
+  }
+}
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+/**
+ * Claim the key in the store. Returns a stored result to replay, or null when
+ * this request should do the write. Waits while another instance holds it.
+ */
+async function claimOrWait(userId: string, scope: string, key: string, hash: string): Promise<IdempotentResult | null> {
+  const store = repositories.idempotency;
+  const lockedUntil = () => new Date(Date.now() + LOCK_MS);
+  const record = {
+    user_id: userId,
+    scope,
+    key,
+    request_hash: hash,
+    locked_until: lockedUntil(),
+    expires_at: new Date(Date.now() + TTL_MS),
+  };
+
+  let existing = await store.claim(record);
+  const deadline = Date.now() + WAIT_MS;
+  let waited = false;
+
+  while (existing) {
+    checkSameRequest(existing.request_hash, hash);
+    if (existing.state === 'done') {
+      return { status: existing.status_code ?? 200, body: existing.response_json };
+    }
+    if (new Date(existing.locked_until).getTime() < Date.now() && await store.takeOver(userId, scope, key, lockedUntil())) {
+      state.counts.takeovers += 1;
+      return null;
+    }
+    if (Date.now() >= deadline) {
+      state.counts.conflicts += 1;
+      throw new IdempotencyConflictError(409, 'A request with this idempotency key is still in progress');
+    }
+    if (!waited) {
+      waited = true;
+      state.counts.waited += 1;
+    }
+    await sleep(POLL_MS);
+    // Gone means the owner failed and released it: claim it ourselves
+    existing = (await store.find(userId, scope, key)) ?? await store.claim(record);
+  }
+  return null;
+}
+
+async function execute(
+  id: string,
+  userId: string,
+  scope: string,
+  key: string,
+  hash: string,
+  run: () => Promise<IdempotentResult>
+): Promise<IdempotencyOutcome> {
+  let durable = true;
+  const started = Date.now();
+  try {
+    const stored = await claimOrWait(userId, scope, key, hash);
+    if (stored) {
+      state.counts.store_replays += 1;
+      remember(id, stored, hash);
+      return { ...stored, replayed: true };
+    }
+  } catch (error) {
+    if (error instanceof IdempotencyConflictError) throw error;
+    durable = false;
+    state.counts.store_errors += 1;
+    console.warn('Idempotency store unavailable, using in-process protection only:', (error as Error).message);
+  } finally {
+    state.counts.lookups += 1;
+    state.counts.lookup_ms_total += Date.now() - started;
+  }
+
+  let result: IdempotentResult;
+  try {
+    result = await run();
+  } catch (error) {
+    if (durable) void repositories.idempotency.release(userId, scope, key).catch(() => {});
+    throw error;
+  }
+
+  // Server errors are not replayed: free the key so a retry can try again
+  if (result.status >= 500) {
+    if (durable) void repositories.idempotency.release(userId, scope, key).catch(() => {});
+    return { ...result, replayed: false };
+  }
+
+  remember(id, result, hash);
+  if (durable) {
+    try {
+      await repositories.idempotency.complete(userId, scope, key, result.status, result.body, new Date(Date.now() + TTL_MS));
+    } catch (error) {
+      state.counts.store_errors += 1;
+      console.warn('Idempotency record completion failed:', (error as Error).message);
+    }
+  }
+  return { ...result, replayed: false };
+}
+
+/**
+ * Run `run` at most once per (userId, scope, key). `request` is the payload
+ * the key must keep meaning; reusing a key with a different one is a 422.
+ * Without a key, `run` simply executes.
+ */
+export async function withIdempotency(
+  userId: string,
+  scope: string,
+  key: string | null | undefined,
+  request: unknown,
+  run: () => Promise<IdempotentResult>
+): Promise<IdempotencyOutcome> {
+  if (!key) {
+    return { ...(await run()), replayed: false };
+  }
+
+  state.counts.requests += 1;
+  const id = `${scope}:${userId}:${key}`;
+  const hash = requestHash(request);
+
+  const known = recalled(id);
+  if (known) {
+    checkSameRequest(known.requestHash, hash);
+    state.counts.memory_replays += 1;
+    return { ...known.result, replayed: true };
+  }
+
+  const pending = state.inflight.get(id);
+  if (pending) {
+    checkSameRequest(pending.requestHash, hash);
+    state.counts.coalesced += 1;
+    return { ...(await pending.work), replayed: true };
+  }
+
+  const work = execute(id, userId, scope, key, hash, run);
+  state.inflight.set(id, { requestHash: hash, work });
+  try {
+    return await work;
+  } finally {
+    state.inflight.delete(id);
+  }
+}
+
+/**
+ * Per-item idempotency for a batch write. Each item's key is claimed exactly
+ * as if it had been sent on its own (same scope, same request payload), so a
+ * key first seen in a single write replays inside a batch and vice versa.
+ * Keys are claimed one at a time in sorted order, so two overlapping batches
+ * can never wait on each other. `runNew` is called once with the positions
+ * nobody has written yet and returns one result per position; every other
+ * item replays its stored result. A key reused for a different payload, or
+ * still in progress elsewhere, comes back as that item's
+ * IdempotencyConflictError.
+ */
+export async function withIdempotencyEach(
+  userId: string,
+  scope: string,
+  items: { key: string; request: unknown }[],
+  runNew: (positions: number[]) => Promise<IdempotentResult[]>
+): Promise<(IdempotencyOutcome | IdempotencyConflictError)[]> {
+  const outcomes: (IdempotencyOutcome | IdempotencyConflictError)[] = new Array(items.length);
+  const fresh: number[] = [];
+  const pending = new Map<number, { resolve: (result: IdempotentResult) => void; reject: (error: unknown) => void }>();
+  const settled: Promise<void>[] = [];
+  let failure: unknown = null;
+
+  const order = items.map((_, pos) => pos).sort((a, b) => (items[a].key < items[b].key ? -1 : items[a].key > items[b].key ? 1 : 0));
+  for (const pos of order) {
+    // Move on once this key is either ours to write or already answered
+    await new Promise<void>(decided => {
+      const work = withIdempotency(userId, scope, items[pos].key, items[pos].request, () =>
+        new Promise<IdempotentResult>((resolve, reject) => {
+          fresh.push(pos);
+          pending.set(pos, { resolve, reject });
+          decided();
+        })
+      );
+      settled.push(
+        work
+          .then(outcome => { outcomes[pos] = outcome; }, error => {
+            if (error instanceof IdempotencyConflictError) outcomes[pos] = error;
+            else failure ??= error;
+          })
+          .finally(decided)
+      );
+    });
+  }
+
+  fresh.sort((a, b) => a - b);
+  try {
+    const results = await runNew(fresh);
+    fresh.forEach((pos, i) => pending.get(pos)!.resolve(results[i]));
+  } catch (error) {
+    // Releases the claimed keys so a retry can write them
+    for (const { reject } of pending.values()) reject(error);
+    await Promise.all(settled);
+    throw error;
+  }
+
+  await Promise.all(settled);
+  if (failure) throw failure;
+  return outcomes;
+}
+
+/**
+ * `Idempotency-Key` header, falling back to a key sent in the body
+ */
+export function idempotencyKey(req: Request, bodyKey?: unknown): string | null {
+  const key = req.headers.get('idempotency-key') || (typeof bodyKey === 'string' ? bodyKey : '');
+  return key.trim().slice(0, 255) || null;
+}
+
+export function idempotencyHeaders(outcome: IdempotencyOutcome): Record<string, string> {
+  return outcome.replayed ? { 'Idempotent-Replayed': 'true' } : {};
+}
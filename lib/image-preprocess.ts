@@ -0,0 +1,160 @@
+/**
+ * Image Preprocessing for Vision Calls
+ *
+ * Phone photos arrive as 3-12 MB JPEGs (often sideways, with the rotation
+ * only in EXIF). Before base64-encoding an upload for Gemini we decode it,
+ * apply the EXIF orientation, shrink it to a size that still reads well for
+ * OCR, and re-encode it as JPEG. Uses sharp when installed; without it the
+ * original bytes pass through unchanged.
+ */
+
+import { processSingleton, registerMetrics } from './metrics';
+import { benchToggle } from './mode';
+
+export type ImagePurpose = 'menu' | 'meal';
+
+// Longest edge in pixels. Menus keep more resolution for small print.
+const MAX_DIMENSION: Record<ImagePurpose, number> = {
+  menu: Number(process.env.IMAGE_MENU_MAX_DIM || 2048),
+  meal: Number(process.env.IMAGE_MEAL_MAX_DIM || 1280),
+};
+const JPEG_QUALITY: Record<ImagePurpose, number> = {
+  menu: Number(process.env.IMAGE_MENU_JPEG_QUALITY || 85),
+  meal: Number(process.env.IMAGE_MEAL_JPEG_QUALITY || 80),
+};
+const PREPROCESS_ENABLED = (process.env.IMAGE_PREPROCESS ?? 'on').toLowerCase() !== 'off';
+
+export interface PreprocessedImage {
+  data: Buffer;
+  mimeType: string;
+  originalBytes: number;
+  bytes: number;
+  width?: number;
+  height?: number;
+  applied: boolean;
+  reason?: 'disabled' | 'sharp_unavailable' | 'decode_failed' | 'no_gain';
+  ms: number;
+}
+
+const stats = processSingleton('__fitbearImagePreprocessStats', () => ({
+  images: 0,
+  applied: 0,
+  skipped: {} as Record<string, number>,
+  bytes_in: 0,
+  bytes_out: 0,
+  ms_total: 0,
+}));
+
+registerMetrics('image_preprocess', () => ({
+  ...stats,
+  skipped: { ...stats.skipped },
+  bytes_saved: stats.bytes_in - stats.bytes_out,
+  saved_ratio: stats.bytes_in ? Number((1 - stats.bytes_out / stats.bytes_in).toFixed(4)) : 0,
+  avg_ms: stats.images ? Number((stats.ms_total / stats.images).toFixed(1)) : 0,
+  enabled: PREPROCESS_ENABLED,
+}));
+
+let sharpLoader: Promise<any> | null = null;
+
+function loadSharp(): Promise<any> {
+  if (!sharpLoader) {
+    sharpLoader = import('sharp')
+      .then((mod) => mod.default || mod)
+      .catch((error) => {
+        console.warn('sharp not available, image preprocessing disabled:', error.message);
+        return null;
+      });
+  }
+  return sharpLoader;
+}
+
+function record(result: PreprocessedImage): PreprocessedImage {
+  stats.images += 1;
+  stats.bytes_in += result.originalBytes;
+  stats.bytes_out += result.bytes;
+  stats.ms_total += result.ms;
+  if (result.applied) {
+    stats.applied += 1;
+  } else if (result.reason) {
+    stats.skipped[result.reason] = (stats.skipped[result.reason] || 0) + 1;
+  }
+  return result;
+}
+
+/**
+ * The `X-Image-Preprocess: off` request header skips the stage for one
+ * request, so benchmarks can compare both paths against the same server
+ * (with BENCH_TOGGLES=true).
+ */
+export function preprocessRequested(req: Request): boolean {
+  return benchToggle(req.headers, 'x-image-preprocess') !== 'off';
+}
+
+export async function preprocessImage(
+  input: Buffer,
+  mimeType: string,
+  purpose: ImagePurpose,
+  enabled = true
+): Promise<PreprocessedImage> {
+  const started = Date.now();
+  const passthrough = (reason: PreprocessedImage['reason']): PreprocessedImage => record({
+    data: input,
+    mimeType: mimeType || 'image/jpeg',
+    originalBytes: input.length,
+    bytes: input.length,
+    applied: false,
+    reason,
+    ms: Date.now() - started,
+  });
+
+  if (!PREPROCESS_ENABLED || !enabled) {
+    return passthrough('disabled');
+  }
+
+  const sharp = await loadSharp();
+  if (!sharp) {
+    return passthrough('sharp_unavailable');
+  }
+
+  try {
+    const maxDimension = MAX_DIMENSION[purpose];
+    const { data, info } = await sharp(input, { failOn: 'none' })
+      .rotate() // apply EXIF orientation; output carries no orientation tag
+      .resize({ width: maxDimension, height: maxDimension, fit: 'inside', withoutEnlargement: true })
+      .jpeg({ quality: JPEG_QUALITY[purpose], mozjpeg: true })
+      .toBuffer({ resolveWithObject: true });
+
+    if (data.length >= input.length) {
+      // Already small; only worth keeping the re-encode if it fixed the rotation
+      const { orientation } = await sharp(input).metadata();
+      if (!orientation || orientation === 1) {
+        return passthrough('no_gain');
+      }
+    }
+
+    return record({
+      data,
+      mimeType: 'image/jpeg',
+      originalBytes: input.length,
+      bytes: data.length,
+      width: info.width,
+      height: info.height,
+      applied: true,
+      ms: Date.now() - started,
+    });
+  } catch (error) {
+    console.warn('Image preprocessing failed, sending original:', (error as Error).message);
+    return passthrough('decode_failed');
+  }
+}
+
+/**
+ * Response headers describing what the stage did to this upload
+ */
+export function preprocessHeaders(result: PreprocessedImage): Record<string, string> {
+  return {
+    'X-Image-Bytes-In': String(result.originalBytes),
+    'X-Image-Bytes-Out': String(result.bytes),
+    'X-Image-Preprocess': result.applied ? 'applied' : `skipped:${result.reason}`,
+  };
+}
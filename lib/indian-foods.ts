@@ -0,0 +1,63 @@
+/**
+ * Built-in Indian Food Data
+ *
+ * The dishes the app knows without a populated food_items collection. The
+ * food catalog (lib/food-catalog.ts) starts from these and layers
+ * food_items / dish_synonyms on top once they load.
+ */
+
+export interface BuiltinFood {
+  calories: number;
+  protein_g: number;
+  carb_g?: number;
+  fat_g?: number;
+  fiber_g: number;
+  sodium_mg: number;
+  category: string;
+}
+
+// Comprehensive Indian food database (sample)
+export const INDIAN_FOOD_DB: Record<string, BuiltinFood> = {
+  "dal tadka": { calories: 180, protein_g: 9, fiber_g: 8, sodium_mg: 400, category: "dal" },
+  "paneer tikka": { calories: 250, protein_g: 15, fiber_g: 2, sodium_mg: 600, category: "paneer" },
+  "chicken tikka": { calories: 220, protein_g: 25, fiber_g: 1, sodium_mg: 800, category: "chicken" },
+  "butter chicken": { calories: 350, protein_g: 20, fiber_g: 2, sodium_mg: 900, category: "chicken" },
+  "biryani": { calories: 450, protein_g: 12, fiber_g: 3, sodium_mg: 1200, category: "rice" },
+  "roti": { calories: 120, protein_g: 4, fiber_g: 2, sodium_mg: 200, category: "bread" },
+  "naan": { calories: 200, protein_g: 6, fiber_g: 2, sodium_mg: 400, category: "bread" },
+  "rice": { calories: 200, protein_g: 4, fiber_g: 1, sodium_mg: 10, category: "rice" },
+  "idli": { calories: 80, protein_g: 3, fiber_g: 1, sodium_mg: 150, category: "south_indian" },
+  "dosa": { calories: 150, protein_g: 4, fiber_g: 2, sodium_mg: 300, category: "south_indian" },
+  "samosa": { calories: 250, protein_g: 4, fiber_g: 3, sodium_mg: 500, category: "snack" },
+  "chole": { calories: 220, protein_g: 12, fiber_g: 10, sodium_mg: 600, category: "dal" },
+  "rajma": { calories: 200, protein_g: 10, fiber_g: 8, sodium_mg: 500, category: "dal" },
+  "palak paneer": { calories: 180, protein_g: 12, fiber_g: 4, sodium_mg: 700, category: "paneer" },
+  "masala dosa": { calories: 200, protein_g: 6, fiber_g: 3, sodium_mg: 400, category: "south_indian" },
+  "upma": { calories: 160, protein_g: 4, fiber_g: 3, sodium_mg: 350, category: "south_indian" },
+  "poha": { calories: 140, protein_g: 3, fiber_g: 2, sodium_mg: 300, category: "snack" },
+  "paratha": { calories: 250, protein_g: 6, fiber_g: 3, sodium_mg: 500, category: "bread" },
+  "thali": { calories: 600, protein_g: 20, fiber_g: 12, sodium_mg: 1500, category: "complete_meal" }
+};
+
+// Devanagari and Hinglish spellings as they appear on menus
+export const BUILTIN_SYNONYMS: Record<string, string[]> = {
+  "dal tadka": ["दाल तड़का", "dal fry", "daal tadka"],
+  "paneer tikka": ["पनीर टिक्का"],
+  "chicken tikka": ["चिकन टिक्का"],
+  "butter chicken": ["बटर चिकन", "murgh makhani", "murg makhani"],
+  "biryani": ["बिरयानी", "biriyani"],
+  "roti": ["रोटी", "chapati", "phulka"],
+  "naan": ["नान"],
+  "rice": ["चावल", "chawal", "steamed rice", "plain rice"],
+  "idli": ["इडली"],
+  "dosa": ["डोसा", "dosai"],
+  "samosa": ["समोसा"],
+  "chole": ["छोले", "chana masala", "chhole"],
+  "rajma": ["राजमा", "rajma chawal"],
+  "palak paneer": ["पालक पनीर"],
+  "masala dosa": ["मसाला डोसा"],
+  "upma": ["उपमा"],
+  "poha": ["पोहा"],
+  "paratha": ["पराठा", "parantha", "parotta"],
+  "thali": ["थाली"]
+};
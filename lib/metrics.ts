@@ -0,0 +1,60 @@
+/**
+ * In-process Metrics Registry
+ *
+ * Subsystems keep their own counters and register a snapshot function under
+ * a name; GET /api/metrics returns every snapshot. Kept on globalThis so all
+ * route bundles (and dev hot reloads) share one registry.
+ *
+ * The endpoint needs METRICS_TOKEN (as `Authorization: Bearer` or
+ * `X-Metrics-Token`) when one is set; without one it is served outside
+ * production only.
+ */
+
+import { createHash, timingSafeEqual } from 'crypto';
+import { isProduction } from './mode';
+
+type Snapshot = () => Record<string, unknown>;
+
+/**
+ * Shared state that must survive module re-evaluation (route bundles, HMR)
+ */
+export function processSingleton<T>(key: string, create: () => T): T {
+  const g = globalThis as any;
+  if (!(key in g)) {
+    g[key] = create();
+  }
+  return g[key];
+}
+
+const registry = processSingleton('__fitbearMetrics', () => new Map<string, Snapshot>());
+
+export function registerMetrics(name: string, snapshot: Snapshot): void {
+  registry.set(name, snapshot);
+}
+
+function digest(value: string): Buffer {
+  return createHash('sha256').update(value).digest();
+}
+
+export function metricsAccessAllowed(headers: Headers): boolean {
+  const token = process.env.METRICS_TOKEN;
+  if (!token) return !isProduction;
+  const bearer = (headers.get('authorization') || '').replace(/^Bearer\s+/i, '');
+  const presented = headers.get('x-metrics-token') || bearer;
+  return !!presented && timingSafeEqual(digest(presented), digest(token));
+}
+
+export function collectMetrics(): Record<string, unknown> {
+  const out: Record<string, unknown> = {
+    collected_at: new Date().toISOString(),
+    uptime_s: Math.round(process.uptime()),
+  };
+  for (const [name, snapshot] of registry) {
+    try {
+      out[name] = snapshot();
+    } catch (error) {
+      out[name] = { error: (error as Error).message };
+    }
+  }
+  return out;
+}
@@ -2,6 +2,15 @@ export const APP_MODE = process.env.APP_MODE ?? process.env.NEXT_PUBLIC_APP_MODE
 export const isProduction = APP_MODE === "production";
 export const allowMocks =
   String(process.env.ALLOW_MOCKS ?? process.env.NEXT_PUBLIC_ALLOW_MOCKS ?? "false").toLowerCase() === "true";
+// Benchmark request headers (X-Gemini-Scheduler: off, X-OCR-Pool: off, ...) switch
+// protections off, so they are only read with BENCH_TOGGLES=true, never in production
+export const benchTogglesEnabled =
+  !isProduction && String(process.env.BENCH_TOGGLES ?? "false").toLowerCase() === "true";
+
+// Lower-cased value of a benchmark toggle header, "" when toggles are disabled
+export function benchToggle(headers: Headers, name: string): string {
+  return benchTogglesEnabled ? (headers.get(name) || "").toLowerCase() : "";
+}
 
 export function assertNoMock(reason: string) {
   if (isProduction && !allowMocks) {
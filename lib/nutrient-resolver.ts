@@ -0,0 +1,242 @@
+/**
+ * Batched Nutrient Lookup for Menu Scans
+ *
+ * A scanned menu yields dozens of item names, and resolving each one on its
+ * own costs a lookup per item - a database round trip per item once
+ * food_items outgrows the built-in dishes. resolveNutrients() takes every
+ * name from one scan and returns results aligned with the input:
+ *
+ *   1. one pass over the in-memory catalog (lib/food-catalog.ts)
+ *   2. one food_items `canonical_name $in [...]` query for whatever the
+ *      catalog could not place - only while the catalog does not yet hold
+ *      every food_items row (before the first load, or when truncated)
+ *
+ * Names already being fetched by a concurrent scan join that fetch instead of
+ * issuing their own, so simultaneous scans of similar menus share round trips.
+ *
+ * The same dishes turn up on menu after menu, so every outcome - a match or
+ * "not a food" - is kept in a process-wide LRU keyed by the normalized line
+ * (price and portion stripped, transliterated and folded; see menuLineName()
+ * and foldText()). "Paneer Butter Masala ₹280" and "PANEER BUTTER MASALA
+ * (Half) Rs. 180" share one entry and skip both steps. The cache is emptied
+ * whenever the catalog reloads, since food_items or dish_synonyms changed.
+ */
+
+import { repositories } from './repos';
+import { catalogCoversDatabase, getFoodCatalog, menuLineName, storedFood, type CatalogMatch, type FoodCatalog } from './food-catalog';
+import { foldText } from './transliterate';
+import { processSingleton, registerMetrics } from './metrics';
+import { benchToggle } from './mode';
+
+export interface NutrientLookupStats {
+  names: number;
+  unique: number;
+  cache_hits: number;
+  catalog_hits: number;
+  db_round_trips: number;
+  coalesced: number;
+  unresolved: number;
+  took_ms: number;
+}
+
+export interface NutrientLookup {
+  results: (CatalogMatch | null)[]; // aligned with the names passed in
+  stats: NutrientLookupStats;
+}
+
+const LINE_CACHE_MAX_ENTRIES = Number(process.env.MENU_LINE_CACHE_MAX_ENTRIES || 20000);
+
+const state = processSingleton('__fitbearNutrientResolver', () => ({
+  inflight: new Map<string, Promise<CatalogMatch | null>>(),
+  lines: new Map<string, CatalogMatch | null>(), // Map iteration order doubles as recency order
+  linesCatalog: null as FoodCatalog | null, // the catalog the cached lines were resolved against
+  counts: {
+    lookups: 0,
+    names: 0,
+    line_cache_hits: 0,
+    line_cache_misses: 0,
+    line_cache_evictions: 0,
+    line_cache_invalidations: 0,
+    line_cache_bypass: 0,
+    catalog_hits: 0,
+    db_round_trips: 0,
+    db_skipped: 0,
+    db_names: 0,
+    db_hits: 0,
+    coalesced: 0,
+    unresolved: 0,
+    db_errors: 0,
+    lookup_ms_total: 0,
+  },
+}));
+
+registerMetrics('nutrient_resolver', () => {
+  const { counts } = state;
+  const lineLookups = counts.line_cache_hits + counts.line_cache_misses;
+  return {
+    ...counts,
+    inflight: state.inflight.size,
+    line_cache_entries: state.lines.size,
+    line_cache_max_entries: LINE_CACHE_MAX_ENTRIES,
+    line_cache_hit_rate: lineLookups ? Number((counts.line_cache_hits / lineLookups).toFixed(4)) : 0,
+    avg_round_trips_per_lookup: counts.lookups ? Number((counts.db_round_trips / counts.lookups).toFixed(3)) : 0,
+    avg_lookup_ms: counts.lookups ? Number((counts.lookup_ms_total / counts.lookups).toFixed(2)) : 0,
+  };
+});
+
+/**
+ * The cached outcome for a normalized line: a match, null for a line known
+ * not to name a food, or undefined on a miss
+ */
+function cachedLine(key: string): CatalogMatch | null | undefined {
+  const match = state.lines.get(key);
+  if (match === undefined) {
+    state.counts.line_cache_misses += 1;
+    return undefined;
+  }
+  state.counts.line_cache_hits += 1;
+  // Re-insert to mark as most recently used
+  state.lines.delete(key);
+  state.lines.set(key, match);
+  return match;
+}
+
+function storeLine(key: string, match: CatalogMatch | null): void {
+  state.lines.delete(key);
+  state.lines.set(key, match);
+  while (state.lines.size > LINE_CACHE_MAX_ENTRIES) {
+    state.lines.delete(state.lines.keys().next().value as string);
+    state.counts.line_cache_evictions += 1;
+  }
+}
+
+/**
+ * One $in query for `names` (keyed by folded name); names it does not find
+ * are left out of the result. Null if the query failed.
+ */
+async function fetchFromDatabase(names: Map<string, string>): Promise<Map<string, CatalogMatch> | null> {
+  const found = new Map<string, CatalogMatch>();
+  try {
+    const variants = new Set<string>();
+    for (const name of names.values()) {
+      variants.add(name);
+      variants.add(name.toLowerCase());
+    }
+    state.counts.db_round_trips += 1;
+    state.counts.db_names += names.size;
+    for (const item of await repositories.foodItems.findByNames([...variants])) {
+      const key = foldText(item.canonical_name);
+      if (names.has(key) && !found.has(key)) {
+        found.set(key, { food: storedFood(item), score: 1, matched_term: item.canonical_name });
+      }
+    }
+    state.counts.db_hits += found.size;
+  } catch (error) {
+    state.counts.db_errors += 1;
+    console.warn('Nutrient lookup query failed:', (error as Error).message);
+    return null;
+  }
+  return found;
+}
+
+/**
+ * Nutrition for every name from one scan: menu lines (prices and portions are
+ * ignored) or dish names. Unknown names come back as null in their slot.
+ * `cache: false` skips the line cache both ways (X-Menu-Line-Cache: off).
+ */
+export async function resolveNutrients(names: string[], { cache = true }: { cache?: boolean } = {}): Promise<NutrientLookup> {
+  const started = performance.now();
+  const stats: NutrientLookupStats = {
+    names: names.length, unique: 0, cache_hits: 0, catalog_hits: 0, db_round_trips: 0, coalesced: 0, unresolved: 0, took_ms: 0,
+  };
+  const keys = names.map(name => foldText(menuLineName(name)));
+  const resolved = new Map<string, Promise<CatalogMatch | null>>();
+  const toFetch = new Map<string, string>(); // folded key -> cleaned name
+  const catalog = await getFoodCatalog();
+  if (state.linesCatalog !== catalog) {
+    if (state.lines.size) state.counts.line_cache_invalidations += 1;
+    state.lines.clear();
+    state.linesCatalog = catalog;
+  }
+  if (!cache) state.counts.line_cache_bypass += 1;
+  const complete = catalogCoversDatabase(catalog);
+
+  names.forEach((name, i) => {
+    const key = keys[i];
+    if (key.length < 3 || resolved.has(key) || toFetch.has(key)) return;
+    stats.unique += 1;
+
+    const cached = cache ? cachedLine(key) : undefined;
+    if (cached !== undefined) {
+      stats.cache_hits += 1;
+      resolved.set(key, Promise.resolve(cached));
+      return;
+    }
+
+    const match = catalog.matchLine(name);
+    if (match) {
+      stats.catalog_hits += 1;
+      if (cache) storeLine(key, match);
+      resolved.set(key, Promise.resolve(match));
+      return;
+    }
+    if (complete) {
+      // The catalog holds every food_items row: the query could not find it either
+      state.counts.db_skipped += 1;
+      if (cache) storeLine(key, null);
+      resolved.set(key, Promise.resolve(null));
+      return;
+    }
+    const pending = state.inflight.get(key);
+    if (pending) {
+      stats.coalesced += 1;
+      resolved.set(key, pending);
+      return;
+    }
+    toFetch.set(key, menuLineName(name));
+  });
+
+  if (toFetch.size) {
+    stats.db_round_trips = 1;
+    const batch = fetchFromDatabase(toFetch);
+    for (const key of toFetch.keys()) {
+      const result = batch.then(found => {
+        // A failed query says nothing about the line, so it is not cached
+        if (found && cache && state.linesCatalog === catalog) storeLine(key, found.get(key) ?? null);
+        return found?.get(key) ?? null;
+      });
+      state.inflight.set(key, result);
+      resolved.set(key, result);
+    }
+    batch.finally(() => {
+      for (const key of toFetch.keys()) state.inflight.delete(key);
+    });
+  }
+
+  const results = await Promise.all(keys.map(key => resolved.get(key) ?? Promise.resolve(null)));
+  stats.unresolved = results.filter(result => !result).length;
+  stats.took_ms = Number((performance.now() - started).toFixed(2));
+
+  state.counts.lookups += 1;
+  state.counts.names += stats.names;
+  state.counts.catalog_hits += stats.catalog_hits;
+  state.counts.coalesced += stats.coalesced;
+  state.counts.unresolved += stats.unresolved;
+  state.counts.lookup_ms_total += stats.took_ms;
+  return { results, stats };
+}
+
+// `X-Menu-Line-Cache: off` skips the line cache (benchmarks; needs BENCH_TOGGLES=true)
+export function lineCacheRequested(req: Request): boolean {
+  return benchToggle(req.headers, 'x-menu-line-cache') !== 'off';
+}
+
+export function nutrientLookupHeaders(stats: NutrientLookupStats | null): Record<string, string> {
+  return {
+    'X-Nutrient-Names': String(stats?.names ?? 0),
+    'X-Nutrient-DB-Round-Trips': String(stats?.db_round_trips ?? 0),
+    'X-Nutrient-Coalesced': String(stats?.coalesced ?? 0),
+    'X-Nutrient-Cache-Hits': String(stats?.cache_hits ?? 0),
+    'X-Nutrient-Lookup-Ms': String(stats?.took_ms ?? 0),
+  };
+}
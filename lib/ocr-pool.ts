@@ -0,0 +1,212 @@
+/**
+ * Tesseract Worker Pool for the OCR Fallback
+ *
+ * The Tesseract path runs when Gemini Vision fails - usually because it is
+ * rate-limiting us, i.e. under peak load. Creating a worker loads the eng+hin
+ * traineddata (seconds of CPU and memory), so workers are created once,
+ * kept warm and reused. At most TESSERACT_POOL_SIZE recognitions run at a
+ * time; up to TESSERACT_QUEUE_MAX more wait in line and anything beyond that
+ * is rejected at once with OcrPoolBusyError (surfaced as 503 + Retry-After).
+ * A recognition that takes longer than TESSERACT_RECOGNIZE_TIMEOUT_MS fails
+ * and its worker is replaced, so a stuck job cannot hold a slot forever.
+ * Workers are prewarmed at server startup (instrumentation.ts).
+ */
+
+import { createWorker } from 'tesseract.js';
+import { processSingleton, registerMetrics } from './metrics';
+import { benchToggle } from './mode';
+
+type TesseractWorker = Awaited<ReturnType<typeof createWorker>>;
+
+const LANGUAGES = 'eng+hin';
+const POOL_SIZE = Math.max(1, Number(process.env.TESSERACT_POOL_SIZE || 2));
+const MAX_QUEUE = Math.max(0, Number(process.env.TESSERACT_QUEUE_MAX || 8));
+const RECOGNIZE_TIMEOUT_MS = Math.max(1000, Number(process.env.TESSERACT_RECOGNIZE_TIMEOUT_MS || 30000));
+const PARAMETERS = {
+  tessedit_page_seg_mode: '6',
+  tessedit_char_whitelist: 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 .-₹',
+};
+
+export class OcrPoolBusyError extends Error {
+  retryAfterS: number;
+
+  constructor(retryAfterS: number) {
+    super('OCR fallback is at capacity, retry shortly');
+    this.name = 'OcrPoolBusyError';
+    this.retryAfterS = retryAfterS;
+  }
+}
+
+interface Waiter {
+  resolve: (worker: TesseractWorker) => void;
+  reject: (error: Error) => void;
+  enqueuedAt: number;
+}
+
+const pool = processSingleton('__fitbearOcrPool', () => ({
+  idle: [] as TesseractWorker[],
+  size: 0, // workers alive or being created
+  active: 0,
+  queue: [] as Waiter[],
+  stats: {
+    completed: 0,
+    failed: 0,
+    rejected: 0,
+    one_shot: 0,
+    timed_out: 0,
+    workers_created: 0,
+    wait_ms_total: 0,
+    recognize_ms_total: 0,
+  },
+}));
+
+registerMetrics('ocr_pool', () => {
+  const { stats } = pool;
+  return {
+    ...stats,
+    pool_size: POOL_SIZE,
+    max_queue: MAX_QUEUE,
+    recognize_timeout_ms: RECOGNIZE_TIMEOUT_MS,
+    workers: pool.size,
+    idle: pool.idle.length,
+    active: pool.active,
+    queued: pool.queue.length,
+    avg_wait_ms: stats.completed ? Math.round(stats.wait_ms_total / stats.completed) : 0,
+    avg_recognize_ms: stats.completed ? Math.round(stats.recognize_ms_total / stats.completed) : 0,
+  };
+});
+
+async function spawnWorker(): Promise<TesseractWorker> {
+  const worker = await createWorker(LANGUAGES, 1);
+  await worker.setParameters(PARAMETERS as any);
+  pool.stats.workers_created += 1;
+  return worker;
+}
+
+async function recognizeWithTimeout(worker: TesseractWorker, image: Buffer): Promise<{ text: string; confidence: number }> {
+  let timer: NodeJS.Timeout | undefined;
+  const timeout = new Promise<never>((_, reject) => {
+    timer = setTimeout(() => {
+      pool.stats.timed_out += 1;
+      reject(new Error(`Tesseract recognition timed out after ${RECOGNIZE_TIMEOUT_MS} ms`));
+    }, RECOGNIZE_TIMEOUT_MS);
+  });
+  try {
+    const { data: { text, confidence } } = await Promise.race([worker.recognize(image), timeout]);
+    return { text, confidence };
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
+function retryAfterSeconds(): number {
+  const { completed, recognize_ms_total } = pool.stats;
+  const avgMs = completed ? recognize_ms_total / completed : 3000;
+  return Math.max(1, Math.ceil(((pool.queue.length + 1) / POOL_SIZE) * avgMs / 1000));
+}
+
+async function acquire(): Promise<TesseractWorker> {
+  const idle = pool.idle.pop();
+  if (idle) return idle;
+
+  if (pool.size < POOL_SIZE) {
+    pool.size += 1;
+    try {
+      return await spawnWorker();
+    } catch (error) {
+      pool.size -= 1;
+      throw error;
+    }
+  }
+
+  if (pool.queue.length >= MAX_QUEUE) {
+    pool.stats.rejected += 1;
+    throw new OcrPoolBusyError(retryAfterSeconds());
+  }
+
+  return new Promise((resolve, reject) => {
+    pool.queue.push({ resolve, reject, enqueuedAt: Date.now() });
+  });
+}
+
+function release(worker: TesseractWorker): void {
+  const next = pool.queue.shift();
+  if (next) {
+    pool.stats.wait_ms_total += Date.now() - next.enqueuedAt;
+    next.resolve(worker);
+  } else {
+    pool.idle.push(worker);
+  }
+}
+
+function discard(worker: TesseractWorker): void {
+  worker.terminate().catch(() => {});
+  pool.size -= 1;
+
+  // Replace it for whoever is waiting rather than leaving them stranded
+  const next = pool.queue.shift();
+  if (next) {
+    pool.size += 1;
+    spawnWorker().then(next.resolve, (error) => {
+      pool.size -= 1;
+      next.reject(error);
+    });
+  }
+}
+
+/**
+ * Recognize text on a pooled worker. Throws OcrPoolBusyError when the queue is full.
+ */
+export async function recognizeWithPool(image: Buffer): Promise<{ text: string; confidence: number }> {
+  const worker = await acquire();
+  pool.active += 1;
+  const started = Date.now();
+  try {
+    const { text, confidence } = await recognizeWithTimeout(worker, image);
+    pool.stats.completed += 1;
+    pool.stats.recognize_ms_total += Date.now() - started;
+    release(worker);
+    return { text, confidence };
+  } catch (error) {
+    pool.stats.failed += 1;
+    discard(worker); // a worker that threw or timed out may be wedged
+    throw error;
+  } finally {
+    pool.active -= 1;
+  }
+}
+
+/**
+ * The pre-pool behaviour: a fresh worker per call. Kept for benchmarks
+ * (X-OCR-Pool: off) so both paths can be measured against one server.
+ */
+export async function recognizeOneShot(image: Buffer): Promise<{ text: string; confidence: number }> {
+  pool.stats.one_shot += 1;
+  const worker = await spawnWorker();
+  try {
+    return await recognizeWithTimeout(worker, image);
+  } finally {
+    await worker.terminate();
+  }
+}
+
+// `X-OCR-Pool: off` spawns a worker per request (benchmarks; needs BENCH_TOGGLES=true)
+export function ocrPoolRequested(req: Request): boolean {
+  return benchToggle(req.headers, 'x-ocr-pool') !== 'off';
+}
+
+/**
+ * Start idle workers up to the pool size so the first fallback is not cold
+ */
+export async function warmOcrPool(): Promise<void> {
+  const missing = POOL_SIZE - pool.size;
+  const starting = [];
+  for (let i = 0; i < missing; i++) {
+    pool.size += 1;
+    starting.push(spawnWorker().then(release, (error) => {
+      pool.size -= 1;
+      console.warn('Tesseract worker warm-up failed:', error.message);
+    }));
+  }
+  await Promise.all(starting);
+}
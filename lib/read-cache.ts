@@ -0,0 +1,168 @@
+/**
+ * Per-user Read Cache with Conditional GET
+ *
+ * The app polls GET /api/me, /api/me/profile and /api/me/targets on every
+ * screen switch, and each poll re-read Mongo for documents that rarely
+ * change. Serialized responses are now kept per user for READ_CACHE_TTL_S
+ * and carry a strong ETag (a hash of the exact body bytes). A client that
+ * sends the ETag back in If-None-Match gets a bodyless 304 when nothing
+ * changed.
+ *
+ * Writes through updateUserProfile / upsertDailyTargets call
+ * invalidateUserReads(), which gives the user a new generation so every
+ * cached read for that user misses from then on. A generation is forgotten
+ * one TTL after it was set, when every entry cached before it has expired.
+ * Other server instances are not told; the TTL bounds how long they can
+ * serve the old document.
+ */
+
+import { createHash } from 'crypto';
+import { processSingleton, registerMetrics } from './metrics';
+
+const TTL_MS = Number(process.env.READ_CACHE_TTL_S || 30) * 1000;
+const MAX_ENTRIES = Number(process.env.READ_CACHE_MAX_ENTRIES || 5000);
+
+export type ReadKind = 'profile' | 'targets';
+
+interface Entry {
+  body: string;
+  etag: string;
+  expiresAt: number;
+}
+
+const state = processSingleton('__fitbearReadCache', () => ({
+  entries: new Map<string, Entry>(), // Map iteration order doubles as recency order
+  // user -> generation, in the order they were set (so oldest first); absent means 0
+  generations: new Map<string, { generation: number; expiresAt: number }>(),
+  nextGeneration: 0, // never reused, so a forgotten generation cannot come back
+  counts: {
+    hits: 0,
+    misses: 0,
+    not_modified: 0,
+    uncacheable: 0,
+    invalidations: 0,
+    evictions: 0,
+  },
+}));
+
+registerMetrics('read_cache', () => {
+  const { counts } = state;
+  const lookups = counts.hits + counts.misses;
+  return {
+    ...counts,
+    entries: state.entries.size,
+    generations: state.generations.size,
+    ttl_s: TTL_MS / 1000,
+    hit_rate: lookups ? Number((counts.hits / lookups).toFixed(3)) : 0,
+  };
+});
+
+const UNCACHEABLE = Symbol('uncacheable');
+
+interface Uncacheable {
+  [UNCACHEABLE]: true;
+  value: unknown;
+}
+
+/**
+ * Mark a `load` result that should be served once but never stored (e.g.
+ * demo data standing in for a failed database read)
+ */
+export function uncacheable(value: unknown): Uncacheable {
+  return { [UNCACHEABLE]: true, value };
+}
+
+function isUncacheable(value: unknown): value is Uncacheable {
+  return typeof value === 'object' && value !== null && UNCACHEABLE in value;
+}
+
+function entryKey(kind: ReadKind, userId: string, variant: string): string {
+  return `${kind}:${userId}:${state.generations.get(userId)?.generation ?? 0}:${variant}`;
+}
+
+// Entries from before a generation expire within TTL_MS of it; past that it can go
+function pruneGenerations(now: number): void {
+  for (const [userId, { expiresAt }] of state.generations) {
+    if (expiresAt > now) break;
+    state.generations.delete(userId);
+  }
+}
+
+function strongEtag(body: string): string {
+  return `"${createHash('sha1').update(body).digest('base64url')}"`;
+}
+
+function matchesEtag(req: Request, etag: string): boolean {
+  const header = req.headers.get('if-none-match');
+  if (!header) return false;
+  return header.trim() === '*' || header.split(',').some(tag => tag.trim() === etag);
+}
+
+function store(key: string, body: string): Entry {
+  const entry = { body, etag: strongEtag(body), expiresAt: Date.now() + TTL_MS };
+  state.entries.delete(key);
+  state.entries.set(key, entry);
+  while (state.entries.size > MAX_ENTRIES) {
+    state.entries.delete(state.entries.keys().next().value);
+    state.counts.evictions += 1;
+  }
+  return entry;
+}
+
+/**
+ * The JSON response for one of a user's reads, from the cache or `load`;
+ * 304 when the request's If-None-Match already names the current body. A
+ * result wrapped in uncacheable() is sent with no-store and no ETag.
+ */
+export async function cachedRead(
+  req: Request,
+  kind: ReadKind,
+  userId: string,
+  variant: string,
+  load: () => Promise<unknown>
+): Promise<Response> {
+  const key = entryKey(kind, userId, variant);
+  let entry = state.entries.get(key);
+  let outcome: 'hit' | 'miss' = 'hit';
+
+  if (entry && entry.expiresAt > Date.now()) {
+    state.counts.hits += 1;
+  } else {
+    outcome = 'miss';
+    state.counts.misses += 1;
+    const loaded = await load();
+    if (isUncacheable(loaded)) {
+      state.counts.uncacheable += 1;
+      return new Response(JSON.stringify(loaded.value), {
+        headers: { 'Content-Type': 'application/json', 'Cache-Control': 'no-store', 'X-Read-Cache': 'bypass' }
+      });
+    }
+    entry = store(key, JSON.stringify(loaded));
+  }
+
+  const headers = {
+    'ETag': entry.etag,
+    // Always revalidate; the ETag makes that a bodyless 304 when nothing changed
+    'Cache-Control': 'private, no-cache',
+    'X-Read-Cache': outcome,
+  };
+  if (matchesEtag(req, entry.etag)) {
+    state.counts.not_modified += 1;
+    return new Response(null, { status: 304, headers });
+  }
+  return new Response(entry.body, {
+    headers: { ...headers, 'Content-Type': 'application/json' }
+  });
+}
+
+/**
+ * Drop everything cached for `userId` (after a profile or targets write)
+ */
+export function invalidateUserReads(userId: string): void {
+  const now = Date.now();
+  pruneGenerations(now);
+  state.nextGeneration += 1;
+  state.generations.delete(userId);
+  state.generations.set(userId, { generation: state.nextGeneration, expiresAt: now + TTL_MS });
+  state.counts.invalidations += 1;
+}
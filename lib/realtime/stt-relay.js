@@ -0,0 +1,230 @@
+/**
+ * Streaming Speech-to-Text Relay
+ *
+ * GET /api/stt/stream upgrades to a WebSocket (through server.js; Next.js
+ * route handlers cannot). The client sends audio as binary messages while the
+ * user is still talking, then {"type":"stop"} at the end of speech. Each
+ * session opens one live-transcription socket to Deepgram (wss .../v1/listen,
+ * or the DEEPGRAM_BASE_URL stand-in), relays the audio as it arrives, and
+ * pushes transcripts back as soon as Deepgram has them:
+ *
+ *   {"type":"transcript","text":"two rotis","is_final":false}
+ *   {"type":"transcript","text":"two rotis and a katori of dal","is_final":true}
+ *   {"type":"done","text":"two rotis and a katori of dal","finalize_ms":180}
+ *
+ * "done" joins the final segments; finalize_ms is the time from the client's
+ * stop to Deepgram's last result. Raw PCM needs `?encoding=linear16&
+ * sample_rate=16000` on the URL; containerized audio (WebM/Opus from
+ * MediaRecorder, WAV) needs nothing. POST /api/stt is unchanged and stays the
+ * fallback where WebSockets are unavailable.
+ *
+ * Both legs use `ws`: the client leg through a noServer WebSocketServer
+ * (server.js hands it the upgrade), the Deepgram leg as a plain `ws` client.
+ */
+
+const { WebSocket, WebSocketServer } = require('ws');
+
+const STT_STREAM_PATH = '/api/stt/stream';
+// Largest single message either side may send; bigger ones close the socket with 1009
+const MAX_MESSAGE_BYTES = 4 * 1024 * 1024;
+// How long the Deepgram handshake may take before the session fails
+const UPSTREAM_HANDSHAKE_MS = 10000;
+
+const DEFAULT_MODEL = 'nova-2';
+// Query parameters a client may pass through to Deepgram
+const UPSTREAM_PARAMS = ['model', 'language', 'encoding', 'sample_rate', 'channels'];
+// Deepgram closes a live socket after ~10s without audio; nudge it before then
+const KEEPALIVE_MS = 5000;
+const MAX_SESSION_MS = Number(process.env.STT_STREAM_MAX_S || 120) * 1000;
+// Audio held while the Deepgram socket is still connecting; a session past it is closed
+const MAX_PENDING_BYTES = Number(process.env.STT_STREAM_MAX_PENDING_KB || 1024) * 1024;
+
+// Same registry lib/metrics.ts keeps on globalThis, so GET /api/metrics reports the relay
+const metricsRegistry = globalThis.__fitbearMetrics || (globalThis.__fitbearMetrics = new Map());
+const counts = globalThis.__fitbearSttStream || (globalThis.__fitbearSttStream = {
+  sessions: 0,
+  active: 0,
+  upstream_errors: 0,
+  pending_overflows: 0,
+  audio_bytes: 0,
+  interim_results: 0,
+  final_results: 0,
+  finalized: 0,
+  finalize_ms_total: 0,
+  max_finalize_ms: 0,
+});
+
+metricsRegistry.set('stt_stream', () => ({
+  ...counts,
+  avg_finalize_ms: counts.finalized ? Number((counts.finalize_ms_total / counts.finalized).toFixed(1)) : 0,
+}));
+
+// Client sockets are accepted here; server.js owns the HTTP server
+const wss = new WebSocketServer({ noServer: true, maxPayload: MAX_MESSAGE_BYTES });
+
+function sendJson(socket, value) {
+  if (socket.readyState === WebSocket.OPEN) socket.send(JSON.stringify(value));
+}
+
+function upstreamUrl(query) {
+  const base = (process.env.DEEPGRAM_BASE_URL || 'https://api.deepgram.com')
+    .replace(/\/$/, '')
+    .replace(/^http/, 'ws');
+  const params = new URLSearchParams({ model: DEFAULT_MODEL, interim_results: 'true', smart_format: 'true' });
+  for (const name of UPSTREAM_PARAMS) {
+    const value = query.get(name);
+    if (value) params.set(name, value);
+  }
+  return `${base}/v1/listen?${params}`;
+}
+
+function runSession(client, query) {
+  const pending = []; // audio that arrived before the upstream socket opened
+  let pendingBytes = 0;
+  const finals = [];
+  let upstream = null; // set once the Deepgram socket is open
+  let stoppedAt = null;
+  let lastAudioAt = Date.now();
+  let done = false;
+
+  counts.sessions += 1;
+  counts.active += 1;
+
+  // Dial Deepgram straight away; audio is held in `pending` until it opens
+  const connecting = new WebSocket(upstreamUrl(query), {
+    headers: { 'Authorization': `Token ${process.env.DEEPGRAM_API_KEY}` },
+    handshakeTimeout: UPSTREAM_HANDSHAKE_MS,
+    maxPayload: MAX_MESSAGE_BYTES,
+    perMessageDeflate: false,
+  });
+
+  const stop = () => {
+    if (stoppedAt !== null) return;
+    stoppedAt = Date.now();
+    // CloseStream makes Deepgram flush its final results, then close
+    if (upstream) sendJson(upstream, { type: 'CloseStream' });
+  };
+
+  // False if the session already ended
+  const end = () => {
+    if (done) return false;
+    done = true;
+    counts.active -= 1;
+    clearInterval(keepalive);
+    clearTimeout(deadline);
+    return true;
+  };
+
+  const finish = (error) => {
+    if (!end()) return;
+    if (error) {
+      counts.upstream_errors += 1;
+      sendJson(client, { type: 'error', error });
+      client.close(1011, 'Upstream error');
+    } else {
+      const finalizeMs = stoppedAt === null ? null : Date.now() - stoppedAt;
+      if (finalizeMs !== null) {
+        counts.finalized += 1;
+        counts.finalize_ms_total += finalizeMs;
+        counts.max_finalize_ms = Math.max(counts.max_finalize_ms, finalizeMs);
+      }
+      sendJson(client, { type: 'done', text: finals.join(' '), finalize_ms: finalizeMs });
+      client.close(1000);
+    }
+    connecting.terminate();
+  };
+
+  const overflow = () => {
+    if (!end()) return;
+    counts.pending_overflows += 1;
+    pending.length = 0;
+    sendJson(client, { type: 'error', error: 'Too much audio before the transcription service connected' });
+    client.close(1009, 'Too much buffered audio');
+    connecting.terminate();
+  };
+
+  const keepalive = setInterval(() => {
+    if (upstream && stoppedAt === null && Date.now() - lastAudioAt >= KEEPALIVE_MS) {
+      sendJson(upstream, { type: 'KeepAlive' });
+    }
+  }, KEEPALIVE_MS);
+  const deadline = setTimeout(stop, MAX_SESSION_MS);
+
+  client.on('message', (data, isBinary) => {
+    if (isBinary) {
+      if (stoppedAt !== null) return;
+      lastAudioAt = Date.now();
+      counts.audio_bytes += data.length;
+      if (upstream) {
+        if (upstream.readyState === WebSocket.OPEN) upstream.send(data);
+      } else if ((pendingBytes += data.length) > MAX_PENDING_BYTES) {
+        overflow();
+      } else {
+        pending.push(data);
+      }
+      return;
+    }
+    try {
+      if (JSON.parse(data).type === 'stop') stop();
+    } catch {
+      // Only {"type":"stop"} is meaningful as text
+    }
+  });
+  client.on('close', () => {
+    if (end()) connecting.terminate();
+  });
+
+  connecting.on('open', () => {
+    if (done) {
+      connecting.close();
+      return;
+    }
+    upstream = connecting;
+    for (const chunk of pending.splice(0)) upstream.send(chunk);
+    if (stoppedAt !== null) sendJson(upstream, { type: 'CloseStream' });
+  });
+  connecting.on('message', (data, isBinary) => {
+    if (isBinary) return;
+    let result;
+    try {
+      result = JSON.parse(data);
+    } catch {
+      return;
+    }
+    if (result.type !== 'Results') return;
+    const text = result.channel?.alternatives?.[0]?.transcript || '';
+    if (result.is_final) {
+      counts.final_results += 1;
+      if (text) finals.push(text);
+    } else {
+      counts.interim_results += 1;
+    }
+    if (text) sendJson(client, { type: 'transcript', text, is_final: !!result.is_final });
+  });
+  connecting.on('error', error => {
+    console.error('STT stream upstream error:', error.message);
+    // Before the handshake completes there is no 'close' to finish on
+    if (!upstream) finish(`Deepgram streaming error: ${error.message}`);
+  });
+  connecting.on('close', () => finish(null));
+}
+
+function rejectUpgrade(socket, status, message) {
+  socket.end(`HTTP/1.1 ${status} ${message}\r\nConnection: close\r\nContent-Length: 0\r\n\r\n`);
+}
+
+/**
+ * Handler for the HTTP server's 'upgrade' event on STT_STREAM_PATH
+ */
+function handleSttUpgrade(req, socket, head) {
+  if (!process.env.DEEPGRAM_API_KEY) {
+    rejectUpgrade(socket, 503, 'Service Unavailable');
+    return;
+  }
+  wss.handleUpgrade(req, socket, head, client => {
+    client.on('error', error => console.error('STT stream client error:', error.message));
+    runSession(client, new URL(req.url, 'http://localhost').searchParams);
+  });
+}
+
+module.exports = { STT_STREAM_PATH, handleSttUpgrade };
@@ -8,7 +8,10 @@ import {
   IFoodLogsRepository, 
   IOcrScansRepository,
   IPhotoAnalysesRepository,
-  IFoodItemsRepository 
+  IFoodItemsRepository,
+  IDishSynonymsRepository,
+  IDailyRollupsRepository,
+  IIdempotencyRepository
 } from './types';
 
 // Import implementations
@@ -18,6 +21,9 @@ import { MongoFoodLogsRepository } from './mongo/food-logs';
 import { MongoOcrScansRepository } from './mongo/ocr-scans';
 import { MongoPhotoAnalysesRepository } from './mongo/photo-analyses';
 import { MongoFoodItemsRepository } from './mongo/food-items';
+import { MongoDishSynonymsRepository } from './mongo/dish-synonyms';
+import { MongoDailyRollupsRepository } from './mongo/daily-rollups';
+import { MongoIdempotencyRepository } from './mongo/idempotency';
 
 // Supabase stubs (TODO: implement for M1)
 import { SupabaseProfileRepository } from './supabase/profiles';
@@ -26,6 +32,9 @@ import { SupabaseFoodLogsRepository } from './supabase/food-logs';
 import { SupabaseOcrScansRepository } from './supabase/ocr-scans';
 import { SupabasePhotoAnalysesRepository } from './supabase/photo-analyses';
 import { SupabaseFoodItemsRepository } from './supabase/food-items';
+import { SupabaseDishSynonymsRepository } from './supabase/dish-synonyms';
+import { SupabaseDailyRollupsRepository } from './supabase/daily-rollups';
+import { SupabaseIdempotencyRepository } from './supabase/idempotency';
 
 const DB_PROVIDER = process.env.DB_PROVIDER || 'mongo';
 
@@ -39,6 +48,9 @@ function createRepositories() {
       ocrScans: new SupabaseOcrScansRepository(),
       photoAnalyses: new SupabasePhotoAnalysesRepository(),
       foodItems: new SupabaseFoodItemsRepository(),
+      dishSynonyms: new SupabaseDishSynonymsRepository(),
+      dailyRollups: new SupabaseDailyRollupsRepository(),
+      idempotency: new SupabaseIdempotencyRepository(),
     };
   }
   
@@ -50,9 +62,15 @@ function createRepositories() {
     ocrScans: new MongoOcrScansRepository(),
     photoAnalyses: new MongoPhotoAnalysesRepository(),
     foodItems: new MongoFoodItemsRepository(),
+    dishSynonyms: new MongoDishSynonymsRepository(),
+    dailyRollups: new MongoDailyRollupsRepository(),
+    idempotency: new MongoIdempotencyRepository(),
   };
 }
 
+export { InvalidCursorError } from './types';
+export { rollupDate } from './mongo/daily-rollups';
+
 // Export singleton repositories
 export const repositories = createRepositories();
 
@@ -63,4 +81,7 @@ export type Repositories = {
   ocrScans: IOcrScansRepository;
   photoAnalyses: IPhotoAnalysesRepository;
   foodItems: IFoodItemsRepository;
+  dishSynonyms: IDishSynonymsRepository;
+  dailyRollups: IDailyRollupsRepository;
+  idempotency: IIdempotencyRepository;
 };
\ No newline at end of file
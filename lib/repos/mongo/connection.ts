@@ -1,31 +1,170 @@
 /**
- * MongoDB Connection Singleton
+ * MongoDB Connection Manager
+ *
+ * The one MongoClient (and so the one connection pool) per process, shared by
+ * the repositories and the catch-all API route. The pool is sized by
+ * MONGO_MAX_POOL_SIZE, keeps MONGO_MIN_POOL_SIZE connections open (opened up
+ * front by warmMongoPool() from instrumentation.ts), and a request that waits
+ * longer than MONGO_WAIT_QUEUE_TIMEOUT_MS for a connection fails instead of
+ * queueing indefinitely.
+ *
+ * Pool events are counted and exported as "mongo_pool" at GET /api/metrics:
+ * connections checked out, time spent waiting for one, and wait timeouts.
  */
 
 import { MongoClient, Db } from 'mongodb';
+import { processSingleton, registerMetrics } from '../../metrics';
+import { isProduction } from '../../mode';
 
-let client: MongoClient | null = null;
-let database: Db | null = null;
+const DEFAULT_MONGO_URL = 'mongodb://localhost:27017';
+const MONGO_URL = process.env.MONGO_URL || process.env.MONGODB_URI || DEFAULT_MONGO_URL;
+const DB_NAME = process.env.DB_NAME || process.env.MONGODB_DB || 'your_database_name';
 
-const MONGO_URL = process.env.MONGO_URL || 'mongodb://localhost:27017';
-const DB_NAME = process.env.DB_NAME || 'your_database_name';
+const MAX_POOL_SIZE = Number(process.env.MONGO_MAX_POOL_SIZE || 50);
+const MIN_POOL_SIZE = Math.min(Number(process.env.MONGO_MIN_POOL_SIZE || 5), MAX_POOL_SIZE);
+const WAIT_QUEUE_TIMEOUT_MS = Number(process.env.MONGO_WAIT_QUEUE_TIMEOUT_MS || 3000);
+// Checkouts that waited at least this long are counted as slow
+const SLOW_CHECKOUT_MS = 100;
+
+const state = processSingleton('__fitbearMongo', () => ({
+  client: null as MongoClient | null,
+  connecting: null as Promise<MongoClient> | null,
+  waitStarts: [] as number[], // checkout start times, oldest first (the wait queue is FIFO)
+  counts: {
+    connections_open: 0,
+    checked_out: 0,
+    peak_checked_out: 0,
+    waiting: 0,
+    peak_waiting: 0,
+    checkouts: 0,
+    checkout_failures: 0,
+    wait_timeouts: 0,
+    slow_checkouts: 0,
+    wait_ms_total: 0,
+    max_wait_ms: 0,
+    pool_cleared: 0,
+  },
+}));
+
+/**
+ * Pool size, checkouts and wait times (the "mongo_pool" metrics section)
+ */
+export function mongoPoolStats(): Record<string, unknown> {
+  const { counts } = state;
+  return {
+    connected: !!state.client,
+    max_pool_size: MAX_POOL_SIZE,
+    min_pool_size: MIN_POOL_SIZE,
+    wait_queue_timeout_ms: WAIT_QUEUE_TIMEOUT_MS,
+    ...counts,
+    avg_wait_ms: counts.checkouts ? Number((counts.wait_ms_total / counts.checkouts).toFixed(2)) : 0,
+  };
+}
+
+registerMetrics('mongo_pool', mongoPoolStats);
+
+function checkoutWaited(durationMS?: number): number {
+  const started = state.waitStarts.shift();
+  state.counts.waiting = Math.max(0, state.counts.waiting - 1);
+  if (typeof durationMS === 'number') return durationMS;
+  return started === undefined ? 0 : Date.now() - started;
+}
+
+function instrument(client: MongoClient): void {
+  const { counts } = state;
+
+  client.on('connectionCreated', () => {
+    counts.connections_open += 1;
+  });
+  client.on('connectionClosed', () => {
+    counts.connections_open = Math.max(0, counts.connections_open - 1);
+  });
+  client.on('connectionCheckOutStarted', () => {
+    state.waitStarts.push(Date.now());
+    counts.waiting += 1;
+    counts.peak_waiting = Math.max(counts.peak_waiting, counts.waiting);
+  });
+  client.on('connectionCheckedOut', (event: any) => {
+    const waited = checkoutWaited(event.durationMS);
+    counts.checkouts += 1;
+    counts.wait_ms_total += waited;
+    counts.max_wait_ms = Math.max(counts.max_wait_ms, waited);
+    if (waited >= SLOW_CHECKOUT_MS) counts.slow_checkouts += 1;
+    counts.checked_out += 1;
+    counts.peak_checked_out = Math.max(counts.peak_checked_out, counts.checked_out);
+  });
+  client.on('connectionCheckOutFailed', (event: any) => {
+    checkoutWaited(event.durationMS);
+    counts.checkout_failures += 1;
+    if (event.reason === 'timeout') counts.wait_timeouts += 1;
+  });
+  client.on('connectionCheckedIn', () => {
+    counts.checked_out = Math.max(0, counts.checked_out - 1);
+  });
+  client.on('connectionPoolCleared', () => {
+    counts.pool_cleared += 1;
+  });
+}
+
+async function connect(): Promise<MongoClient> {
+  // Fail fast on a production misconfiguration rather than quietly using localhost
+  if (isProduction && MONGO_URL === DEFAULT_MONGO_URL) {
+    throw new Error('MongoDB connection string not configured for production');
+  }
+
+  const client = new MongoClient(MONGO_URL, {
+    maxPoolSize: MAX_POOL_SIZE,
+    minPoolSize: MIN_POOL_SIZE,
+    waitQueueTimeoutMS: WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS: 5000,
+    connectTimeoutMS: 10000,
+  });
+  instrument(client);
+
+  await client.connect();
+  await client.db(DB_NAME).command({ ping: 1 });
+  console.log(`MongoDB connected (pool ${MIN_POOL_SIZE}-${MAX_POOL_SIZE}, wait timeout ${WAIT_QUEUE_TIMEOUT_MS}ms)`);
+  return client;
+}
+
+export async function getMongoClient(): Promise<MongoClient> {
+  if (state.client) return state.client;
+  if (!state.connecting) {
+    // Concurrent first requests share one connect; a failed one is retried by the next caller
+    state.connecting = connect()
+      .then(client => {
+        state.client = client;
+        return client;
+      })
+      .finally(() => {
+        state.connecting = null;
+      });
+  }
+  return state.connecting;
+}
 
 export async function getDatabase(): Promise<Db> {
-  if (!database) {
-    if (!client) {
-      client = new MongoClient(MONGO_URL);
-      await client.connect();
-    }
-    database = client.db(DB_NAME);
+  return (await getMongoClient()).db(DB_NAME);
+}
+
+/**
+ * Open the min-idle connections now rather than on the first requests
+ */
+export async function warmMongoPool(): Promise<void> {
+  const started = Date.now();
+  try {
+    const db = await getDatabase();
+    await Promise.all(Array.from({ length: MIN_POOL_SIZE }, () => db.command({ ping: 1 })));
+    console.log(`MongoDB pool warmed: ${state.counts.connections_open} connections in ${Date.now() - started}ms`);
+  } catch (error) {
+    console.warn('MongoDB pool warm-up failed, connecting on first use:', (error as Error).message);
   }
-  
-  return database;
 }
 
 export async function closeConnection(): Promise<void> {
-  if (client) {
+  if (state.client) {
+    const client = state.client;
+    state.client = null;
     await client.close();
-    client = null;
-    database = null;
   }
-}
\ No newline at end of file
+}
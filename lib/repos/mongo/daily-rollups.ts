@@ -0,0 +1,96 @@
+/**
+ * MongoDB Daily Rollups Repository Implementation
+ *
+ * One document per (user_id, date) holding the day's nutrition totals. Every
+ * food log insert/delete applies its macros with a single upserted $inc, so
+ * dashboards and the coach read a date range off idx_daily_rollups_user_date
+ * instead of re-summing raw logs. The log write and the $inc are separate
+ * operations (no replica-set transaction); scripts/rebuild-rollups.js
+ * recomputes from food_logs if they ever drift.
+ */
+
+import { IDailyRollupsRepository, DailyRollup, FoodLog } from '../types';
+import { getDatabase } from './connection';
+
+// Days are bucketed in the user's local calendar; the app serves India
+export const ROLLUP_TIMEZONE = process.env.ROLLUP_TIMEZONE || 'Asia/Kolkata';
+
+export const ROLLUP_FIELDS = ['kcal', 'protein_g', 'carb_g', 'fat_g', 'fiber_g', 'sodium_mg'] as const;
+
+const dayFormat = new Intl.DateTimeFormat('en-CA', {
+  timeZone: ROLLUP_TIMEZONE,
+  year: 'numeric',
+  month: '2-digit',
+  day: '2-digit'
+});
+
+/**
+ * YYYY-MM-DD of `ts` in ROLLUP_TIMEZONE (matches $dateToString in the rebuild job)
+ */
+export function rollupDate(ts: Date | string = new Date()): string {
+  return dayFormat.format(new Date(ts));
+}
+
+export class MongoDailyRollupsRepository implements IDailyRollupsRepository {
+  private async getCollection() {
+    const db = await getDatabase();
+    return db.collection('daily_rollups');
+  }
+
+  /**
+   * Logs landing on the same day are summed first, so a batch costs one
+   * upserted $inc per (user, day) in a single bulkWrite
+   */
+  async applyLogs(logs: FoodLog[], direction: 1 | -1): Promise<void> {
+    if (logs.length === 0) return;
+    const collection = await this.getCollection();
+    
+    const byDay = new Map<string, { user_id: string; date: string; inc: Record<string, number> }>();
+    for (const log of logs) {
+      const date = rollupDate(log.ts);
+      const key = `${log.user_id}|${date}`;
+      let day = byDay.get(key);
+      if (!day) {
+        day = { user_id: log.user_id, date, inc: { log_count: 0 } };
+        for (const field of ROLLUP_FIELDS) day.inc[field] = 0;
+        byDay.set(key, day);
+      }
+      day.inc.log_count += direction;
+      for (const field of ROLLUP_FIELDS) {
+        day.inc[field] += direction * (Number(log[field]) || 0);
+      }
+    }
+    
+    const now = new Date();
+    await collection.bulkWrite(
+      [...byDay.values()].map(({ user_id, date, inc }) => ({
+        updateOne: {
+          filter: { user_id, date },
+          update: { $inc: inc, $set: { updated_at: now } },
+          upsert: true
+        }
+      })),
+      { ordered: false }
+    );
+  }
+
+  async findRange(userId: string, from: string, to: string): Promise<DailyRollup[]> {
+    const collection = await this.getCollection();
+    
+    const rollups = await collection
+      .find(
+        { user_id: userId, date: { $gte: from, $lte: to } },
+        { projection: { _id: 0 } }
+      )
+      .sort({ date: 1 })
+      .toArray();
+    
+    return rollups as unknown as DailyRollup[];
+  }
+
+  async deleteByUserId(userId: string): Promise<boolean> {
+    const collection = await this.getCollection();
+    const result = await collection.deleteMany({ user_id: userId });
+    return result.deletedCount > 0;
+  }
+}
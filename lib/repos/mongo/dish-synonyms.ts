@@ -0,0 +1,39 @@
+/**
+ * MongoDB Dish Synonyms Repository Implementation
+ */
+
+import { IDishSynonymsRepository, DishSynonym, ChangeMarker } from '../types';
+import { getDatabase } from './connection';
+
+export class MongoDishSynonymsRepository implements IDishSynonymsRepository {
+  private async getCollection() {
+    const db = await getDatabase();
+    return db.collection('dish_synonyms');
+  }
+
+  async findAll(): Promise<DishSynonym[]> {
+    const collection = await this.getCollection();
+
+    const synonyms = await collection
+      .find({}, { projection: { food_id: 1, term: 1, lang_enum: 1, script_enum: 1, weight: 1 } })
+      .toArray();
+
+    return synonyms.map(synonym => ({
+      ...synonym,
+      id: synonym._id?.toString(),
+      food_id: synonym.food_id?.toString()
+    })) as DishSynonym[];
+  }
+
+  async changeMarker(): Promise<ChangeMarker> {
+    const collection = await this.getCollection();
+    const [count, newest] = await Promise.all([
+      collection.countDocuments({}),
+      collection.find({}, { projection: { created_at: 1 } })
+        .sort({ created_at: -1 })
+        .limit(1)
+        .next()
+    ]);
+    return { count, latest: newest?.created_at ? new Date(newest.created_at).toISOString() : null };
+  }
+}
@@ -2,7 +2,7 @@
  * MongoDB Food Items Repository Implementation
  */
 
-import { IFoodItemsRepository, FoodItem } from '../types';
+import { IFoodItemsRepository, FoodItem, ChangeMarker } from '../types';
 import { getDatabase } from './connection';
 
 export class MongoFoodItemsRepository implements IFoodItemsRepository {
@@ -21,6 +21,17 @@ export class MongoFoodItemsRepository implements IFoodItemsRepository {
     } : null;
   }
 
+  async findByNames(names: string[]): Promise<FoodItem[]> {
+    if (names.length === 0) return [];
+    const collection = await this.getCollection();
+    const items = await collection.find({ canonical_name: { $in: names } }).toArray();
+
+    return items.map(item => ({
+      ...item,
+      id: item._id?.toString()
+    }));
+  }
+
   async search(query: string, limit: number = 20): Promise<FoodItem[]> {
     const collection = await this.getCollection();
     
@@ -53,4 +64,17 @@ export class MongoFoodItemsRepository implements IFoodItemsRepository {
       id: item._id?.toString()
     }));
   }
-}
\ No newline at end of file
+
+  async changeMarker(): Promise<ChangeMarker> {
+    const collection = await this.getCollection();
+    const [count, newest] = await Promise.all([
+      collection.countDocuments({}),
+      collection.find({}, { projection: { updated_at: 1, created_at: 1 } })
+        .sort({ updated_at: -1, created_at: -1 })
+        .limit(1)
+        .next()
+    ]);
+    const latest = newest?.updated_at ?? newest?.created_at;
+    return { count, latest: latest ? new Date(latest).toISOString() : null };
+  }
+}
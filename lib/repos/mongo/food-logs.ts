@@ -2,10 +2,53 @@
  * MongoDB Food Logs Repository Implementation
  */
 
-import { IFoodLogsRepository, FoodLog } from '../types';
+import { ObjectId } from 'mongodb';
+import { IFoodLogsRepository, FoodLog, InvalidCursorError, Page, PageOptions, ScanOptions } from '../types';
 import { getDatabase } from './connection';
+import { MongoDailyRollupsRepository } from './daily-rollups';
+
+const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+
+// Fields the history list renders; callers may ask for others via `fields`
+export const FOOD_LOG_LIST_FIELDS = [
+  'ts', 'source_enum', 'food_id', 'menu_item_id', 'portion_qty_numeric', 'portion_units',
+  'kcal', 'protein_g', 'carb_g', 'fat_g'
+];
+
+/**
+ * Page position: the ts of the last row returned plus the ids already returned
+ * at exactly that ts. Pages are read along idx_food_logs_user_ts (ts desc);
+ * excluding the seen ids handles rows that share a timestamp without needing
+ * _id in the index.
+ */
+interface LogCursor {
+  ts: Date;
+  seen: string[];
+}
+
+function encodeCursor(cursor: LogCursor): string {
+  return Buffer.from(JSON.stringify({ t: cursor.ts.toISOString(), s: cursor.seen })).toString('base64url');
+}
+
+function decodeCursor(value: string): LogCursor {
+  try {
+    const { t, s } = JSON.parse(Buffer.from(value, 'base64url').toString('utf8'));
+    const ts = new Date(t);
+    if (Number.isNaN(ts.getTime()) || !Array.isArray(s)) throw new Error('bad cursor');
+    return { ts, seen: s.map(String) };
+  } catch {
+    throw new InvalidCursorError();
+  }
+}
+
+function toObjectIds(ids: string[]): (ObjectId | string)[] {
+  return ids.map(id => (ObjectId.isValid(id) && id.length === 24 ? new ObjectId(id) : id));
+}
 
 export class MongoFoodLogsRepository implements IFoodLogsRepository {
+  private rollups = new MongoDailyRollupsRepository();
+
   private async getCollection() {
     const db = await getDatabase();
     return db.collection('food_logs');
@@ -21,6 +64,7 @@ export class MongoFoodLogsRepository implements IFoodLogsRepository {
     };
 
     const result = await collection.insertOne(logWithTimestamps);
+    await this.applyToRollups([logWithTimestamps], 1);
     
     return {
       ...logWithTimestamps,
@@ -28,6 +72,41 @@ export class MongoFoodLogsRepository implements IFoodLogsRepository {
     };
   }
 
+  /**
+   * One insertMany for the logs and one bulkWrite for their daily rollups
+   */
+  async createMany(logs: Omit<FoodLog, 'id' | 'created_at'>[]): Promise<FoodLog[]> {
+    if (logs.length === 0) return [];
+    const collection = await this.getCollection();
+    
+    const now = new Date();
+    const docs = logs.map(log => ({
+      ...log,
+      ts: log.ts || now,
+      created_at: now
+    }));
+    
+    const result = await collection.insertMany(docs);
+    await this.applyToRollups(docs, 1);
+    
+    return docs.map((doc, i) => {
+      const { _id, ...fields } = doc as typeof doc & { _id?: unknown };
+      return { ...fields, id: result.insertedIds[i].toString() };
+    });
+  }
+
+  /**
+   * The log is already written; a failed rollup update is repaired by
+   * scripts/rebuild-rollups.js rather than failing the user's request
+   */
+  private async applyToRollups(logs: FoodLog[], direction: 1 | -1): Promise<void> {
+    try {
+      await this.rollups.applyLogs(logs, direction);
+    } catch (error) {
+      console.error('Daily rollup update failed:', (error as Error).message);
+    }
+  }
+
   async findByUserId(userId: string, from?: Date, to?: Date): Promise<FoodLog[]> {
     const collection = await this.getCollection();
     
@@ -50,9 +129,103 @@ export class MongoFoodLogsRepository implements IFoodLogsRepository {
     }));
   }
 
+  /**
+   * One page of a user's logs, newest first, with only the list-view fields.
+   * Cost is O(limit) however long the history, unlike findByUserId.
+   */
+  async findPageByUserId(userId: string, options: PageOptions<Date> = {}): Promise<Page<Partial<FoodLog>>> {
+    const collection = await this.getCollection();
+    const limit = Math.min(Math.max(1, options.limit || DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE);
+    const cursor = options.cursor ? decodeCursor(options.cursor) : null;
+    
+    const query: any = { user_id: userId };
+    
+    if (options.from || options.to || cursor) {
+      query.ts = {};
+      if (options.from) query.ts.$gte = options.from;
+      if (options.to) query.ts.$lte = options.to;
+      if (cursor && (!options.to || cursor.ts < options.to)) query.ts.$lte = cursor.ts;
+    }
+    if (cursor?.seen.length) {
+      query._id = { $nin: toObjectIds(cursor.seen) };
+    }
+    
+    const projection: Record<string, 1> = { ts: 1 };
+    for (const field of options.fields?.length ? options.fields : FOOD_LOG_LIST_FIELDS) {
+      if (/^[a-z_]+$/.test(field)) projection[field] = 1;
+    }
+    
+    // One extra row tells us whether there is a next page
+    const docs = await collection
+      .find(query, { projection })
+      .sort({ ts: -1 })
+      .limit(limit + 1)
+      .toArray();
+    
+    const hasMore = docs.length > limit;
+    const items = (hasMore ? docs.slice(0, limit) : docs).map(({ _id, ...fields }) => ({
+      ...fields,
+      id: _id.toString()
+    }));
+    
+    let next_cursor: string | null = null;
+    if (hasMore) {
+      const lastTs = items[items.length - 1].ts as Date;
+      const seen = items.filter(item => (item.ts as Date).getTime() === lastTs.getTime()).map(item => item.id);
+      // Rows at the boundary ts on earlier pages are still excluded
+      if (cursor && cursor.ts.getTime() === lastTs.getTime()) seen.push(...cursor.seen);
+      next_cursor = encodeCursor({ ts: lastTs, seen });
+    }
+    
+    return { items, next_cursor };
+  }
+
+  /**
+   * Stream a user's logs in ts order off a server-side cursor, so large
+   * histories never sit in memory at once (uses idx_food_logs_user_ts)
+   */
+  async *iterateByUserId(userId: string, options: ScanOptions<Date> = {}): AsyncIterable<FoodLog> {
+    const collection = await this.getCollection();
+    
+    const query: any = { user_id: userId };
+    
+    if (options.from || options.to) {
+      query.ts = {};
+      if (options.from) query.ts.$gte = options.from;
+      if (options.to) query.ts.$lte = options.to;
+    }
+    
+    const cursor = collection
+      .find(query)
+      .sort({ ts: options.order === 'desc' ? -1 : 1 })
+      .batchSize(options.batchSize || 1000);
+    
+    for await (const log of cursor) {
+      const { _id, ...fields } = log;
+      yield { ...fields, id: _id?.toString() } as FoodLog;
+    }
+  }
+
+  async deleteById(userId: string, id: string): Promise<FoodLog | null> {
+    const collection = await this.getCollection();
+    const [_id] = toObjectIds([id]);
+    
+    const deleted = await collection.findOneAndDelete(
+      { _id: _id as any, user_id: userId },
+      { includeResultMetadata: true }
+    );
+    if (!deleted.value) return null;
+    
+    const { _id: removedId, ...fields } = deleted.value;
+    const log = { ...fields, id: removedId.toString() } as FoodLog;
+    await this.applyToRollups([log], -1);
+    return log;
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     const collection = await this.getCollection();
     const result = await collection.deleteMany({ user_id: userId });
+    await this.rollups.deleteByUserId(userId);
     return result.deletedCount > 0;
   }
 }
\ No newline at end of file
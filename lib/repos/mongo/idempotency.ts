@@ -0,0 +1,75 @@
+/**
+ * MongoDB Idempotency Keys Repository Implementation
+ *
+ * One document per (scope, user, key), with the _id built from all three so
+ * the primary key index is what makes a claim exclusive across instances.
+ */
+
+import { IIdempotencyRepository, IdempotencyRecord } from '../types';
+import { getDatabase } from './connection';
+
+const DUPLICATE_KEY = 11000;
+
+function recordId(userId: string, scope: string, key: string): string {
+  return `${scope}:${userId}:${key}`;
+}
+
+export class MongoIdempotencyRepository implements IIdempotencyRepository {
+  private async getCollection() {
+    const db = await getDatabase();
+    return db.collection<IdempotencyRecord & { _id: string }>('idempotency_keys');
+  }
+
+  /**
+   * Insert a pending record. Returns null when this caller now owns the key,
+   * or the record already stored under it.
+   */
+  async claim(record: Omit<IdempotencyRecord, 'state' | 'created_at'>): Promise<IdempotencyRecord | null> {
+    const collection = await this.getCollection();
+    const _id = recordId(record.user_id, record.scope, record.key);
+    
+    try {
+      await collection.insertOne({ ...record, _id, state: 'pending', created_at: new Date() });
+      return null;
+    } catch (error) {
+      if ((error as any)?.code !== DUPLICATE_KEY) throw error;
+    }
+    
+    const existing = await collection.findOne({ _id });
+    if (!existing) {
+      // Released (or expired) between our insert and read; try once more
+      return this.claim(record);
+    }
+    return existing;
+  }
+
+  async find(userId: string, scope: string, key: string): Promise<IdempotencyRecord | null> {
+    const collection = await this.getCollection();
+    return collection.findOne({ _id: recordId(userId, scope, key) });
+  }
+
+  /**
+   * Take over a pending claim whose owner let its lock lapse (crashed or hung)
+   */
+  async takeOver(userId: string, scope: string, key: string, lockedUntil: Date): Promise<boolean> {
+    const collection = await this.getCollection();
+    const result = await collection.updateOne(
+      { _id: recordId(userId, scope, key), state: 'pending', locked_until: { $lt: new Date() } },
+      { $set: { locked_until: lockedUntil } }
+    );
+    return result.modifiedCount === 1;
+  }
+
+  async complete(userId: string, scope: string, key: string, statusCode: number, response: any, expiresAt: Date): Promise<void> {
+    const collection = await this.getCollection();
+    await collection.updateOne(
+      { _id: recordId(userId, scope, key) },
+      { $set: { state: 'done', status_code: statusCode, response_json: response, expires_at: expiresAt } }
+    );
+  }
+
+  async release(userId: string, scope: string, key: string): Promise<void> {
+    const collection = await this.getCollection();
+    await collection.deleteOne({ _id: recordId(userId, scope, key), state: 'pending' });
+  }
+}
@@ -42,6 +42,21 @@ export class MongoOcrScansRepository implements IOcrScansRepository {
     }));
   }
 
+  async findLatestByImageHash(imageHash: string, since?: Date): Promise<OcrScan | null> {
+    const collection = await this.getCollection();
+    const query: any = { image_hash: imageHash };
+    if (since) {
+      query.ts = { $gte: since };
+    }
+
+    const scan = await collection.findOne(query, { sort: { ts: -1 } });
+
+    return scan ? {
+      ...scan,
+      id: scan._id?.toString()
+    } as OcrScan : null;
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     const collection = await this.getCollection();
     const result = await collection.deleteMany({ user_id: userId });
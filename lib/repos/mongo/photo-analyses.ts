@@ -42,6 +42,21 @@ export class MongoPhotoAnalysesRepository implements IPhotoAnalysesRepository {
     }));
   }
 
+  async findLatestByImageHash(imageHash: string, since?: Date): Promise<PhotoAnalysis | null> {
+    const collection = await this.getCollection();
+    const query: any = { image_hash: imageHash };
+    if (since) {
+      query.ts = { $gte: since };
+    }
+
+    const analysis = await collection.findOne(query, { sort: { ts: -1 } });
+
+    return analysis ? {
+      ...analysis,
+      id: analysis._id?.toString()
+    } as PhotoAnalysis : null;
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     const collection = await this.getCollection();
     const result = await collection.deleteMany({ user_id: userId });
@@ -2,7 +2,7 @@
  * MongoDB Targets Repository Implementation
  */
 
-import { ITargetsRepository, DailyTarget } from '../types';
+import { ITargetsRepository, DailyTarget, ScanOptions } from '../types';
 import { getDatabase } from './connection';
 
 export class MongoTargetsRepository implements ITargetsRepository {
@@ -81,6 +81,31 @@ export class MongoTargetsRepository implements ITargetsRepository {
     };
   }
 
+  /**
+   * Stream a user's targets in date order off a server-side cursor
+   */
+  async *iterateByUserId(userId: string, options: ScanOptions<string> = {}): AsyncIterable<DailyTarget> {
+    const collection = await this.getCollection();
+    
+    const query: any = { user_id: userId };
+    
+    if (options.from || options.to) {
+      query.date = {};
+      if (options.from) query.date.$gte = options.from;
+      if (options.to) query.date.$lte = options.to;
+    }
+    
+    const cursor = collection
+      .find(query)
+      .sort({ date: options.order === 'desc' ? -1 : 1 })
+      .batchSize(options.batchSize || 1000);
+    
+    for await (const target of cursor) {
+      const { _id, ...fields } = target;
+      yield { ...fields, id: _id?.toString() } as DailyTarget;
+    }
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     const collection = await this.getCollection();
     const result = await collection.deleteMany({ user_id: userId });
@@ -0,0 +1,23 @@
+/**
+ * Supabase Daily Rollups Repository Implementation (Stub for M1)
+ * TODO: Implement for M1 migration
+ */
+
+import { IDailyRollupsRepository, DailyRollup, FoodLog } from '../types';
+
+export class SupabaseDailyRollupsRepository implements IDailyRollupsRepository {
+  async applyLogs(logs: FoodLog[], direction: 1 | -1): Promise<void> {
+    // TODO: Implement Supabase rollup updates for M1
+    throw new Error('Supabase daily rollups repository not implemented yet - planned for M1');
+  }
+
+  async findRange(userId: string, from: string, to: string): Promise<DailyRollup[]> {
+    // TODO: Implement Supabase rollup range reads for M1
+    throw new Error('Supabase daily rollups repository not implemented yet - planned for M1');
+  }
+
+  async deleteByUserId(userId: string): Promise<boolean> {
+    // TODO: Implement Supabase rollup deletion for M1
+    throw new Error('Supabase daily rollups repository not implemented yet - planned for M1');
+  }
+}
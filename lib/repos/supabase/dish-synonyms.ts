@@ -0,0 +1,18 @@
+/**
+ * Supabase Dish Synonyms Repository Implementation (Stub for M1)
+ * TODO: Implement for M1 migration
+ */
+
+import { IDishSynonymsRepository, DishSynonym, ChangeMarker } from '../types';
+
+export class SupabaseDishSynonymsRepository implements IDishSynonymsRepository {
+  async findAll(): Promise<DishSynonym[]> {
+    // TODO: Implement Supabase dish synonyms findAll for M1
+    throw new Error('Supabase dish synonyms repository not implemented yet - planned for M1');
+  }
+
+  async changeMarker(): Promise<ChangeMarker> {
+    // TODO: Implement Supabase dish synonyms change marker for M1
+    throw new Error('Supabase dish synonyms repository not implemented yet - planned for M1');
+  }
+}
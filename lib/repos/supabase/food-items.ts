@@ -3,7 +3,7 @@
  * TODO: Implement for M1 migration
  */
 
-import { IFoodItemsRepository, FoodItem } from '../types';
+import { IFoodItemsRepository, FoodItem, ChangeMarker } from '../types';
 
 export class SupabaseFoodItemsRepository implements IFoodItemsRepository {
   async findByName(name: string): Promise<FoodItem | null> {
@@ -11,6 +11,11 @@ export class SupabaseFoodItemsRepository implements IFoodItemsRepository {
     throw new Error('Supabase food items repository not implemented yet - planned for M1');
   }
 
+  async findByNames(names: string[]): Promise<FoodItem[]> {
+    // TODO: Implement Supabase food items batch lookup by name for M1
+    throw new Error('Supabase food items repository not implemented yet - planned for M1');
+  }
+
   async search(query: string, limit?: number): Promise<FoodItem[]> {
     // TODO: Implement Supabase food items search for M1
     throw new Error('Supabase food items repository not implemented yet - planned for M1');
@@ -20,4 +25,9 @@ export class SupabaseFoodItemsRepository implements IFoodItemsRepository {
     // TODO: Implement Supabase food items findAll for M1
     throw new Error('Supabase food items repository not implemented yet - planned for M1');
   }
-}
\ No newline at end of file
+
+  async changeMarker(): Promise<ChangeMarker> {
+    // TODO: Implement Supabase food items change marker for M1
+    throw new Error('Supabase food items repository not implemented yet - planned for M1');
+  }
+}
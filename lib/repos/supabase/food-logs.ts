@@ -3,7 +3,7 @@
  * TODO: Implement for M1 migration
  */
 
-import { IFoodLogsRepository, FoodLog } from '../types';
+import { IFoodLogsRepository, FoodLog, Page, PageOptions, ScanOptions } from '../types';
 
 export class SupabaseFoodLogsRepository implements IFoodLogsRepository {
   async create(log: Omit<FoodLog, 'id' | 'created_at'>): Promise<FoodLog> {
@@ -11,11 +11,31 @@ export class SupabaseFoodLogsRepository implements IFoodLogsRepository {
     throw new Error('Supabase food logs repository not implemented yet - planned for M1');
   }
 
+  async createMany(logs: Omit<FoodLog, 'id' | 'created_at'>[]): Promise<FoodLog[]> {
+    // TODO: Implement Supabase batch food log creation for M1
+    throw new Error('Supabase food logs repository not implemented yet - planned for M1');
+  }
+
   async findByUserId(userId: string, from?: Date, to?: Date): Promise<FoodLog[]> {
     // TODO: Implement Supabase food logs lookup for M1
     throw new Error('Supabase food logs repository not implemented yet - planned for M1');
   }
 
+  async findPageByUserId(userId: string, options?: PageOptions<Date>): Promise<Page<Partial<FoodLog>>> {
+    // TODO: Implement Supabase food logs pagination for M1
+    throw new Error('Supabase food logs repository not implemented yet - planned for M1');
+  }
+
+  async *iterateByUserId(userId: string, options?: ScanOptions<Date>): AsyncIterable<FoodLog> {
+    // TODO: Implement Supabase food logs streaming for M1
+    throw new Error('Supabase food logs repository not implemented yet - planned for M1');
+  }
+
+  async deleteById(userId: string, id: string): Promise<FoodLog | null> {
+    // TODO: Implement Supabase food log deletion for M1
+    throw new Error('Supabase food logs repository not implemented yet - planned for M1');
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     // TODO: Implement Supabase food logs deletion for M1
     throw new Error('Supabase food logs repository not implemented yet - planned for M1');
@@ -0,0 +1,33 @@
+/**
+ * Supabase Idempotency Keys Repository Implementation (Stub for M1)
+ * TODO: Implement for M1 migration
+ */
+
+import { IIdempotencyRepository, IdempotencyRecord } from '../types';
+
+export class SupabaseIdempotencyRepository implements IIdempotencyRepository {
+  async claim(record: Omit<IdempotencyRecord, 'state' | 'created_at'>): Promise<IdempotencyRecord | null> {
+    // TODO: Implement Supabase idempotency claims for M1
+    throw new Error('Supabase idempotency repository not implemented yet - planned for M1');
+  }
+
+  async find(userId: string, scope: string, key: string): Promise<IdempotencyRecord | null> {
+    // TODO: Implement Supabase idempotency lookup for M1
+    throw new Error('Supabase idempotency repository not implemented yet - planned for M1');
+  }
+
+  async takeOver(userId: string, scope: string, key: string, lockedUntil: Date): Promise<boolean> {
+    // TODO: Implement Supabase idempotency lock takeover for M1
+    throw new Error('Supabase idempotency repository not implemented yet - planned for M1');
+  }
+
+  async complete(userId: string, scope: string, key: string, statusCode: number, response: any, expiresAt: Date): Promise<void> {
+    // TODO: Implement Supabase idempotency completion for M1
+    throw new Error('Supabase idempotency repository not implemented yet - planned for M1');
+  }
+
+  async release(userId: string, scope: string, key: string): Promise<void> {
+    // TODO: Implement Supabase idempotency release for M1
+    throw new Error('Supabase idempotency repository not implemented yet - planned for M1');
+  }
+}
@@ -16,6 +16,11 @@ export class SupabaseOcrScansRepository implements IOcrScansRepository {
     throw new Error('Supabase OCR scans repository not implemented yet - planned for M1');
   }
 
+  async findLatestByImageHash(imageHash: string, since?: Date): Promise<OcrScan | null> {
+    // TODO: Implement Supabase OCR scans lookup by image hash for M1
+    throw new Error('Supabase OCR scans repository not implemented yet - planned for M1');
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     // TODO: Implement Supabase OCR scans deletion for M1
     throw new Error('Supabase OCR scans repository not implemented yet - planned for M1');
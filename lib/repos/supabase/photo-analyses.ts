@@ -16,6 +16,11 @@ export class SupabasePhotoAnalysesRepository implements IPhotoAnalysesRepository
     throw new Error('Supabase photo analyses repository not implemented yet - planned for M1');
   }
 
+  async findLatestByImageHash(imageHash: string, since?: Date): Promise<PhotoAnalysis | null> {
+    // TODO: Implement Supabase photo analyses lookup by image hash for M1
+    throw new Error('Supabase photo analyses repository not implemented yet - planned for M1');
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     // TODO: Implement Supabase photo analyses deletion for M1
     throw new Error('Supabase photo analyses repository not implemented yet - planned for M1');
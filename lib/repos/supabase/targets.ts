@@ -3,7 +3,7 @@
  * TODO: Implement for M1 migration
  */
 
-import { ITargetsRepository, DailyTarget } from '../types';
+import { ITargetsRepository, DailyTarget, ScanOptions } from '../types';
 
 export class SupabaseTargetsRepository implements ITargetsRepository {
   async create(target: Omit<DailyTarget, 'id' | 'created_at' | 'updated_at'>): Promise<DailyTarget> {
@@ -26,6 +26,11 @@ export class SupabaseTargetsRepository implements ITargetsRepository {
     throw new Error('Supabase targets repository not implemented yet - planned for M1');
   }
 
+  async *iterateByUserId(userId: string, options?: ScanOptions<string>): AsyncIterable<DailyTarget> {
+    // TODO: Implement Supabase targets streaming for M1
+    throw new Error('Supabase targets repository not implemented yet - planned for M1');
+  }
+
   async deleteByUserId(userId: string): Promise<boolean> {
     // TODO: Implement Supabase targets deletion for M1
     throw new Error('Supabase targets repository not implemented yet - planned for M1');
@@ -70,6 +70,23 @@ export interface FoodItem {
   updated_at?: Date;
 }
 
+// Alternative names for a food item (Hindi, Hinglish, regional spellings)
+export interface DishSynonym {
+  id: string;
+  food_id: string;
+  term: string;
+  lang_enum?: string;
+  script_enum?: string;
+  weight?: number; // 1-100, how strongly the term implies the food
+  created_at?: Date;
+}
+
+// Cheap fingerprint of a collection, compared to decide whether to reload it
+export interface ChangeMarker {
+  count: number;
+  latest: string | null; // newest updated_at / created_at, ISO
+}
+
 export interface FoodLog {
   id?: string;
   user_id: string;
@@ -90,11 +107,43 @@ export interface FoodLog {
   created_at?: Date;
 }
 
+// Per-user, per-day nutrition totals kept in step with food_logs ($inc on
+// every insert/delete; scripts/rebuild-rollups.js recomputes them)
+export interface DailyRollup {
+  id?: string;
+  user_id: string;
+  date: string; // YYYY-MM-DD in ROLLUP_TIMEZONE
+  kcal: number;
+  protein_g: number;
+  carb_g: number;
+  fat_g: number;
+  fiber_g: number;
+  sodium_mg: number;
+  log_count: number;
+  updated_at?: Date;
+}
+
+// Outcome of a keyed write, replayed to retries of the same request
+// (lib/idempotency.ts). Expired by a TTL index on expires_at.
+export interface IdempotencyRecord {
+  user_id: string;
+  scope: string; // endpoint family, e.g. 'logs'
+  key: string;
+  request_hash: string;
+  state: 'pending' | 'done';
+  status_code?: number;
+  response_json?: any;
+  locked_until: Date; // a pending claim older than this may be taken over
+  expires_at: Date;
+  created_at?: Date;
+}
+
 export interface OcrScan {
   id?: string;
   user_id: string;
   ts?: Date;
   image_url?: string;
+  image_hash?: string; // content hash of the normalized upload (lib/result-cache.ts)
   ocr_text?: string;
   language_detected?: string;
   parsed_json?: any;
@@ -108,14 +157,46 @@ export interface PhotoAnalysis {
   user_id: string;
   ts?: Date;
   image_url?: string;
+  image_hash?: string; // content hash of the normalized upload (lib/result-cache.ts)
   detections_json?: any[];
   chosen_food_id?: string;
   portion_hint?: string;
   confidence?: number;
   macros_json?: any;
+  results_json?: any;
   created_at?: Date;
 }
 
+// Options for cursor-based scans (exports, rebuild jobs)
+export interface ScanOptions<T> {
+  from?: T;
+  to?: T;
+  order?: 'asc' | 'desc';
+  batchSize?: number;
+}
+
+// Keyset pagination for list views: pass back `next_cursor` as `cursor`
+export interface PageOptions<T> {
+  limit?: number;
+  cursor?: string | null;
+  from?: T;
+  to?: T;
+  fields?: string[]; // projection; id is always included
+}
+
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
+// Thrown by findPage* for a cursor this repository did not issue
+export class InvalidCursorError extends Error {
+  constructor() {
+    super('Invalid pagination cursor');
+    this.name = 'InvalidCursorError';
+  }
+}
+
 // Repository interfaces
 export interface IProfileRepository {
   create(profile: Omit<Profile, 'created_at' | 'updated_at'>): Promise<Profile>;
@@ -129,29 +210,57 @@ export interface ITargetsRepository {
   findByUserIdAndDate(userId: string, date: string): Promise<DailyTarget | null>;
   findByUserId(userId: string, limit?: number): Promise<DailyTarget[]>;
   upsertByUserIdAndDate(userId: string, date: string, target: Partial<DailyTarget>): Promise<DailyTarget>;
+  iterateByUserId(userId: string, options?: ScanOptions<string>): AsyncIterable<DailyTarget>;
   deleteByUserId(userId: string): Promise<boolean>;
 }
 
 export interface IFoodLogsRepository {
   create(log: Omit<FoodLog, 'id' | 'created_at'>): Promise<FoodLog>;
+  createMany(logs: Omit<FoodLog, 'id' | 'created_at'>[]): Promise<FoodLog[]>;
   findByUserId(userId: string, from?: Date, to?: Date): Promise<FoodLog[]>;
+  findPageByUserId(userId: string, options?: PageOptions<Date>): Promise<Page<Partial<FoodLog>>>;
+  iterateByUserId(userId: string, options?: ScanOptions<Date>): AsyncIterable<FoodLog>;
+  deleteById(userId: string, id: string): Promise<FoodLog | null>;
+  deleteByUserId(userId: string): Promise<boolean>;
+}
+
+export interface IIdempotencyRepository {
+  claim(record: Omit<IdempotencyRecord, 'state' | 'created_at'>): Promise<IdempotencyRecord | null>;
+  find(userId: string, scope: string, key: string): Promise<IdempotencyRecord | null>;
+  takeOver(userId: string, scope: string, key: string, lockedUntil: Date): Promise<boolean>;
+  complete(userId: string, scope: string, key: string, statusCode: number, response: any, expiresAt: Date): Promise<void>;
+  release(userId: string, scope: string, key: string): Promise<void>;
+}
+
+export interface IDailyRollupsRepository {
+  applyLogs(logs: FoodLog[], direction: 1 | -1): Promise<void>;
+  findRange(userId: string, from: string, to: string): Promise<DailyRollup[]>;
   deleteByUserId(userId: string): Promise<boolean>;
 }
 
 export interface IOcrScansRepository {
   create(scan: Omit<OcrScan, 'id' | 'created_at'>): Promise<OcrScan>;
   findByUserId(userId: string): Promise<OcrScan[]>;
+  findLatestByImageHash(imageHash: string, since?: Date): Promise<OcrScan | null>;
   deleteByUserId(userId: string): Promise<boolean>;
 }
 
 export interface IPhotoAnalysesRepository {
   create(analysis: Omit<PhotoAnalysis, 'id' | 'created_at'>): Promise<PhotoAnalysis>;
   findByUserId(userId: string): Promise<PhotoAnalysis[]>;
+  findLatestByImageHash(imageHash: string, since?: Date): Promise<PhotoAnalysis | null>;
   deleteByUserId(userId: string): Promise<boolean>;
 }
 
 export interface IFoodItemsRepository {
   findByName(name: string): Promise<FoodItem | null>;
+  findByNames(names: string[]): Promise<FoodItem[]>;
   search(query: string, limit?: number): Promise<FoodItem[]>;
   findAll(limit?: number): Promise<FoodItem[]>;
+  changeMarker(): Promise<ChangeMarker>;
+}
+
+export interface IDishSynonymsRepository {
+  findAll(): Promise<DishSynonym[]>;
+  changeMarker(): Promise<ChangeMarker>;
 }
\ No newline at end of file
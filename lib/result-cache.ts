@@ -0,0 +1,213 @@
+/**
+ * Vision Result Cache
+ *
+ * People re-scan the same menu card over and over. Results of /menu/scan and
+ * /food/analyze are cached by a hash of the normalized image (the output of
+ * lib/image-preprocess.ts, so EXIF rotation and re-encoding are already
+ * folded in). Lookups go to an in-process LRU first, then to the latest
+ * ocr_scans / photo_analyses document with the same image_hash, and only
+ * then to Gemini. Identical uploads arriving together share one call.
+ */
+
+import { createHash } from 'crypto';
+import { repositories } from './repos';
+import { processSingleton, registerMetrics } from './metrics';
+import { benchToggle } from './mode';
+import type { PreprocessedImage } from './image-preprocess';
+
+export type CachedKind = 'menu' | 'meal';
+export type CacheOutcome = 'memory' | 'db' | 'miss' | 'bypass';
+
+const TTL_MS = Number(process.env.RESULT_CACHE_TTL_S || 7 * 24 * 3600) * 1000;
+const MAX_ENTRIES = Number(process.env.RESULT_CACHE_MAX_ENTRIES || 500);
+// A slow or unreachable database must not hold up a scan; treat it as a miss
+const DB_LOOKUP_TIMEOUT_MS = Number(process.env.RESULT_CACHE_DB_TIMEOUT_MS || 500);
+// Bump when prompts or response shapes change so stale results are ignored
+const CACHE_VERSION = 'v1';
+
+interface Entry {
+  value: any;
+  expiresAt: number;
+}
+
+const state = processSingleton('__fitbearResultCache', () => ({
+  lru: new Map<string, Entry>(), // Map iteration order doubles as recency order
+  inflight: new Map<string, Promise<any>>(),
+  counts: { lookups: 0, memory_hits: 0, db_hits: 0, misses: 0, bypass: 0, coalesced: 0, evictions: 0, expired: 0, db_errors: 0 },
+}));
+
+registerMetrics('result_cache', () => {
+  const { counts } = state;
+  const hits = counts.memory_hits + counts.db_hits;
+  return {
+    ...counts,
+    entries: state.lru.size,
+    max_entries: MAX_ENTRIES,
+    ttl_s: TTL_MS / 1000,
+    hit_rate: counts.lookups ? Number((hits / counts.lookups).toFixed(4)) : 0,
+  };
+});
+
+export function imageHash(kind: CachedKind, image: PreprocessedImage): string {
+  return createHash('sha256')
+    .update(`${CACHE_VERSION}:${kind}:`)
+    .update(image.data)
+    .digest('hex');
+}
+
+function memoryGet(key: string): any | undefined {
+  const entry = state.lru.get(key);
+  if (!entry) return undefined;
+  if (entry.expiresAt <= Date.now()) {
+    state.lru.delete(key);
+    state.counts.expired += 1;
+    return undefined;
+  }
+  // Re-insert to mark as most recently used
+  state.lru.delete(key);
+  state.lru.set(key, entry);
+  return entry.value;
+}
+
+function memorySet(key: string, value: any, storedAt = Date.now()): void {
+  state.lru.delete(key);
+  state.lru.set(key, { value, expiresAt: storedAt + TTL_MS });
+  while (state.lru.size > MAX_ENTRIES) {
+    const oldest = state.lru.keys().next().value;
+    state.lru.delete(oldest);
+    state.counts.evictions += 1;
+  }
+}
+
+async function dbGet(kind: CachedKind, hash: string): Promise<{ value: any; ts: number } | null> {
+  try {
+    const since = new Date(Date.now() - TTL_MS);
+    const lookup = kind === 'menu'
+      ? repositories.ocrScans.findLatestByImageHash(hash, since)
+      : repositories.photoAnalyses.findLatestByImageHash(hash, since);
+    let timer: NodeJS.Timeout | undefined;
+    const timeout = new Promise<never>((_, reject) => {
+      timer = setTimeout(() => reject(new Error(`lookup exceeded ${DB_LOOKUP_TIMEOUT_MS}ms`)), DB_LOOKUP_TIMEOUT_MS);
+    });
+    const doc = await Promise.race([lookup, timeout]).finally(() => clearTimeout(timer));
+    if (!doc?.results_json) return null;
+    return { value: doc.results_json, ts: new Date(doc.ts || Date.now()).getTime() };
+  } catch (error) {
+    state.counts.db_errors += 1;
+    console.warn('Result cache lookup failed:', (error as Error).message);
+    return null;
+  }
+}
+
+async function dbPut(kind: CachedKind, hash: string, value: any, userId: string): Promise<void> {
+  try {
+    if (kind === 'menu') {
+      await repositories.ocrScans.create({
+        user_id: userId,
+        image_hash: hash,
+        ocr_text: value.text,
+        results_json: value,
+        source_confidence: value.confidence,
+      });
+    } else {
+      const guesses = value.guess || [];
+      await repositories.photoAnalyses.create({
+        user_id: userId,
+        image_hash: hash,
+        detections_json: guesses,
+        portion_hint: value.portion_hint,
+        confidence: value.confidence ?? guesses[0]?.confidence,
+        macros_json: value.nutrition || value.on_confirm,
+        results_json: value,
+      });
+    }
+  } catch (error) {
+    state.counts.db_errors += 1;
+    console.warn('Result cache write failed:', (error as Error).message);
+  }
+}
+
+/**
+ * `Cache-Control: no-cache` on the request forces a fresh upstream call. It
+ * costs a Gemini/Deepgram call on our key, so like the other benchmark
+ * headers it is only honoured with BENCH_TOGGLES=true.
+ */
+export function cacheBypassRequested(req: Request): boolean {
+  return /no-cache|no-store/.test(benchToggle(req.headers, 'cache-control'));
+}
+
+export interface CachedVisionOptions<T> {
+  bypass?: boolean;
+  userId?: string;
+  // Degraded results (fallback OCR, parse failures) should not be replayed
+  cacheable?: (result: T) => boolean;
+}
+
+/**
+ * Return the cached result for this image, or run `compute` and cache it.
+ */
+export async function cachedVisionResult<T>(
+  kind: CachedKind,
+  image: PreprocessedImage,
+  compute: () => Promise<T>,
+  options: CachedVisionOptions<T> = {}
+): Promise<{ result: T; outcome: CacheOutcome; hash: string }> {
+  const hash = imageHash(kind, image);
+  const cacheable = options.cacheable || (() => true);
+
+  if (options.bypass) {
+    state.counts.bypass += 1;
+    const result = await compute();
+    if (cacheable(result)) {
+      memorySet(hash, result);
+      void dbPut(kind, hash, result, options.userId || 'anonymous'); // persisted off the response path
+    }
+    return { result, outcome: 'bypass', hash };
+  }
+
+  state.counts.lookups += 1;
+  const cached = memoryGet(hash);
+  if (cached !== undefined) {
+    state.counts.memory_hits += 1;
+    return { result: cached, outcome: 'memory', hash };
+  }
+
+  const pending = state.inflight.get(hash);
+  if (pending) {
+    state.counts.coalesced += 1;
+    const shared = await pending;
+    return { result: shared.result, outcome: shared.outcome, hash };
+  }
+
+  const work = (async () => {
+    const stored = await dbGet(kind, hash);
+    if (stored) {
+      state.counts.db_hits += 1;
+      memorySet(hash, stored.value, stored.ts);
+      return { result: stored.value as T, outcome: 'db' as CacheOutcome };
+    }
+
+    state.counts.misses += 1;
+    const result = await compute();
+    if (cacheable(result)) {
+      memorySet(hash, result);
+      void dbPut(kind, hash, result, options.userId || 'anonymous'); // persisted off the response path
+    }
+    return { result, outcome: 'miss' as CacheOutcome };
+  })();
+
+  state.inflight.set(hash, work);
+  try {
+    const { result, outcome } = await work;
+    return { result, outcome, hash };
+  } finally {
+    state.inflight.delete(hash);
+  }
+}
+
+export function cacheHeaders(outcome: CacheOutcome, hash: string): Record<string, string> {
+  return {
+    'X-Result-Cache': outcome,
+    'X-Image-Hash': hash.slice(0, 16),
+  };
+}
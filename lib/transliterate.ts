@@ -0,0 +1,140 @@
+/**
+ * Devanagari / Hinglish Text Folding for Food Matching
+ *
+ * Menus and users spell the same dish many ways: "paneer", "panir", "पनीर";
+ * "tikka" / "tika" / "टिक्का"; "chhole" / "chole" / "छोले". foldText() maps
+ * all of these to one comparison key: Devanagari is transliterated (with
+ * Hindi schwa deletion, so "बिरयानी" reads "biryani" not "birayani"), then
+ * spelling differences that do not change the dish are folded away: long
+ * vowels, aspiration, doubled letters, w/v, z/j, c/k, ph/f.
+ */
+
+const INDEPENDENT_VOWELS: Record<string, string> = {
+  'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu', 'ऋ': 'ri',
+  'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ऑ': 'o', 'ऍ': 'e',
+};
+
+const MATRAS: Record<string, string> = {
+  'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu', 'ृ': 'ri',
+  'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au', 'ॉ': 'o', 'ॅ': 'e',
+};
+
+const CONSONANTS: Record<string, string> = {
+  'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+  'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+  'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+  'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+  'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+  'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v', 'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h', 'ळ': 'l',
+};
+
+// Consonant + nukta (after NFD): ड़ is written "d" on menus (tadka, pakoda)
+const NUKTA_FORMS: Record<string, string> = {
+  'क': 'q', 'ख': 'kh', 'ग': 'g', 'ज': 'z', 'ड': 'd', 'ढ': 'dh', 'फ': 'f', 'य': 'y',
+};
+
+const VIRAMA = '्';
+const NUKTA = '़';
+const NASALS = new Set(['ं', 'ँ']);
+const VISARGA = 'ः';
+
+interface Syllable {
+  consonant: string; // '' for a bare vowel
+  vowel: string; // '' after a virama
+  inherent: boolean; // vowel is the implicit schwa
+  source: string; // the Devanagari consonant, for nukta forms
+}
+
+function syllablesToLatin(syllables: Syllable[]): string {
+  // Hindi drops the schwa at the end of a word and in V C _ C V positions.
+  // Walk right to left so "CV" means a vowel that is itself still spoken.
+  const keep = syllables.map(() => true);
+  for (let i = syllables.length - 1; i > 0; i--) {
+    const s = syllables[i];
+    if (!s.inherent || !s.consonant) continue;
+    const next = syllables[i + 1];
+    const prev = syllables[i - 1];
+    if (!next || (prev.vowel !== '' && next.consonant && next.vowel !== '' && keep[i + 1])) {
+      keep[i] = false;
+    }
+  }
+  return syllables.map((s, i) => s.consonant + (keep[i] ? s.vowel : '')).join('');
+}
+
+function transliterateWord(word: string): string {
+  const syllables: Syllable[] = [];
+  let out = '';
+
+  const flush = () => {
+    if (syllables.length) {
+      out += syllablesToLatin(syllables);
+      syllables.length = 0;
+    }
+  };
+
+  for (const ch of word) {
+    const last = syllables[syllables.length - 1];
+    if (CONSONANTS[ch]) {
+      syllables.push({ consonant: CONSONANTS[ch], vowel: 'a', inherent: true, source: ch });
+    } else if (ch === NUKTA && last) {
+      if (NUKTA_FORMS[last.source]) last.consonant = NUKTA_FORMS[last.source];
+    } else if (MATRAS[ch] && last) {
+      last.vowel = MATRAS[ch];
+      last.inherent = false;
+    } else if (ch === VIRAMA && last) {
+      last.vowel = '';
+      last.inherent = false;
+    } else if (INDEPENDENT_VOWELS[ch]) {
+      syllables.push({ consonant: '', vowel: INDEPENDENT_VOWELS[ch], inherent: false, source: ch });
+    } else if (NASALS.has(ch) && last) {
+      last.vowel = (last.vowel || 'a') + 'n';
+      last.inherent = false;
+    } else if (ch === VISARGA && last) {
+      last.vowel += 'h';
+      last.inherent = false;
+    } else {
+      flush();
+      out += ch;
+    }
+  }
+  flush();
+  return out;
+}
+
+/**
+ * Devanagari to Latin; other scripts pass through unchanged
+ */
+export function transliterate(text: string): string {
+  if (!/[ऀ-ॿ]/.test(text)) return text;
+  return text.normalize('NFD').split(/(\s+)/).map(transliterateWord).join('');
+}
+
+// Applied in order, to each word
+const FOLDS: [RegExp, string][] = [
+  [/chh/g, 'ch'],
+  [/c(?!h)/g, 'k'],
+  [/ph/g, 'f'],
+  [/([kgjtdb])h/g, '$1'], // aspiration: kh gh jh th dh bh
+  [/sh/g, 's'],
+  [/w/g, 'v'],
+  [/z/g, 'j'],
+  [/q/g, 'k'],
+  [/ee|ii/g, 'i'],
+  [/oo|uu/g, 'u'],
+  [/([a-z])\1+/g, '$1'], // aa -> a, kk -> k
+];
+
+/**
+ * The comparison key for a dish name or menu line: transliterated,
+ * lowercased, accents and punctuation removed, spelling variants folded
+ */
+export function foldText(text: string): string {
+  const latin = transliterate(text)
+    .normalize('NFKD')
+    .replace(/[̀-ͯ]/g, '')
+    .toLowerCase()
+    .replace(/[^a-z0-9]+/g, ' ')
+    .trim();
+  if (!latin) return '';
+  return latin.split(' ').map(word => FOLDS.reduce((w, [pattern, replacement]) => w.replace(pattern, replacement), word)).join(' ');
+}
@@ -0,0 +1,130 @@
+/**
+ * Spoken Phrase Cache for /api/tts
+ *
+ * Coach C repeats a lot of stock phrases ("Great question!", disclaimers,
+ * target summaries), and every repeat used to be synthesized again. Audio is
+ * now cached under a hash of (model, normalized text) in an in-process LRU
+ * bounded by total bytes (TTS_CACHE_MAX_MB). A miss streams Deepgram's audio
+ * to the client as it arrives and keeps a copy on the side; the copy is
+ * stored only if the stream completed, so an aborted playback never caches a
+ * truncated clip.
+ */
+
+import { createHash } from 'crypto';
+import { processSingleton, registerMetrics } from './metrics';
+
+export type TtsCacheOutcome = 'hit' | 'miss' | 'bypass';
+
+const MAX_BYTES = Number(process.env.TTS_CACHE_MAX_MB || 64) * 1024 * 1024;
+// One long reply must not push out hundreds of short phrases
+const MAX_ENTRY_BYTES = Number(process.env.TTS_CACHE_MAX_ENTRY_KB || 1024) * 1024;
+// Bump when the normalization changes so old keys are not reused
+const CACHE_VERSION = 'v1';
+
+const state = processSingleton('__fitbearTtsCache', () => ({
+  lru: new Map<string, Uint8Array>(), // Map iteration order doubles as recency order
+  bytes: 0,
+  counts: { lookups: 0, hits: 0, misses: 0, bypass: 0, stored: 0, too_large: 0, evictions: 0 },
+}));
+
+registerMetrics('tts_cache', () => {
+  const { counts } = state;
+  return {
+    ...counts,
+    entries: state.lru.size,
+    bytes: state.bytes,
+    max_bytes: MAX_BYTES,
+    hit_rate: counts.lookups ? Number((counts.hits / counts.lookups).toFixed(4)) : 0,
+  };
+});
+
+/**
+ * Text as spoken: Unicode-normalized, typographic quotes and dashes folded,
+ * whitespace collapsed. Case is kept; it changes how acronyms are read.
+ */
+export function normalizeSpokenText(text: string): string {
+  return text
+    .normalize('NFKC')
+    .replace(/[‘’]/g, "'")
+    .replace(/[“”]/g, '"')
+    .replace(/[–—]/g, '-')
+    .replace(/\s+/g, ' ')
+    .trim();
+}
+
+export function ttsCacheKey(model: string, text: string): string {
+  return createHash('sha256')
+    .update(`${CACHE_VERSION}:${model}:`)
+    .update(normalizeSpokenText(text))
+    .digest('hex');
+}
+
+/**
+ * Cached audio for `key`, or undefined on a miss; counts the lookup
+ */
+export function cachedAudio(key: string): Uint8Array | undefined {
+  state.counts.lookups += 1;
+  const audio = state.lru.get(key);
+  if (!audio) {
+    state.counts.misses += 1;
+    return undefined;
+  }
+  state.counts.hits += 1;
+  // Re-insert to mark as most recently used
+  state.lru.delete(key);
+  state.lru.set(key, audio);
+  return audio;
+}
+
+export function countBypass(): void {
+  state.counts.bypass += 1;
+}
+
+function store(key: string, audio: Uint8Array): void {
+  const previous = state.lru.get(key);
+  if (previous) {
+    state.lru.delete(key);
+    state.bytes -= previous.byteLength;
+  }
+  state.lru.set(key, audio);
+  state.bytes += audio.byteLength;
+  state.counts.stored += 1;
+  while (state.bytes > MAX_BYTES && state.lru.size > 1) {
+    const [oldestKey, oldest] = state.lru.entries().next().value as [string, Uint8Array];
+    state.lru.delete(oldestKey);
+    state.bytes -= oldest.byteLength;
+    state.counts.evictions += 1;
+  }
+}
+
+/**
+ * Pass `body` through unchanged while collecting it; the whole clip is
+ * cached under `key` once the stream ends normally (a cancelled stream never
+ * reaches flush)
+ */
+export function streamIntoCache(key: string, body: ReadableStream<Uint8Array>): ReadableStream<Uint8Array> {
+  const chunks: Uint8Array[] = [];
+  let size = 0;
+
+  return body.pipeThrough(new TransformStream<Uint8Array, Uint8Array>({
+    transform(chunk, controller) {
+      // Past the per-entry limit the clip won't be cached; stop holding on to it
+      if (size <= MAX_ENTRY_BYTES) chunks.push(chunk);
+      size += chunk.byteLength;
+      controller.enqueue(chunk);
+    },
+    flush() {
+      if (size > MAX_ENTRY_BYTES) {
+        state.counts.too_large += 1;
+        return;
+      }
+      const audio = new Uint8Array(size);
+      let offset = 0;
+      for (const chunk of chunks) {
+        audio.set(chunk, offset);
+        offset += chunk.byteLength;
+      }
+      store(key, audio);
+    },
+  }));
+}
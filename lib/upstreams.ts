@@ -0,0 +1,34 @@
+/**
+ * Upstream AI/voice service endpoints
+ *
+ * Both default to the real services. Setting GEMINI_BASE_URL or
+ * DEEPGRAM_BASE_URL points the backend at a local stand-in
+ * (see tests/fake_upstream.py) so our own overhead can be measured
+ * without network or quota noise.
+ */
+
+import type { RequestOptions } from '@google/generative-ai';
+
+const GEMINI_BASE_URL = process.env.GEMINI_BASE_URL?.replace(/\/$/, '');
+const GEMINI_DEFAULT_URL = 'https://generativelanguage.googleapis.com';
+
+export const DEEPGRAM_BASE_URL = (process.env.DEEPGRAM_BASE_URL || 'https://api.deepgram.com').replace(/\/$/, '');
+
+/**
+ * Request options for genAI.getGenerativeModel(params, options)
+ */
+export const geminiRequestOptions: RequestOptions = GEMINI_BASE_URL ? { baseUrl: GEMINI_BASE_URL } : {};
+
+/**
+ * Absolute Deepgram REST URL for a path such as `/v1/speak?model=...`
+ */
+export function deepgramUrl(path: string): string {
+  return `${DEEPGRAM_BASE_URL}${path}`;
+}
+
+/**
+ * Absolute Gemini REST URL for a path such as `/v1beta/models`
+ */
+export function geminiUrl(path: string): string {
+  return `${GEMINI_BASE_URL || GEMINI_DEFAULT_URL}${path}`;
+}
\ No newline at end of file
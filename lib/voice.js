@@ -3,6 +3,39 @@
 let currentAudio = null;
 let currentUrl = null;
 
+/**
+ * An <audio> for a streamed /api/tts response. Where MediaSource takes MP3,
+ * chunks are appended as they arrive so playback starts on the first bytes;
+ * elsewhere the whole clip is buffered first.
+ */
+async function audioFromResponse(response) {
+  const body = response.body;
+  if (!body || typeof MediaSource === 'undefined' || !MediaSource.isTypeSupported('audio/mpeg')) {
+    currentUrl = URL.createObjectURL(await response.blob());
+    return new Audio(currentUrl);
+  }
+  
+  const mediaSource = new MediaSource();
+  currentUrl = URL.createObjectURL(mediaSource);
+  mediaSource.addEventListener('sourceopen', async () => {
+    const reader = body.getReader();
+    try {
+      const buffer = mediaSource.addSourceBuffer('audio/mpeg');
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer.appendBuffer(value);
+        await new Promise(resolve => buffer.addEventListener('updateend', resolve, { once: true }));
+      }
+      mediaSource.endOfStream();
+    } catch (error) {
+      // Playback was stopped (or the stream failed) mid-clip
+      reader.cancel().catch(() => {});
+    }
+  }, { once: true });
+  return new Audio(currentUrl);
+}
+
 /**
  * Speak text using Deepgram Aura-2 TTS
  * @param {string} text - Text to speak
@@ -30,9 +63,8 @@ export async function speakDeepgram(text, model = 'aura-2-hermes-en') {
       throw new Error(`TTS failed: ${error.error}`);
     }
     
-    const audioBlob = await response.blob();
-    currentUrl = URL.createObjectURL(audioBlob);
-    currentAudio = new Audio(currentUrl);
+    // Streamed: playback starts before the whole clip has arrived
+    currentAudio = await audioFromResponse(response);
     
     // Auto-cleanup when audio ends
     currentAudio.onended = () => stopSpeaking();
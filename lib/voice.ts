@@ -3,6 +3,39 @@
 let currentAudio: HTMLAudioElement | null = null;
 let currentUrl: string | null = null;
 
+/**
+ * An <audio> for a streamed /api/tts response. Where MediaSource takes MP3,
+ * chunks are appended as they arrive so playback starts on the first bytes;
+ * elsewhere the whole clip is buffered first.
+ */
+async function audioFromResponse(response: Response): Promise<HTMLAudioElement> {
+  const body = response.body;
+  if (!body || typeof MediaSource === 'undefined' || !MediaSource.isTypeSupported('audio/mpeg')) {
+    currentUrl = URL.createObjectURL(await response.blob());
+    return new Audio(currentUrl);
+  }
+  
+  const mediaSource = new MediaSource();
+  currentUrl = URL.createObjectURL(mediaSource);
+  mediaSource.addEventListener('sourceopen', async () => {
+    const reader = body.getReader();
+    try {
+      const buffer = mediaSource.addSourceBuffer('audio/mpeg');
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer.appendBuffer(value);
+        await new Promise(resolve => buffer.addEventListener('updateend', resolve, { once: true }));
+      }
+      mediaSource.endOfStream();
+    } catch (error) {
+      // Playback was stopped (or the stream failed) mid-clip
+      reader.cancel().catch(() => {});
+    }
+  }, { once: true });
+  return new Audio(currentUrl);
+}
+
 /**
  * Speak text using Deepgram TTS
  */
@@ -28,9 +61,8 @@ export async function speakDeepgram(text: string, model = 'aura-asteria-en'): Pr
       throw new Error(`TTS failed: ${error.error}`);
     }
     
-    const audioBlob = await response.blob();
-    currentUrl = URL.createObjectURL(audioBlob);
-    currentAudio = new Audio(currentUrl);
+    // Streamed: playback starts before the whole clip has arrived
+    currentAudio = await audioFromResponse(response);
     
     // Auto-cleanup when audio ends
     currentAudio.onended = () => stopSpeaking();
@@ -155,6 +187,115 @@ export async function pushToTalk(maxDuration = 5000): Promise<{ text: string }>
   }
 }
 
+/**
+ * Open the /api/stt/stream socket, or null if the server doesn't offer it
+ * (plain `next start` / Netlify have no WebSocket upgrade)
+ */
+function openSttStream(timeoutMs = 3000): Promise<WebSocket | null> {
+  const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+  return new Promise(resolve => {
+    const socket = new WebSocket(`${protocol}://${window.location.host}/api/stt/stream`);
+    const timer = setTimeout(() => {
+      socket.close();
+      resolve(null);
+    }, timeoutMs);
+    socket.onopen = () => {
+      clearTimeout(timer);
+      resolve(socket);
+    };
+    socket.onerror = () => {
+      clearTimeout(timer);
+      resolve(null);
+    };
+  });
+}
+
+/**
+ * Streaming push-to-talk: audio goes to /api/stt/stream while the user is
+ * still talking, so the transcript is ready moments after they stop instead
+ * of after a full upload and batch transcription. onInterim receives the
+ * transcript so far. Falls back to pushToTalk() when streaming is unavailable.
+ */
+export async function streamToTalk(
+  onInterim?: (text: string) => void,
+  maxDuration = 5000
+): Promise<{ text: string }> {
+  const socket = await openSttStream();
+  if (!socket) {
+    console.log('Streaming STT unavailable, falling back to buffered upload');
+    return pushToTalk(maxDuration);
+  }
+  
+  try {
+    const stream = await navigator.mediaDevices.getUserMedia({ 
+      audio: {
+        echoCancellation: true,
+        noiseSuppression: true,
+        sampleRate: 44100
+      }
+    });
+    
+    const mediaRecorder = new MediaRecorder(stream, { 
+      mimeType: 'audio/webm;codecs=opus' 
+    });
+    
+    const finals: string[] = [];
+    const transcript = new Promise<string>((resolve, reject) => {
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'transcript') {
+          if (message.is_final) finals.push(message.text);
+          onInterim?.([...finals, message.is_final ? '' : message.text].join(' ').trim());
+        } else if (message.type === 'done') {
+          resolve(message.text || '');
+        } else if (message.type === 'error') {
+          reject(new Error(`STT failed: ${message.error}`));
+        }
+      };
+      socket.onclose = () => reject(new Error('STT stream closed before the final transcript'));
+    });
+    
+    // Send audio every 250ms while recording
+    mediaRecorder.ondataavailable = (event) => {
+      if (event.data.size > 0 && socket.readyState === WebSocket.OPEN) {
+        socket.send(event.data);
+      }
+    };
+    
+    mediaRecorder.onstop = () => {
+      stream.getTracks().forEach(track => track.stop());
+      if (socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify({ type: 'stop' }));
+      }
+    };
+    
+    mediaRecorder.start(250);
+    console.log('Streaming recording started...');
+    
+    // Auto-stop after maxDuration
+    setTimeout(() => {
+      if (mediaRecorder.state === 'recording') {
+        mediaRecorder.stop();
+      }
+    }, maxDuration);
+    
+    const text = (await transcript).trim();
+    console.log('Streaming transcription result:', text);
+    
+    if (!text) {
+      throw new Error('No speech detected in recording');
+    }
+    
+    return { text };
+    
+  } catch (error) {
+    console.error('Streaming push-to-talk error:', error);
+    throw error;
+  } finally {
+    socket.close();
+  }
+}
+
 /**
  * Check if TTS is currently playing
  */
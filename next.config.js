@@ -5,7 +5,9 @@ const nextConfig = {
   },
   experimental: {
     // Remove if not using Server Components
-    serverComponentsExternalPackages: ['mongodb'],
+    serverComponentsExternalPackages: ['mongodb', 'sharp'],
+    // instrumentation.ts: warm the MongoDB pool and Tesseract workers at startup
+    instrumentationHook: true,
   },
   webpack(config, { dev }) {
     if (dev) {
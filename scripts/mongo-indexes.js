@@ -44,6 +44,22 @@ const INDEXES = [
     ]
   },
   
+  // Per-user daily nutrition totals (lib/repos/mongo/daily-rollups.ts)
+  {
+    collection: 'daily_rollups',
+    indexes: [
+      { key: { user_id: 1, date: -1 }, unique: true, name: 'idx_daily_rollups_user_date' }
+    ]
+  },
+  
+  // Stored responses for Idempotency-Key retries (lib/idempotency.ts); _id is scope:user:key
+  {
+    collection: 'idempotency_keys',
+    indexes: [
+      { key: { expires_at: 1 }, expireAfterSeconds: 0, name: 'idx_idempotency_keys_ttl' }
+    ]
+  },
+  
   // Food items master collection  
   {
     collection: 'food_items',
@@ -53,7 +69,9 @@ const INDEXES = [
       { key: { region_enum: 1 }, name: 'idx_food_items_region' },
       { key: { source_enum: 1 }, name: 'idx_food_items_source' },
       { key: { kcal_per_unit: 1 }, name: 'idx_food_items_kcal' },
-      { key: { canonical_name: 'text' }, name: 'idx_food_items_text_search' }
+      { key: { canonical_name: 'text' }, name: 'idx_food_items_text_search' },
+      // Newest-row lookup behind the food catalog's change check (lib/food-catalog.ts)
+      { key: { updated_at: -1, created_at: -1 }, name: 'idx_food_items_updated' }
     ]
   },
   
@@ -63,6 +81,7 @@ const INDEXES = [
     indexes: [
       { key: { user_id: 1, ts: -1 }, name: 'idx_ocr_scans_user_ts' },
       { key: { user_id: 1 }, name: 'idx_ocr_scans_user_id' },
+      { key: { image_hash: 1, ts: -1 }, name: 'idx_ocr_scans_image_hash' },
       { key: { ts: -1 }, name: 'idx_ocr_scans_ts' },
       { key: { language_detected: 1 }, name: 'idx_ocr_scans_language' },
       { key: { source_confidence: 1 }, name: 'idx_ocr_scans_confidence' },
@@ -76,6 +95,7 @@ const INDEXES = [
     indexes: [
       { key: { user_id: 1, ts: -1 }, name: 'idx_photo_analyses_user_ts' },
       { key: { user_id: 1 }, name: 'idx_photo_analyses_user_id' },
+      { key: { image_hash: 1, ts: -1 }, name: 'idx_photo_analyses_image_hash' },
       { key: { ts: -1 }, name: 'idx_photo_analyses_ts' },
       { key: { chosen_food_id: 1 }, name: 'idx_photo_analyses_food_id' },
       { key: { confidence: 1 }, name: 'idx_photo_analyses_confidence' },
@@ -91,7 +111,8 @@ const INDEXES = [
       { key: { term: 1 }, name: 'idx_dish_synonyms_term' },
       { key: { lang_enum: 1 }, name: 'idx_dish_synonyms_lang' },
       { key: { weight: -1 }, name: 'idx_dish_synonyms_weight' },
-      { key: { term: 'text' }, name: 'idx_dish_synonyms_text_search' }
+      { key: { term: 'text' }, name: 'idx_dish_synonyms_text_search' },
+      { key: { created_at: -1 }, name: 'idx_dish_synonyms_created_at' }
     ]
   }
 ];
@@ -115,6 +136,7 @@ async function createIndexes() {
           const result = await coll.createIndex(indexSpec.key, {
             name: indexSpec.name,
             unique: indexSpec.unique || false,
+            ...(indexSpec.expireAfterSeconds !== undefined && { expireAfterSeconds: indexSpec.expireAfterSeconds }),
             background: true
           });
           console.log(`  ✅ Created index: ${indexSpec.name} -> ${result}`);
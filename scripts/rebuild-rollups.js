@@ -0,0 +1,197 @@
+/**
+ * Rebuild daily_rollups from food_logs
+ * Run with: npm run db:rollups [-- --user <user_id>] [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+ *
+ * Backfills rollups for logs written before daily_rollups existed, and repairs
+ * any drift between the two (the per-log $inc is not transactional). Days in
+ * scope are recomputed with one aggregation into a scratch collection, never
+ * into the live one, then swapped in:
+ *   - whole collection: the scratch collection (with daily_rollups' indexes)
+ *     is renamed over daily_rollups in one step
+ *   - --user / --from / --to: the scope's days are replaced from the scratch
+ *     collection and days with no remaining logs are removed
+ *
+ * A log written while the aggregation runs would be missed by it, and its
+ * $inc applied to rollups that are about to be replaced. Run with log writes
+ * paused: if food_logs in scope changes during the rebuild, nothing is
+ * swapped in and the script exits non-zero.
+ */
+
+const { MongoClient } = require('mongodb');
+
+const MONGO_URL = process.env.MONGO_URL || 'mongodb://localhost:27017';
+const DB_NAME = process.env.DB_NAME || 'your_database_name';
+// Must match lib/repos/mongo/daily-rollups.ts
+const ROLLUP_TIMEZONE = process.env.ROLLUP_TIMEZONE || 'Asia/Kolkata';
+
+function parseArgs(argv) {
+  const args = {};
+  for (let i = 0; i < argv.length; i++) {
+    const flag = argv[i];
+    if (['--user', '--from', '--to'].includes(flag)) {
+      args[flag.slice(2)] = argv[++i];
+    }
+  }
+  return args;
+}
+
+/**
+ * food_logs -> one {user_id, date, totals, log_count} per user per local day
+ */
+function rollupPipeline({ user, from, to }, into = 'daily_rollups_rebuild') {
+  const match = {};
+  if (user) match.user_id = user;
+  
+  const pipeline = [
+    { $match: match },
+    {
+      $group: {
+        _id: {
+          user_id: '$user_id',
+          date: { $dateToString: { format: '%Y-%m-%d', date: '$ts', timezone: ROLLUP_TIMEZONE } }
+        },
+        kcal: { $sum: { $ifNull: ['$kcal', 0] } },
+        protein_g: { $sum: { $ifNull: ['$protein_g', 0] } },
+        carb_g: { $sum: { $ifNull: ['$carb_g', 0] } },
+        fat_g: { $sum: { $ifNull: ['$fat_g', 0] } },
+        fiber_g: { $sum: { $ifNull: ['$fiber_g', 0] } },
+        sodium_mg: { $sum: { $ifNull: ['$sodium_mg', 0] } },
+        log_count: { $sum: 1 }
+      }
+    }
+  ];
+  
+  const dateRange = {};
+  if (from) dateRange.$gte = from;
+  if (to) dateRange.$lte = to;
+  if (from || to) pipeline.push({ $match: { '_id.date': dateRange } });
+  
+  pipeline.push(
+    {
+      $project: {
+        _id: 0,
+        user_id: '$_id.user_id',
+        date: '$_id.date',
+        kcal: 1, protein_g: 1, carb_g: 1, fat_g: 1, fiber_g: 1, sodium_mg: 1, log_count: 1,
+        updated_at: '$$NOW'
+      }
+    },
+    { $out: into }
+  );
+  
+  return pipeline;
+}
+
+/**
+ * Log count and newest _id in scope: unchanged before and after the
+ * aggregation means no log write raced it
+ */
+async function logsMarker(db, { user }) {
+  const logs = db.collection('food_logs');
+  const filter = user ? { user_id: user } : {};
+  const [count, newest] = await Promise.all([
+    logs.countDocuments(filter),
+    logs.find(filter, { projection: { _id: 1 } }).sort({ _id: -1 }).limit(1).next()
+  ]);
+  return `${count}:${newest?._id ?? ''}`;
+}
+
+/**
+ * Whole-collection rebuild: give the scratch collection daily_rollups'
+ * indexes, then rename it over daily_rollups (atomic for readers)
+ */
+async function swapAll(db, scratch) {
+  const live = db.collection('daily_rollups');
+  const indexes = await live.indexes().catch(() => []);
+  for (const { key, name, v, ns, ...options } of indexes) {
+    if (name !== '_id_') await scratch.createIndex(key, { name, ...options });
+  }
+  await scratch.rename('daily_rollups', { dropTarget: true });
+}
+
+/**
+ * Scoped rebuild: replace the scope's days from the scratch collection and
+ * remove the scope's days that no longer have logs
+ */
+async function swapScope(db, scratch, inScope) {
+  const live = db.collection('daily_rollups');
+  const dayKey = (row) => `${row.user_id}|${row.date}`;
+  const rebuilt = new Set(
+    (await scratch.find({}, { projection: { user_id: 1, date: 1 } }).toArray()).map(dayKey)
+  );
+  const emptied = (await live.find(inScope, { projection: { user_id: 1, date: 1 } }).toArray())
+    .filter(row => !rebuilt.has(dayKey(row)))
+    .map(row => row._id);
+  if (emptied.length) await live.deleteMany({ _id: { $in: emptied } });
+  
+  await scratch.aggregate([
+    { $project: { _id: 0 } },
+    {
+      $merge: {
+        into: 'daily_rollups',
+        on: ['user_id', 'date'], // needs the unique idx_daily_rollups_user_date
+        whenMatched: 'replace',
+        whenNotMatched: 'insert'
+      }
+    }
+  ]).toArray();
+  await scratch.drop();
+  return emptied.length;
+}
+
+async function rebuildRollups(scope = {}) {
+  const client = new MongoClient(MONGO_URL);
+  
+  try {
+    await client.connect();
+    console.log('✅ Connected to MongoDB');
+    
+    const db = client.db(DB_NAME);
+    const started = Date.now();
+    
+    const inScope = {};
+    if (scope.user) inScope.user_id = scope.user;
+    if (scope.from || scope.to) {
+      inScope.date = {};
+      if (scope.from) inScope.date.$gte = scope.from;
+      if (scope.to) inScope.date.$lte = scope.to;
+    }
+    const whole = Object.keys(inScope).length === 0;
+    
+    const scratchName = `daily_rollups_rebuild_${Date.now()}`;
+    const scratch = db.collection(scratchName);
+    const before = await logsMarker(db, scope);
+    await db.collection('food_logs')
+      .aggregate(rollupPipeline(scope, scratchName), { allowDiskUse: true })
+      .toArray();
+    if (await logsMarker(db, scope) !== before) {
+      await scratch.drop().catch(() => {});
+      throw new Error('food_logs changed during the rebuild; pause log writes and run again');
+    }
+    
+    const rebuilt = await scratch.countDocuments();
+    if (whole) {
+      await swapAll(db, scratch);
+      console.log('🔁 Replaced daily_rollups with the rebuilt collection');
+    } else {
+      const removed = await swapScope(db, scratch, inScope);
+      console.log(`🧹 Removed ${removed} rollups in scope with no remaining logs`);
+    }
+    console.log(`🎉 Rebuilt ${rebuilt} daily rollups in ${Date.now() - started}ms`);
+    return rebuilt;
+    
+  } catch (error) {
+    console.error('❌ Error rebuilding rollups:', error);
+    process.exit(1);
+  } finally {
+    await client.close();
+    console.log('✅ MongoDB connection closed');
+  }
+}
+
+// Run if called directly
+if (require.main === module) {
+  rebuildRollups(parseArgs(process.argv.slice(2))).catch(console.error);
+}
+
+module.exports = { rebuildRollups, rollupPipeline };
@@ -0,0 +1,37 @@
+/**
+ * Custom Next.js Server with Streaming Speech-to-Text
+ *
+ * Next.js route handlers cannot accept WebSocket upgrades, so `yarn dev:stream`
+ * and `yarn start:stream` run Next through this server: /api/stt/stream
+ * upgrades go to lib/realtime/stt-relay.js, everything else (including HMR
+ * sockets in dev) to Next. `yarn dev`, `yarn start` and the Netlify deploy do
+ * not need it; clients fall back to POST /api/stt when the socket won't open.
+ */
+
+const http = require('http');
+const next = require('next');
+const { STT_STREAM_PATH, handleSttUpgrade } = require('./lib/realtime/stt-relay');
+
+const dev = process.env.NODE_ENV !== 'production';
+const hostname = process.env.HOST || '0.0.0.0';
+const port = Number(process.env.PORT || 3000);
+
+const app = next({ dev, hostname, port });
+const handle = app.getRequestHandler();
+
+app.prepare().then(() => {
+  const server = http.createServer((req, res) => handle(req, res));
+  const handleNextUpgrade = app.getUpgradeHandler();
+
+  server.on('upgrade', (req, socket, head) => {
+    if (new URL(req.url, 'http://localhost').pathname === STT_STREAM_PATH) {
+      handleSttUpgrade(req, socket, head);
+      return;
+    }
+    handleNextUpgrade(req, socket, head);
+  });
+
+  server.listen(port, hostname, () => {
+    console.log(`> Ready on http://${hostname}:${port} (streaming STT at ws://${hostname}:${port}${STT_STREAM_PATH})`);
+  });
+});
@@ -0,0 +1,174 @@
+"""
+Latency Benchmark Harness for Fitbear AI critical endpoints
+Repeats a request N times, summarises the latency distribution and compares
+it against a stored baseline file and absolute latency budgets
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from tests.loadgen import percentile
+
+DEFAULT_BASELINE_PATH = os.environ.get(
+    "FITBEAR_BASELINE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "latency_baseline.json")
+)
+DEFAULT_TOLERANCE = float(os.environ.get("FITBEAR_BASELINE_TOLERANCE", "0.25"))
+
+
+def measure(fn, reps, warmup=1):
+    """
+    Call `fn` (which returns a response) `reps` times after `warmup` untimed calls.
+    Returns (latencies of successful calls in seconds, number of failed calls).
+    """
+    for _ in range(warmup):
+        try:
+            fn()
+        except Exception:
+            pass
+
+    latencies = []
+    errors = 0
+    for _ in range(reps):
+        start = time.perf_counter()
+        try:
+            response = fn()
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        if ok:
+            latencies.append(elapsed)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def distribution(latencies, errors=0):
+    """Summary statistics (milliseconds) for one endpoint's samples"""
+    ordered = sorted(latencies)
+    total = len(ordered) + errors
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "n": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "min_ms": ms(ordered[0] if ordered else None),
+        "mean_ms": ms(sum(ordered) / len(ordered) if ordered else None),
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p90_ms": ms(percentile(ordered, 90)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+        "samples_ms": [ms(v) for v in latencies],
+    }
+
+
+def load_baseline(path=DEFAULT_BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, base_url, path=DEFAULT_BASELINE_PATH):
+    baseline = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": base_url,
+        "endpoints": results,
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    return baseline
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, budgets=None):
+    """
+    Return a list of human-readable failures: p95 regressions beyond
+    `tolerance` (a fraction, 0.25 = 25% slower) against the baseline, and
+    p95 values over the absolute `budgets` ({endpoint: seconds}).
+    """
+    failures = []
+    budgets = budgets or {}
+    baseline_endpoints = (baseline or {}).get("endpoints", {})
+
+    for endpoint, current in results.items():
+        p95 = current.get("p95_ms")
+        if p95 is None:
+            failures.append(f"{endpoint}: no successful samples ({current.get('errors', 0)} errors)")
+            continue
+
+        budget = budgets.get(endpoint)
+        if budget is not None and p95 > budget * 1000:
+            failures.append(f"{endpoint}: p95 {p95:.0f}ms exceeds budget {budget * 1000:.0f}ms")
+
+        reference = baseline_endpoints.get(endpoint, {}).get("p95_ms")
+        if reference:
+            allowed = reference * (1 + tolerance)
+            if p95 > allowed:
+                failures.append(
+                    f"{endpoint}: p95 {p95:.0f}ms regressed from baseline {reference:.0f}ms "
+                    f"(+{(p95 / reference - 1) * 100:.0f}%, tolerance {tolerance * 100:.0f}%)"
+                )
+    return failures
+
+
+def print_results(results, baseline=None):
+    print("\n" + "="*60)
+    print("📊 LATENCY BENCHMARK")
+    print("="*60)
+    baseline_endpoints = (baseline or {}).get("endpoints", {})
+    header = f"{'endpoint':<22}{'n':>5}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'base p95':>10}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, row in results.items():
+        reference = baseline_endpoints.get(endpoint, {}).get("p95_ms")
+        print(
+            f"{endpoint:<22}{row['n']:>5}{row['errors']:>5}"
+            f"{_fmt(row['p50_ms']):>9}{_fmt(row['p95_ms']):>9}{_fmt(row['p99_ms']):>9}{_fmt(reference):>10}"
+        )
+    print("(latencies in ms)")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.0f}"
+
+
+def run_benchmark(probes, reps, base_url, baseline_path=DEFAULT_BASELINE_PATH,
+                  tolerance=DEFAULT_TOLERANCE, budgets=None, update_baseline=False):
+    """
+    Benchmark each probe ({endpoint: fn}), then either record the results as
+    the new baseline or check them against the existing one. Returns True
+    when there are no regressions or budget violations.
+    """
+    results = {}
+    for endpoint, fn in probes.items():
+        print(f"Benchmarking {endpoint} ({reps} reps)...")
+        latencies, errors = measure(fn, reps)
+        results[endpoint] = distribution(latencies, errors)
+
+    baseline = load_baseline(baseline_path)
+    print_results(results, baseline)
+
+    if update_baseline:
+        save_baseline(results, base_url, baseline_path)
+        print(f"\n💾 Baseline written to {baseline_path}")
+        failures = compare(results, None, tolerance, budgets)
+    else:
+        if baseline is None:
+            print(f"\n⚠️  No baseline at {baseline_path} - run with --update-baseline to record one")
+        failures = compare(results, baseline, tolerance, budgets)
+
+    if failures:
+        print("\n❌ LATENCY CHECK FAILED")
+        for failure in failures:
+            print(f"  - {failure}")
+        return False
+
+    print("\n✅ Latency within budget and baseline tolerance")
+    return True
@@ -0,0 +1,464 @@
+"""
+Local Stand-in for Gemini and Deepgram
+Speaks enough of Gemini generateContent / streamGenerateContent and Deepgram
+/v1/speak and /v1/listen (batch, and live over WebSocket) for the backend to
+run offline, with configurable injected latency, failures and 429s.
+
+Start it, then start Next.js pointed at it:
+
+    python -m tests.fake_upstream --port 8090 --latency-ms 150
+    GEMINI_API_KEY=offline DEEPGRAM_API_KEY=offline \\
+    GEMINI_BASE_URL=http://localhost:8090 DEEPGRAM_BASE_URL=http://localhost:8090 yarn dev
+
+MongoDB has no stand-in here: run a local mongod (e.g. `docker run -p 27017:27017 mongo:7`)
+and point MONGO_URL at it, which is already network-free.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from websockets.frames import Opcode
+from websockets.http11 import Request
+from websockets.protocol import State
+from websockets.server import ServerProtocol
+
+# Largest message the live /v1/listen socket accepts, as the relay allows
+LIVE_MAX_MESSAGE_BYTES = 4 * 1024 * 1024
+
+MENU_LINES = [
+    "Dal Tadka - ₹180",
+    "Paneer Tikka - ₹250",
+    "Chole - ₹190",
+    "Masala Dosa - ₹140",
+    "Biryani - ₹280",
+    "Roti - ₹25",
+    "Naan - ₹35",
+]
+
+COACH_REPLY = (
+    "Great question! For a vegetarian, protein-forward breakfast try 2 moong dal chillas with "
+    "a katori of curd, or paneer bhurji with 1 roti. Add a handful of roasted chana for a snack. "
+    "That gets you roughly 25-30 g protein before lunch. General guidance only; not medical advice."
+)
+
+DEFAULT_CONFIG = {
+    "latency_ms": 0.0,        # mean added latency per request
+    "jitter_ms": 0.0,         # +/- uniform jitter around the mean
+    "failure_rate": 0.0,      # probability of a 500
+    "rate_limit_rate": 0.0,   # probability of a 429
+    "gemini_quota_rps": 0.0,  # Gemini generate calls allowed per 1s window, 429 beyond it (0 = no quota)
+    "menu_corpus_size": 0,    # >0: menu scans read one of this many restaurants' menus (tests/menu_corpus.py)
+    "stream_chunk_ms": 20.0,  # delay between streamed chunks (Gemini SSE, TTS audio)
+    "tts_bytes_per_char": 120,
+    "transcript": "two rotis and a katori of dal",
+    "live_bytes_per_word": 16000,  # live STT: audio heard per interim word (0.5s of 16kHz PCM)
+}
+
+
+class UpstreamState:
+    """Mutable config plus request counters, shared by all handler threads"""
+
+    def __init__(self, **overrides):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update({k: v for k, v in overrides.items() if v is not None})
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.quota_window = (0.0, 0)  # (window start, calls admitted in it)
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def take_quota(self, per_second):
+        """Admit one call under a fixed 1s-window quota; else seconds until the next window"""
+        with self.lock:
+            now = time.monotonic()
+            start, used = self.quota_window
+            if now - start >= 1.0:
+                start, used = now, 0
+            if used >= per_second:
+                self.quota_window = (start, used)
+                return start + 1.0 - now
+            self.quota_window = (start, used + 1)
+            return None
+
+    def snapshot(self):
+        with self.lock:
+            return {"config": dict(self.config), "counts": dict(self.counts)}
+
+
+def _corpus_menu_text(prompt, corpus_size):
+    """A random restaurant's menu from tests/menu_corpus.py, in the shape the calling route asked for"""
+    from tests.menu_corpus import menu_items
+
+    items = menu_items(random.randrange(corpus_size))
+    text = "\n".join(item["line"] for item in items)
+    if '"recommendations"' not in prompt:
+        return text
+    return json.dumps({
+        "ocr_method": "gemini_vision",
+        "text": text,
+        "recommendations": [
+            {"name": item["name"], "price": item["price"], "category": "alternate", "reason": "Portion control"}
+            for item in items if item["name"]
+        ],
+    }, ensure_ascii=False)
+
+
+def _gemini_text_for(prompt, menu_corpus_size=0):
+    """Pick a canned answer matching what the calling route asked for"""
+    if menu_corpus_size and ('"recommendations"' in prompt or "food item names" in prompt):
+        return _corpus_menu_text(prompt, menu_corpus_size)
+    if '"recommendations"' in prompt:
+        return json.dumps({
+            "ocr_method": "gemini_vision",
+            "text": "\n".join(MENU_LINES),
+            "recommendations": [
+                {"name": "Paneer Tikka", "price": "₹250", "category": "recommended", "reason": "High protein, grilled"},
+                {"name": "Dal Tadka", "price": "₹180", "category": "recommended", "reason": "Protein and fiber"},
+                {"name": "Biryani", "price": "₹280", "category": "alternate", "reason": "Calorie dense, share it"},
+                {"name": "Naan", "price": "₹35", "category": "avoid", "reason": "Refined flour, butter"},
+            ],
+        }, ensure_ascii=False)
+    if '"guess"' in prompt or "guess, portion_hint" in prompt:
+        return json.dumps({
+            "guess": [
+                {"food_id": "dal-tadka", "name": "Dal Tadka", "confidence": 0.82, "portion_hints": "1 katori"},
+                {"food_id": "roti", "name": "Roti", "confidence": 0.74, "portion_hints": "2 pieces"},
+            ],
+            "portion_hint": "1 katori dal, 2 roti",
+            "confidence": 0.78,
+            "nutrition": {"calories": 420, "protein": 15, "carbs": 60, "fat": 10},
+        })
+    if "food item names" in prompt:
+        return "\n".join(MENU_LINES)
+    return COACH_REPLY
+
+
+def _prompt_text(body):
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                parts.append(part["text"])
+    return "\n".join(parts)
+
+
+def _gemini_payload(text, finish=True):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {"promptTokenCount": 100, "candidatesTokenCount": max(1, len(text) // 4)},
+    }
+
+
+def make_handler(state):
+    class FakeUpstreamHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        # -- helpers -------------------------------------------------------
+
+        def _read_body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _send(self, status, body, content_type="application/json", headers=None):
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body).encode()
+            elif isinstance(body, str):
+                body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _start_chunked(self, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _chunk(self, data):
+            if isinstance(data, str):
+                data = data.encode()
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _end_chunked(self):
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+        def _rate_limited(self, retry_after_s):
+            """Gemini's quota error: RESOURCE_EXHAUSTED with a RetryInfo detail"""
+            self._send(429, {"error": {
+                "code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                "status": "RESOURCE_EXHAUSTED",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                             "retryDelay": f"{retry_after_s:.3f}s"}],
+            }}, headers={"Retry-After": str(max(1, math.ceil(retry_after_s)))})
+
+        def _inject(self, service):
+            """Apply latency and maybe short-circuit with an injected error"""
+            config = state.config
+            delay = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+            roll = random.random()
+            if roll < config["rate_limit_rate"]:
+                state.count(f"{service}:429")
+                self._rate_limited(1.0)
+                return True
+            if roll < config["rate_limit_rate"] + config["failure_rate"]:
+                state.count(f"{service}:500")
+                self._send(500, {"error": {"code": 500, "message": "Injected upstream failure", "status": "INTERNAL"}})
+                return True
+            return False
+
+        # -- routes --------------------------------------------------------
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/v1/listen" and self.headers.get("Upgrade", "").lower() == "websocket":
+                return self._listen_live()
+            if path == "/__stats":
+                return self._send(200, state.snapshot())
+            if path in ("/", "/health"):
+                return self._send(200, {"ok": True})
+            # Reachability probes from lib/health.ts
+            if path == "/v1beta/models":
+                state.count("gemini:models")
+                return self._send(200, {"models": [{"name": "models/gemini-2.0-flash"}]})
+            if path == "/v1/projects":
+                state.count("deepgram:projects")
+                return self._send(200, {"projects": [{"project_id": "offline", "name": "offline"}]})
+            return self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            path = url.path
+            query = parse_qs(url.query)
+            body = self._read_body()
+
+            if path == "/__config":
+                updates = json.loads(body or b"{}")
+                with state.lock:
+                    state.config.update({k: v for k, v in updates.items() if k in DEFAULT_CONFIG})
+                return self._send(200, state.snapshot())
+            if path == "/__reset":
+                with state.lock:
+                    state.counts = {}
+                return self._send(200, state.snapshot())
+
+            match = re.match(r"^/v1(?:beta)?/models/([^:]+):(generateContent|streamGenerateContent)$", path)
+            if match:
+                return self._gemini(match.group(2), body)
+            if path == "/v1/speak":
+                return self._speak(body, query)
+            if path == "/v1/listen":
+                return self._listen(body)
+            return self._send(404, {"error": f"unknown upstream path {path}"})
+
+        def _gemini(self, method, body):
+            state.count(f"gemini:{method}")
+            if state.config["gemini_quota_rps"] > 0:
+                wait = state.take_quota(state.config["gemini_quota_rps"])
+                if wait is not None:
+                    state.count("gemini:429")
+                    state.count("gemini:quota_exceeded")
+                    return self._rate_limited(wait)
+            if self._inject("gemini"):
+                return
+            text = _gemini_text_for(_prompt_text(json.loads(body or b"{}")), int(state.config["menu_corpus_size"]))
+
+            if method == "generateContent":
+                return self._send(200, _gemini_payload(text))
+
+            # streamGenerateContent?alt=sse: a few words per event
+            self._start_chunked("text/event-stream")
+            words = text.split(" ")
+            step = 4
+            for i in range(0, len(words), step):
+                piece = " ".join(words[i:i + step]) + (" " if i + step < len(words) else "")
+                event = _gemini_payload(piece, finish=i + step >= len(words))
+                self._chunk(f"data: {json.dumps(event)}\r\n\r\n")
+                time.sleep(state.config["stream_chunk_ms"] / 1000.0)
+            self._end_chunked()
+
+        def _speak(self, body, query):
+            state.count("deepgram:speak")
+            if self._inject("deepgram"):
+                return
+            text = json.loads(body or b"{}").get("text", "")
+            if not text:
+                return self._send(400, {"err_msg": "text is required"})
+            size = max(2048, len(text) * int(state.config["tts_bytes_per_char"]))
+            # ID3 header followed by filler frames; good enough for byte-level timing
+            audio = b"ID3\x04\x00\x00\x00\x00\x00\x00" + bytes((i * 7) % 251 for i in range(size))
+            self._start_chunked("audio/mpeg")
+            chunk_size = 4096
+            for i in range(0, len(audio), chunk_size):
+                self._chunk(audio[i:i + chunk_size])
+                time.sleep(state.config["stream_chunk_ms"] / 1000.0)
+            self._end_chunked()
+
+        def _listen(self, body):
+            state.count("deepgram:listen")
+            if self._inject("deepgram"):
+                return
+            # Tiny bodies (like the 4-byte WebM header the suite sends) have no speech
+            transcript = state.config["transcript"] if len(body) > 1024 else ""
+            return self._send(200, {
+                "metadata": {"request_id": "offline", "duration": len(body) / 32000.0},
+                "results": {"channels": [{"alternatives": [{"transcript": transcript, "confidence": 0.97 if transcript else 0.0}]}]},
+            })
+
+        def _listen_live(self):
+            """
+            Deepgram live transcription: interim Results grow by a word per
+            live_bytes_per_word of audio; CloseStream flushes the final result
+            (after the injected latency) and closes
+            """
+            state.count("deepgram:listen_live")
+            # websockets' sans-I/O protocol does the framing over this handler's
+            # socket; it parses the upgrade request itself, so replay it
+            protocol = ServerProtocol(max_size=LIVE_MAX_MESSAGE_BYTES)
+            headers = "".join(f"{name}: {value}\r\n" for name, value in self.headers.items())
+            protocol.receive_data(f"{self.requestline}\r\n{headers}\r\n".encode("latin-1"))
+            request = next(event for event in protocol.events_received() if isinstance(event, Request))
+            protocol.send_response(protocol.accept(request))
+            self.close_connection = True
+            words = state.config["transcript"].split()
+            per_word = max(1, int(state.config["live_bytes_per_word"]))
+            received = heard = 0
+
+            def send_json(value):
+                protocol.send_text(json.dumps(value).encode())
+                self._ws_flush(protocol)
+
+            try:
+                self._ws_flush(protocol)
+                if protocol.handshake_exc is not None:
+                    return
+                for opcode, payload in self._ws_messages(protocol):
+                    if opcode is Opcode.BINARY:
+                        received += len(payload)
+                        if min(len(words), received // per_word) > heard:
+                            heard = min(len(words), received // per_word)
+                            send_json(_live_result(words[:heard], received, is_final=False))
+                    elif json.loads(payload).get("type") == "CloseStream":
+                        break
+                else:
+                    return  # the relay closed first
+                delay = state.config["latency_ms"]
+                if delay > 0:
+                    time.sleep(delay / 1000.0)
+                # Tiny streams have no speech, like the batch endpoint
+                send_json(_live_result(words if received > 1024 else [], received, is_final=True))
+                send_json({"type": "Metadata", "request_id": "offline", "duration": received / 32000.0})
+                protocol.send_close(1000)
+                self._ws_flush(protocol)
+            except (ConnectionError, OSError):
+                pass
+
+        def _ws_flush(self, protocol):
+            for data in protocol.data_to_send():
+                if data:  # b"" only asks for a half-close; the handler closes the socket anyway
+                    self.wfile.write(data)
+
+        def _ws_messages(self, protocol):
+            """Whole TEXT/BINARY messages as (opcode, bytes) until the peer closes"""
+            opcode, fragments = None, []
+            while True:
+                data = self.rfile.read1(65536)
+                if data:
+                    protocol.receive_data(data)
+                else:
+                    protocol.receive_eof()
+                self._ws_flush(protocol)  # pongs and close replies
+                for frame in protocol.events_received():
+                    if frame.opcode in (Opcode.TEXT, Opcode.BINARY):
+                        opcode, fragments = frame.opcode, [frame.data]
+                    elif frame.opcode is Opcode.CONT:
+                        fragments.append(frame.data)
+                    else:
+                        continue
+                    if frame.fin:
+                        yield opcode, b"".join(fragments)
+                if not data or protocol.state is State.CLOSED:
+                    return
+
+    return FakeUpstreamHandler
+
+
+def _live_result(words, received, is_final):
+    return {
+        "type": "Results",
+        "start": 0.0,
+        "duration": received / 32000.0,
+        "is_final": is_final,
+        "speech_final": is_final,
+        "channel": {"alternatives": [{"transcript": " ".join(words), "confidence": 0.97 if words else 0.0}]},
+    }
+
+
+def serve(port=8090, host="127.0.0.1", **config):
+    """Create the server (not yet serving) and its shared state"""
+    state = UpstreamState(**config)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_in_background(port=8090, host="127.0.0.1", **config):
+    """Serve on a daemon thread; returns the server (call .shutdown() to stop)"""
+    server = serve(port, host, **config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for Gemini and Deepgram")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, help="Mean injected latency per request")
+    parser.add_argument("--jitter-ms", type=float, help="Uniform +/- jitter around the latency")
+    parser.add_argument("--failure-rate", type=float, help="Probability of an injected 500")
+    parser.add_argument("--rate-limit-rate", type=float, help="Probability of an injected 429")
+    parser.add_argument("--gemini-quota-rps", type=float, help="Gemini calls allowed per second before 429s")
+    parser.add_argument("--menu-corpus-size", type=int, help="Answer menu scans from this many synthetic restaurants")
+    parser.add_argument("--stream-chunk-ms", type=float, help="Delay between streamed chunks")
+    args = parser.parse_args()
+
+    server = serve(
+        args.port, args.host,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate, rate_limit_rate=args.rate_limit_rate,
+        gemini_quota_rps=args.gemini_quota_rps, menu_corpus_size=args.menu_corpus_size,
+        stream_chunk_ms=args.stream_chunk_ms,
+    )
+    print(f"🧪 Fake upstream listening on http://{args.host}:{args.port}")
+    print(f"   config: {server.state.config}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Shared HTTP Client for the Fitbear AI Python test suites
+Keep-alive connection pool with retries, plus per-request timing split into
+TCP connect, TLS handshake, server and transfer time
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = int(os.environ.get("FITBEAR_HTTP_POOL_SIZE", "20"))
+DEFAULT_RETRIES = int(os.environ.get("FITBEAR_HTTP_RETRIES", "2"))
+DEFAULT_BACKOFF = float(os.environ.get("FITBEAR_HTTP_BACKOFF", "0.3"))
+TRACE = os.environ.get("FITBEAR_HTTP_TRACE", "").lower() in ("1", "true", "yes")
+# Sent on every request so the suites can read GET /api/metrics when the server sets METRICS_TOKEN
+METRICS_TOKEN = os.environ.get("FITBEAR_METRICS_TOKEN", "")
+
+# Connection setup happens on the thread that issues the request, so the
+# timed connection classes report into thread-local state that the client
+# resets before each request and reads back afterwards.
+_connect_timing = threading.local()
+
+
+def _reset_connect_timing():
+    _connect_timing.tcp = 0.0
+    _connect_timing.connect = 0.0
+    _connect_timing.new_connections = 0
+
+
+def _add_connect_timing(tcp, total):
+    _connect_timing.tcp = getattr(_connect_timing, "tcp", 0.0) + tcp
+    _connect_timing.connect = getattr(_connect_timing, "connect", 0.0) + total
+    _connect_timing.new_connections = getattr(_connect_timing, "new_connections", 0) + 1
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        self._tcp_seconds = time.perf_counter() - start
+        return sock
+
+    def connect(self):
+        self._tcp_seconds = 0.0
+        start = time.perf_counter()
+        super().connect()
+        _add_connect_timing(self._tcp_seconds, time.perf_counter() - start)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools hand out connections that record handshake timings"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class RequestTiming:
+    """Wall-clock breakdown of one request, in seconds"""
+
+    def __init__(self, method, url, status, tcp, tls, server, transfer, new_connections):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.tcp = tcp
+        self.tls = tls
+        self.server = server
+        self.transfer = transfer
+        self.new_connections = new_connections
+
+    @property
+    def total(self):
+        return self.tcp + self.tls + self.server + self.transfer
+
+    @property
+    def reused(self):
+        return self.new_connections == 0
+
+    def as_dict(self):
+        return {
+            "method": self.method,
+            "url": self.url,
+            "status": self.status,
+            "connect_ms": round(self.tcp * 1000, 1),
+            "tls_ms": round(self.tls * 1000, 1),
+            "server_ms": round(self.server * 1000, 1),
+            "transfer_ms": round(self.transfer * 1000, 1),
+            "total_ms": round(self.total * 1000, 1),
+            "reused": self.reused,
+        }
+
+    def __str__(self):
+        reuse = "reused" if self.reused else "new conn"
+        return (
+            f"{self.method} {urlsplit(self.url).path} -> {self.status} "
+            f"[connect {self.tcp * 1000:.0f}ms, tls {self.tls * 1000:.0f}ms, "
+            f"server {self.server * 1000:.0f}ms, transfer {self.transfer * 1000:.0f}ms, {reuse}]"
+        )
+
+
+class HttpClient:
+    """
+    requests.Session wrapper with a keep-alive pool, retries and timing capture.
+    Connection and read failures are retried; error statuses are not by default,
+    since the server's 503 + Retry-After backpressure is what load runs measure.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 status_forcelist=()):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.status_forcelist = status_forcelist
+        self.session = requests.Session()
+        if METRICS_TOKEN:
+            self.session.headers["X-Metrics-Token"] = METRICS_TOKEN
+        self._mount(pool_size)
+        # Running totals per (method, path), so long load runs do not keep every timing
+        self.timing_totals = {}
+        self._lock = threading.Lock()
+
+    def _mount(self, pool_size):
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=self.status_forcelist,
+            # Only idempotent methods are retried on read errors / statuses in status_forcelist;
+            # connection failures are retried for every method since nothing was sent
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False,
+        )
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool_size = pool_size
+
+    def resize(self, pool_size):
+        """Grow the connection pool (e.g. for load mode); existing idle connections are dropped"""
+        if pool_size > self.pool_size:
+            self._mount(pool_size)
+
+    def request(self, method, url, **kwargs):
+        _reset_connect_timing()
+        start = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        total = time.perf_counter() - start
+
+        connect = _connect_timing.connect
+        tcp = _connect_timing.tcp
+        # response.elapsed runs from send to parsed headers, so it includes
+        # any handshakes; whatever remains after it is body transfer.
+        headers_at = min(response.elapsed.total_seconds(), total)
+        timing = RequestTiming(
+            method=method.upper(),
+            url=url,
+            status=response.status_code,
+            tcp=tcp,
+            tls=max(connect - tcp, 0.0),
+            server=max(headers_at - connect, 0.0),
+            transfer=max(total - headers_at, 0.0),
+            new_connections=_connect_timing.new_connections,
+        )
+        response.timing = timing
+        key = (timing.method, urlsplit(url).path)
+        with self._lock:
+            totals = self.timing_totals.setdefault(
+                key, {"requests": 0, "new_connections": 0, "tcp": 0.0, "tls": 0.0, "server": 0.0, "total": 0.0}
+            )
+            totals["requests"] += 1
+            totals["new_connections"] += timing.new_connections
+            totals["tcp"] += timing.tcp
+            totals["tls"] += timing.tls
+            totals["server"] += timing.server
+            totals["total"] += timing.total
+        if TRACE:
+            print(f"   ⏱  {timing}")
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def timing_summary(self):
+        """Average timing breakdown per (method, path)"""
+        with self._lock:
+            groups = {key: dict(totals) for key, totals in self.timing_totals.items()}
+        summary = []
+        for (method, path), totals in groups.items():
+            n = totals["requests"]
+            summary.append({
+                "method": method,
+                "path": path,
+                "requests": n,
+                "new_connections": totals["new_connections"],
+                "avg_connect_ms": round(totals["tcp"] / n * 1000, 1),
+                "avg_tls_ms": round(totals["tls"] / n * 1000, 1),
+                "avg_server_ms": round(totals["server"] / n * 1000, 1),
+                "avg_total_ms": round(totals["total"] / n * 1000, 1),
+            })
+        return summary
+
+
+def print_timing_summary(client):
+    """Print where request time went: handshakes vs handlers"""
+    summary = client.timing_summary()
+    if not summary:
+        return
+    print("\n" + "="*60)
+    print("⏱  REQUEST TIMING BREAKDOWN (averages)")
+    print("="*60)
+    header = f"{'request':<32}{'n':>5}{'conns':>7}{'connect':>9}{'tls':>7}{'server':>9}{'total':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in summary:
+        label = f"{row['method']} {row['path']}"[:31]
+        print(
+            f"{label:<32}{row['requests']:>5}{row['new_connections']:>7}"
+            f"{row['avg_connect_ms']:>9.0f}{row['avg_tls_ms']:>7.0f}"
+            f"{row['avg_server_ms']:>9.0f}{row['avg_total_ms']:>9.0f}"
+        )
+    print("(ms; 'conns' = new connections opened, the rest reused the pool)")
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_client(pool_size=None):
+    """Process-wide client shared by every suite; grows the pool if a caller needs more connections"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient(pool_size=max(pool_size or 0, DEFAULT_POOL_SIZE))
+        elif pool_size:
+            _shared_client.resize(pool_size)
+        return _shared_client
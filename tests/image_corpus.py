@@ -0,0 +1,266 @@
+"""
+Synthetic Menu and Meal Image Corpus for Fitbear AI benchmarks
+Renders restaurant menus from the INDIAN_FOOD_DB dish names in Latin and
+Devanagari at phone-camera sizes, JPEG qualities and orientations, and caches
+every rendered image on disk keyed by its parameters
+"""
+
+import hashlib
+import io
+import json
+import os
+import random
+import re
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOOD_DB_SOURCE = os.path.join(REPO_ROOT, "lib", "indian-foods.ts")
+CACHE_DIR = os.environ.get(
+    "FITBEAR_CORPUS_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "fitbear", "corpus")
+)
+
+# Devanagari spellings as they appear on Hindi menus
+DEVANAGARI_NAMES = {
+    "dal tadka": "दाल तड़का",
+    "paneer tikka": "पनीर टिक्का",
+    "chicken tikka": "चिकन टिक्का",
+    "butter chicken": "बटर चिकन",
+    "biryani": "बिरयानी",
+    "roti": "रोटी",
+    "naan": "नान",
+    "rice": "चावल",
+    "idli": "इडली",
+    "dosa": "डोसा",
+    "samosa": "समोसा",
+    "chole": "छोले",
+    "rajma": "राजमा",
+    "palak paneer": "पालक पनीर",
+    "masala dosa": "मसाला डोसा",
+    "upma": "उपमा",
+    "poha": "पोहा",
+    "paratha": "पराठा",
+    "thali": "थाली",
+}
+
+LATIN_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+DEVANAGARI_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/truetype/lohit-devanagari/Lohit-Devanagari.ttf",
+    "/System/Library/Fonts/Supplemental/Devanagari Sangam MN.ttc",
+    "C:\\Windows\\Fonts\\mangal.ttf",
+]
+
+# EXIF Orientation values we emit, mapped to how the sensor-side pixels are
+# stored; a reader applying the tag (e.g. ImageOps.exif_transpose) undoes it
+STORED_ROTATION_FOR_ORIENTATION = {
+    3: Image.Transpose.ROTATE_180,
+    6: Image.Transpose.ROTATE_90,
+    8: Image.Transpose.ROTATE_270,
+}
+
+
+def create_test_image():
+    """Create a simple test image (blank 400x300 PNG) for endpoint smoke tests"""
+    try:
+        img = Image.new('RGB', (400, 300), color='white')
+        img_byte_arr = io.BytesIO()
+        img.save(img_byte_arr, format='PNG')
+        return img_byte_arr.getvalue()
+    except Exception as e:
+        print(f"Error creating test image: {e}")
+        return None
+
+
+def load_dish_names():
+    """Keys of INDIAN_FOOD_DB, read from lib/indian-foods.ts so the corpus tracks the database"""
+    with open(FOOD_DB_SOURCE, encoding="utf-8") as f:
+        source = f.read()
+    block = re.search(r"const INDIAN_FOOD_DB\b[^=]*= \{(.*?)\n\};", source, re.S)
+    if not block:
+        raise RuntimeError(f"INDIAN_FOOD_DB not found in {FOOD_DB_SOURCE}")
+    return re.findall(r'^\s*"([^"]+)":\s*\{', block.group(1), re.M)
+
+
+def _find_font(candidates, env_var):
+    override = os.environ.get(env_var)
+    for path in ([override] if override else []) + candidates:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def _font(size, script):
+    if script == "devanagari":
+        path = _find_font(DEVANAGARI_FONT_CANDIDATES, "FITBEAR_DEVANAGARI_FONT")
+    else:
+        path = _find_font(LATIN_FONT_CANDIDATES, "FITBEAR_LATIN_FONT")
+    if path:
+        return ImageFont.truetype(path, size)
+    # Bitmap fallback renders Devanagari as boxes, but keeps sizes realistic
+    return ImageFont.load_default(size=size)
+
+
+class CorpusSpec:
+    """Parameters for one rendered image; equal specs map to the same cache file"""
+
+    def __init__(self, kind="menu", width=3024, height=4032, quality=90, script="latin",
+                 orientation=1, skew_deg=0.0, dishes=12, seed=0):
+        self.kind = kind
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.script = script
+        self.orientation = orientation
+        self.skew_deg = skew_deg
+        self.dishes = dishes
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    @property
+    def key(self):
+        payload = json.dumps(self.as_dict(), sort_keys=True).encode()
+        return hashlib.sha1(payload).hexdigest()[:16]
+
+    def __repr__(self):
+        return (f"{self.kind} {self.width}x{self.height} q{self.quality} {self.script} "
+                f"orient={self.orientation} skew={self.skew_deg} dishes={self.dishes}")
+
+
+def _paper(spec, rng):
+    """Off-white background with sensor-like noise so JPEG sizes match real photos"""
+    base = Image.new("RGB", (spec.width, spec.height), (rng.randint(236, 250), rng.randint(230, 244), rng.randint(215, 232)))
+    noise = Image.effect_noise((spec.width, spec.height), 28).convert("RGB")
+    return Image.blend(base, noise, 0.12)
+
+
+def _render_menu(spec, rng, names):
+    img = _paper(spec, rng)
+    draw = ImageDraw.Draw(img)
+    margin = spec.width // 12
+    title_size = max(18, spec.width // 16)
+    line_size = max(12, spec.width // 28)
+
+    draw.text((margin, margin), "Swad Family Restaurant", fill=(90, 20, 20), font=_font(title_size, "latin"))
+
+    y = margin + title_size * 2
+    line_gap = int(line_size * 1.7)
+    for name in names:
+        price = f"₹{rng.randrange(40, 420, 5)}"
+        if spec.script == "devanagari":
+            label, script = DEVANAGARI_NAMES.get(name, name), "devanagari"
+        elif spec.script == "mixed" and rng.random() < 0.5:
+            label, script = DEVANAGARI_NAMES.get(name, name), "devanagari"
+        else:
+            label, script = name.title(), "latin"
+        draw.text((margin, y), label, fill=(25, 25, 25), font=_font(line_size, script))
+        draw.text((spec.width - margin - line_size * 4, y), price, fill=(25, 25, 25), font=_font(line_size, "latin"))
+        y += line_gap
+        if y > spec.height - margin:
+            break
+    return img
+
+
+def _render_meal(spec, rng, names):
+    img = _paper(spec, rng)
+    draw = ImageDraw.Draw(img)
+    cx, cy = spec.width // 2, spec.height // 2
+    plate = int(min(spec.width, spec.height) * 0.45)
+    draw.ellipse((cx - plate, cy - plate, cx + plate, cy + plate), fill=(200, 200, 205), outline=(150, 150, 155), width=6)
+    colors = {"dal": (214, 160, 40), "rice": (245, 245, 235), "bread": (200, 150, 90), "paneer": (240, 225, 200)}
+    for i, name in enumerate(names[:4]):
+        r = plate // 3
+        ox = cx + int((i % 2 - 0.5) * plate)
+        oy = cy + int((i // 2 - 0.5) * plate)
+        fill = next((c for k, c in colors.items() if k in name), (170, 90, 40))
+        draw.ellipse((ox - r, oy - r, ox + r, oy + r), fill=fill)
+    return img.filter(ImageFilter.GaussianBlur(radius=1.2))
+
+
+def render(spec):
+    """Render `spec` to JPEG bytes plus metadata listing the dishes it shows"""
+    rng = random.Random(f"{spec.seed}:{spec.kind}:{spec.script}")
+    names = load_dish_names()
+    rng.shuffle(names)
+    names = names[:spec.dishes]
+
+    img = _render_menu(spec, rng, names) if spec.kind == "menu" else _render_meal(spec, rng, names)
+    if spec.skew_deg:
+        img = img.rotate(spec.skew_deg, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=(60, 50, 40))
+
+    exif = Image.Exif()
+    if spec.orientation in STORED_ROTATION_FOR_ORIENTATION:
+        img = img.transpose(STORED_ROTATION_FOR_ORIENTATION[spec.orientation])
+        exif[0x0112] = spec.orientation
+
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=spec.quality, exif=exif.tobytes())
+    data = out.getvalue()
+    meta = {
+        "spec": spec.as_dict(),
+        "dishes": names,
+        "bytes": len(data),
+        "pixels": [img.width, img.height],
+    }
+    return data, meta
+
+
+def get_image(spec, cache_dir=CACHE_DIR):
+    """Cached render: returns (jpeg_bytes, metadata); renders only on a cache miss"""
+    os.makedirs(cache_dir, exist_ok=True)
+    image_path = os.path.join(cache_dir, f"{spec.kind}-{spec.key}.jpg")
+    meta_path = image_path[:-4] + ".json"
+    if os.path.exists(image_path) and os.path.exists(meta_path):
+        with open(image_path, "rb") as f, open(meta_path) as m:
+            return f.read(), json.load(m)
+
+    data, meta = render(spec)
+    tmp_path = image_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, image_path)
+    with open(meta_path, "w") as m:
+        json.dump(meta, m, ensure_ascii=False, indent=2)
+    return data, meta
+
+
+def default_corpus(kind="menu"):
+    """A spread of upload sizes from a small screenshot to a 12MP phone photo"""
+    specs = []
+    for width, height in [(800, 1067), (1600, 2133), (3024, 4032)]:
+        for quality in (70, 85, 95):
+            for script in ("latin", "devanagari", "mixed"):
+                specs.append(CorpusSpec(kind=kind, width=width, height=height, quality=quality, script=script))
+    specs.append(CorpusSpec(kind=kind, orientation=6, quality=90))
+    specs.append(CorpusSpec(kind=kind, skew_deg=7.0, quality=90))
+    specs.append(CorpusSpec(kind=kind, width=4000, height=3000, quality=97, script="mixed"))
+    return specs
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Render and cache the benchmark image corpus")
+    parser.add_argument("--kind", choices=["menu", "meal"], default="menu")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    print(f"📁 Corpus cache: {args.cache_dir}")
+    for spec in default_corpus(args.kind):
+        start = time.time()
+        data, meta = get_image(spec, args.cache_dir)
+        print(f"  {spec!r:<60} {len(data) / 1e6:6.2f} MB  ({time.time() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Load Generation for Fitbear AI Backend
+Replays the backend_test.py scenarios from concurrent workers and reports
+per-endpoint latency percentiles, throughput and error rate
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from tests.http_client import get_client
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * (pct / 100.0)
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class Scenario:
+    """One replayable request: a label, a weight in the mix and a callable doing the request"""
+
+    def __init__(self, name, endpoint, fn, weight=1, expected_status=(200,)):
+        self.name = name
+        self.endpoint = endpoint
+        self.fn = fn
+        self.weight = weight
+        self.expected_status = expected_status
+
+
+class EndpointStats:
+    """Thread-safe latency/error accumulator for a single scenario"""
+
+    def __init__(self, scenario, endpoint):
+        self.scenario = scenario
+        self.endpoint = endpoint
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def record(self, latency, status, ok):
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if not ok:
+                self.errors += 1
+
+    def summary(self, duration):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            errors = self.errors
+            statuses = dict(self.statuses)
+        count = len(latencies)
+        return {
+            "scenario": self.scenario,
+            "endpoint": self.endpoint,
+            "requests": count,
+            "errors": errors,
+            "error_rate": (errors / count) if count else 0.0,
+            "throughput_rps": (count / duration) if duration > 0 else 0.0,
+            "p50_ms": _ms(percentile(latencies, 50)),
+            "p95_ms": _ms(percentile(latencies, 95)),
+            "p99_ms": _ms(percentile(latencies, 99)),
+            "max_ms": _ms(latencies[-1] if latencies else None),
+            "statuses": statuses,
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def default_scenarios(base_url, tdee_payloads, image_bytes, timeout=60, client=None, auth_headers=None):
+    """
+    Scenarios mirroring test_tdee_calculator, test_menu_scanner and test_food_logging_system
+    `auth_headers` (a session Cookie) is sent with log_post, which requires a signed-in user
+    """
+    client = client or get_client()
+    tdee_cycle = itertools.cycle(tdee_payloads)
+    tdee_lock = threading.Lock()
+    log_counter = itertools.count()
+
+    def tdee():
+        with tdee_lock:
+            payload = next(tdee_cycle)
+        return client.post(f"{base_url}/tools/tdee", json=payload, timeout=timeout)
+
+    def menu_scan():
+        files = {'image': ('menu.png', image_bytes, 'image/png')}
+        return client.post(f"{base_url}/menu/scan", files=files, timeout=timeout)
+
+    def log_post():
+        log_data = {
+            "food_id": "dal tadka",
+            "portion_qty": 1,
+            "portion_unit": "katori",
+            "idempotency_key": f"load_{int(time.time())}_{next(log_counter)}"
+        }
+        return client.post(f"{base_url}/logs", json=log_data, headers=auth_headers, timeout=timeout)
+
+    return [
+        Scenario("tdee", "/tools/tdee", tdee, weight=4),
+        Scenario("menu_scan", "/menu/scan", menu_scan, weight=1),
+        Scenario("log_post", "/logs", log_post, weight=3),
+    ]
+
+
+def db_scenarios(base_url, timeout=60, client=None, auth_headers=None):
+    """
+    Scenarios that each hold a MongoDB connection, for exercising the pool:
+    food search on the Mongo query (public; the server only honours
+    X-Food-Search with BENCH_TOGGLES=true) and, with `auth_headers`, the
+    first page of GET /logs and daily rollups
+    """
+    client = client or get_client()
+    queries = itertools.cycle(["roti", "idli", "biryani", "dosa", "rajma", "poha", "chole", "samosa"])
+    query_lock = threading.Lock()
+
+    def food_search_db():
+        with query_lock:
+            query = next(queries)
+        return client.get(f"{base_url}/food/search", params={"q": query},
+                          headers={"X-Food-Search": "mongo"}, timeout=timeout)
+
+    def logs_get():
+        return client.get(f"{base_url}/logs", params={"limit": 20}, headers=auth_headers, timeout=timeout)
+
+    def rollups_get():
+        return client.get(f"{base_url}/rollups", headers=auth_headers, timeout=timeout)
+
+    scenarios = [Scenario("food_search_db", "/food/search", food_search_db, weight=2)]
+    if auth_headers:
+        scenarios += [
+            Scenario("logs_get", "/logs", logs_get, weight=2),
+            Scenario("rollups_get", "/rollups", rollups_get, weight=1),
+        ]
+    return scenarios
+
+
+def _weighted_cycle(scenarios):
+    expanded = [s for s in scenarios for _ in range(max(1, int(s.weight)))]
+    return itertools.cycle(expanded)
+
+
+def run_load(scenarios, duration=30, concurrency=10, rate=None):
+    """
+    Drive the scenario mix for `duration` seconds.
+
+    With `rate` unset, `concurrency` workers loop back-to-back (closed loop).
+    With `rate` set, requests are issued at that many per second regardless of
+    response time (open loop), using up to `concurrency` in-flight workers.
+    """
+    # Keyed by scenario name: several scenarios may share a path (log_post and logs_get are both /logs)
+    stats = {s.name: EndpointStats(s.name, s.endpoint) for s in scenarios}
+    mix = _weighted_cycle(scenarios)
+    mix_lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    dropped = [0]
+
+    def next_scenario():
+        with mix_lock:
+            return next(mix)
+
+    def fire(scenario):
+        start = time.perf_counter()
+        try:
+            response = scenario.fn()
+            ok = response.status_code in scenario.expected_status
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            ok = False
+            status = type(e).__name__
+        stats[scenario.name].record(time.perf_counter() - start, status, ok)
+
+    def closed_loop_worker():
+        while time.monotonic() < deadline:
+            fire(next_scenario())
+
+    started = time.monotonic()
+
+    if rate:
+        interval = 1.0 / rate
+        in_flight = threading.BoundedSemaphore(concurrency)
+
+        def release_after(scenario):
+            try:
+                fire(scenario)
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_at = time.monotonic()
+            while next_at < deadline:
+                now = time.monotonic()
+                if next_at > now:
+                    time.sleep(next_at - now)
+                if in_flight.acquire(blocking=False):
+                    pool.submit(release_after, next_scenario())
+                else:
+                    # All workers busy: the target rate is not sustainable
+                    dropped[0] += 1
+                next_at += interval
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(closed_loop_worker)
+
+    elapsed = time.monotonic() - started
+
+    return {
+        "mode": "rate" if rate else "concurrency",
+        "target_rate": rate,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "dropped": dropped[0],
+        "endpoints": [stats[s.name].summary(elapsed) for s in scenarios],
+    }
+
+
+def print_report(report):
+    """Print a load report in the same banner style as the test scripts"""
+    print("\n" + "="*60)
+    print("📈 LOAD TEST REPORT")
+    print("="*60)
+    mode = f"{report['target_rate']} req/s" if report['mode'] == 'rate' else f"{report['concurrency']} workers"
+    print(f"Mode: {report['mode']} ({mode}), duration {report['duration_s']}s")
+    if report['dropped']:
+        print(f"⚠️  {report['dropped']} requests dropped - target rate not sustainable at this concurrency")
+
+    header = f"{'scenario':<16}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in report['endpoints']:
+        print(
+            f"{row['scenario']:<16}{row['requests']:>7}{row['throughput_rps']:>8.1f}"
+            f"{row['error_rate'] * 100:>6.1f}%"
+            f"{_fmt(row['p50_ms']):>9}{_fmt(row['p95_ms']):>9}{_fmt(row['p99_ms']):>9}"
+        )
+    print("(latencies in ms)")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.0f}"
@@ -0,0 +1,109 @@
+"""
+OCR'd Menu Text Corpus for Fitbear AI benchmarks
+What Gemini Vision reads off Indian restaurant menus, one line per item: the
+INDIAN_FOOD_DB dishes plus common dishes the database does not know, printed
+the way real menus print them - section headings, serial numbers, "₹280" /
+"Rs. 180" / "180/-" prices, "(2 pcs)" and "Half/Full" portions, Devanagari
+names and digits. Restaurants share most of their dishes under different
+prices and spellings, which is what the menu line cache relies on.
+
+    python -m tests.menu_corpus --seed 3
+"""
+
+import random
+
+from tests.image_corpus import DEVANAGARI_NAMES, load_dish_names
+
+# Everyday menu items with no INDIAN_FOOD_DB entry (some may exist in food_items)
+OTHER_DISHES = [
+    "paneer butter masala", "dal makhani", "kadai paneer", "shahi paneer", "malai kofta",
+    "aloo gobi", "jeera aloo", "bhindi masala", "mix veg", "baingan bharta",
+    "veg biryani", "jeera rice", "veg pulao", "curd rice", "lemon rice",
+    "butter naan", "garlic naan", "tandoori roti", "lachha paratha", "aloo paratha",
+    "chole bhature", "pav bhaji", "vada pav", "medu vada", "uttapam",
+    "veg manchurian", "hakka noodles", "veg fried rice", "chilli paneer", "spring rolls",
+    "tandoori chicken", "chicken biryani", "mutton rogan josh", "fish curry", "egg curry",
+    "gulab jamun", "rasmalai", "gajar halwa", "kulfi", "masala chai",
+    "sweet lassi", "fresh lime soda", "cold coffee", "mango shake", "jaljeera",
+]
+
+SECTIONS = [
+    "STARTERS", "Soups", "MAIN COURSE", "Breads", "Rice & Biryani", "SOUTH INDIAN",
+    "Chinese", "Desserts", "BEVERAGES", "Chef's Specials", "शाकाहारी", "मिठाई",
+]
+
+PORTIONS = ["(2 pcs)", "(4 pcs)", "(6 pcs)", "Half/Full", "(Half)", "(Full)", "(Regular)", "250 ml", "1 plate"]
+
+DEVANAGARI_DIGITS = str.maketrans("0123456789", "०१२३४५६७८९")
+
+
+def _price(rng, amount):
+    style = rng.random()
+    if style < 0.35:
+        return f"₹{amount}"
+    if style < 0.55:
+        return f"Rs. {amount}"
+    if style < 0.7:
+        return f"{amount}/-"
+    if style < 0.8:
+        return f"₹ {amount}.00"
+    if style < 0.9:
+        return f"{amount}/{amount + rng.randrange(40, 120, 10)}"  # half / full
+    return f"{amount}"
+
+
+def _spelling(rng, name):
+    style = rng.random()
+    if name in DEVANAGARI_NAMES and style < 0.2:
+        return DEVANAGARI_NAMES[name]
+    if style < 0.5:
+        return name.title()
+    if style < 0.8:
+        return name.upper()
+    return name
+
+
+def menu_items(seed, dishes=40):
+    """
+    One restaurant's menu as OCR lines: dicts with the raw `line`, plus the
+    dish `name` and `price` as Gemini would split them (None for headings)
+    """
+    rng = random.Random(f"menu-text:{seed}")
+    pool = load_dish_names() + OTHER_DISHES
+    names = rng.sample(pool, min(dishes, len(pool)))
+    per_section = max(3, len(names) // 6)
+
+    items = []
+    for i, name in enumerate(names):
+        if i % per_section == 0:
+            heading = rng.choice(SECTIONS)
+            items.append({"line": heading, "name": None, "price": None})
+        label = _spelling(rng, name)
+        if rng.random() < 0.35:
+            label = f"{label} {rng.choice(PORTIONS)}"
+        price = _price(rng, rng.randrange(30, 450, 5))
+        if any("ऀ" <= ch <= "ॿ" for ch in label) and rng.random() < 0.5:
+            price = price.translate(DEVANAGARI_DIGITS)
+        prefix = f"{i + 1}. " if rng.random() < 0.25 else ""
+        separator = rng.choice([" ", " - ", " ..... ", "  "])
+        items.append({"line": f"{prefix}{label}{separator}{price}", "name": label, "price": price})
+    return items
+
+
+def menu_lines(seed, dishes=40):
+    """Just the OCR text lines of menu_items()"""
+    return [item["line"] for item in menu_items(seed, dishes)]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print one synthetic OCR'd menu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dishes", type=int, default=40)
+    args = parser.parse_args()
+    print("\n".join(menu_lines(args.seed, args.dishes)))
+
+
+if __name__ == "__main__":
+    main()
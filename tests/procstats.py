@@ -0,0 +1,78 @@
+"""
+Server Process Sampling for the Fitbear AI benchmarks
+Reads resident memory of the Next.js server from /proc (Linux only) so a
+benchmark can report peak RSS while a request is in flight
+"""
+
+import os
+import threading
+
+
+def find_server_pid(pattern="next-server"):
+    """First process whose command line contains `pattern`, or None"""
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace")
+        except OSError:
+            continue
+        if pattern in cmdline:
+            return int(entry)
+    return None
+
+
+def read_rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+class RssSampler:
+    """
+    Samples RSS of `pid` every `interval` seconds on a background thread
+    Use as a context manager; `baseline_mb`, `peak_mb` and `delta_mb` are
+    filled in on exit.
+    """
+
+    def __init__(self, pid, interval=0.02):
+        self.pid = pid
+        self.interval = interval
+        self.baseline_kb = 0
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.peak_kb = max(self.peak_kb, read_rss_kb(self.pid))
+            except OSError:
+                return
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.baseline_kb = self.peak_kb = read_rss_kb(self.pid)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    @property
+    def baseline_mb(self):
+        return round(self.baseline_kb / 1024, 1)
+
+    @property
+    def peak_mb(self):
+        return round(self.peak_kb / 1024, 1)
+
+    @property
+    def delta_mb(self):
+        return round((self.peak_kb - self.baseline_kb) / 1024, 1)
@@ -0,0 +1,142 @@
+"""
+Parallel Test Runner for the Fitbear AI Python suites
+Runs independent test functions on a worker pool and only serialises tests
+that declare a dependency on another test
+"""
+
+import io
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class _ThreadRoutedStdout:
+    """sys.stdout stand-in that buffers each test thread's prints separately"""
+
+    def __init__(self, target):
+        self._target = target
+        self._buffers = {}
+
+    def capture(self):
+        buffer = io.StringIO()
+        self._buffers[threading.get_ident()] = buffer
+        return buffer
+
+    def release(self):
+        self._buffers.pop(threading.get_ident(), None)
+
+    def write(self, text):
+        buffer = self._buffers.get(threading.get_ident())
+        if buffer is not None:
+            return buffer.write(text)
+        return self._target.write(text)
+
+    def flush(self):
+        self._target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def _normalise(tests):
+    specs = []
+    for entry in tests:
+        name, fn = entry[0], entry[1]
+        depends_on = tuple(entry[2]) if len(entry) > 2 else ()
+        specs.append((name, fn, depends_on))
+
+    names = {name for name, _, _ in specs}
+    for name, _, depends_on in specs:
+        missing = [dep for dep in depends_on if dep not in names]
+        if missing:
+            raise ValueError(f"{name} depends on unknown test(s): {missing}")
+
+    # Reject cycles up front rather than deadlocking the scheduler
+    state = {}
+
+    def visit(name, deps_by_name):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle involving {name}")
+        state[name] = "visiting"
+        for dep in deps_by_name[name]:
+            visit(dep, deps_by_name)
+        state[name] = "done"
+
+    deps_by_name = {name: depends_on for name, _, depends_on in specs}
+    for name in deps_by_name:
+        visit(name, deps_by_name)
+    return specs
+
+
+def _run_one(name, fn):
+    start = time.perf_counter()
+    try:
+        result = bool(fn())
+    except Exception as e:
+        print(f"❌ FAIL: {name} crashed - {e}")
+        result = False
+    return result, time.perf_counter() - start
+
+
+def run_tests(tests, workers=None, serial=False):
+    """
+    Run `tests`, a list of (name, fn) or (name, fn, depends_on) tuples.
+
+    Tests whose dependencies have finished are started immediately on the
+    pool; a test listed in another's `depends_on` always completes before it
+    starts. Each test's output is printed as one block when it finishes.
+    Returns ({name: passed}, {name: seconds}) in declaration order.
+    """
+    specs = _normalise(tests)
+    order = [name for name, _, _ in specs]
+    results = {}
+    durations = {}
+
+    if serial:
+        remaining = list(specs)
+        while remaining:
+            for spec in remaining:
+                name, fn, depends_on = spec
+                if all(dep in results for dep in depends_on):
+                    results[name], durations[name] = _run_one(name, fn)
+                    remaining.remove(spec)
+                    break
+        return {n: results[n] for n in order}, {n: durations[n] for n in order}
+
+    router = _ThreadRoutedStdout(sys.stdout)
+    print_lock = threading.Lock()
+
+    def run_captured(name, fn):
+        buffer = router.capture()
+        try:
+            result, elapsed = _run_one(name, fn)
+        finally:
+            router.release()
+        with print_lock:
+            router._target.write(buffer.getvalue())
+            router._target.write(f"⏱  {name} finished in {elapsed:.2f}s\n")
+            router._target.flush()
+        return result, elapsed
+
+    pending = list(specs)
+    running = {}
+    sys.stdout = router
+    try:
+        with ThreadPoolExecutor(max_workers=workers or len(specs) or 1) as pool:
+            while pending or running:
+                for spec in list(pending):
+                    name, fn, depends_on = spec
+                    if all(dep in results for dep in depends_on):
+                        running[pool.submit(run_captured, name, fn)] = name
+                        pending.remove(spec)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], durations[name] = future.result()
+    finally:
+        sys.stdout = router._target
+
+    return {n: results[n] for n in order}, {n: durations[n] for n in order}
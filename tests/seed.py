@@ -0,0 +1,119 @@
+"""
+Bulk Data Seeding for the Fitbear AI benchmarks
+Writes synthetic food_logs / targets straight into MongoDB so export,
+pagination and rollup benchmarks can run against realistic volumes
+
+Needs pymongo (pip install pymongo); only the benchmark modes import this.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "your_database_name")
+
+# (food_id, kcal, protein_g, carb_g, fat_g, fiber_g) per standard portion
+FOODS = [
+    ("idli", 58, 2.0, 12.0, 0.4, 0.6),
+    ("dosa", 168, 3.9, 28.0, 3.7, 1.2),
+    ("poha", 180, 3.5, 32.0, 4.0, 1.5),
+    ("rajma_chawal", 420, 14.0, 70.0, 8.0, 9.0),
+    ("chole", 270, 11.0, 35.0, 9.0, 8.0),
+    ("roti", 104, 3.1, 18.0, 2.4, 2.7),
+    ("chicken_curry", 320, 28.0, 8.0, 19.0, 1.5),
+    ("curd", 98, 5.0, 7.0, 5.5, 0.0),
+    ("upma", 210, 5.0, 30.0, 7.5, 2.0),
+    ("sambar", 130, 6.0, 18.0, 4.0, 5.0),
+]
+
+
+def get_db(mongo_url=None, db_name=None):
+    try:
+        from pymongo import MongoClient
+    except ImportError as e:
+        raise SystemExit("pymongo is required for seeding: pip install pymongo") from e
+    client = MongoClient(mongo_url or MONGO_URL)
+    return client[db_name or DB_NAME]
+
+
+def _log(user_id, ts, rng):
+    food_id, kcal, protein, carb, fat, fiber = rng.choice(FOODS)
+    qty = rng.choice([0.5, 1, 1, 1, 1.5, 2])
+    return {
+        "user_id": user_id,
+        "ts": ts,
+        "source_enum": "manual",
+        "food_id": food_id,
+        "portion_qty_numeric": qty,
+        "portion_units": "serving",
+        "kcal": round(kcal * qty, 1),
+        "protein_g": round(protein * qty, 1),
+        "carb_g": round(carb * qty, 1),
+        "fat_g": round(fat * qty, 1),
+        "fiber_g": round(fiber * qty, 1),
+        "notes": "seeded",
+        "created_at": ts,
+    }
+
+
+def seed_food_logs(db, user_id, count, days=365, batch=5000, seed=7):
+    """
+    Insert `count` logs for `user_id` spread evenly over the last `days` days,
+    in batches of `batch`. Returns (first_ts, last_ts).
+    """
+    rng = random.Random(seed)
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - timedelta(days=days)
+    step = (end - start) / max(count, 1)
+
+    docs = []
+    for i in range(count):
+        docs.append(_log(user_id, start + step * i, rng))
+        if len(docs) >= batch:
+            db.food_logs.insert_many(docs, ordered=False)
+            docs = []
+    if docs:
+        db.food_logs.insert_many(docs, ordered=False)
+    return start, end
+
+
+def seed_targets(db, user_id, days=365):
+    """One targets document per day for the last `days` days (upserted)"""
+    from pymongo import UpdateOne
+
+    today = datetime.now(timezone.utc).date()
+    ops = []
+    for offset in range(days):
+        day = (today - timedelta(days=offset)).isoformat()
+        ops.append(UpdateOne(
+            {"user_id": user_id, "date": day},
+            {"$set": {
+                "user_id": user_id,
+                "date": day,
+                "tdee_kcal": 2300,
+                "kcal_budget": 1900,
+                "protein_g": 110,
+                "carb_g": 220,
+                "fat_g": 60,
+                "fiber_g": 30,
+                "water_ml": 2500,
+                "steps": 8000,
+                "seeded": True,
+            }},
+            upsert=True,
+        ))
+    if ops:
+        db.targets.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def clear_user(db, user_id, notes="seeded"):
+    """Remove what seed_* wrote for `user_id`; returns (logs_deleted, targets_deleted)"""
+    logs = db.food_logs.delete_many({"user_id": user_id, "notes": notes}).deleted_count
+    targets = db.targets.delete_many({"user_id": user_id, "seeded": True}).deleted_count
+    return logs, targets
+
+
+def count_logs(db, user_id):
+    return db.food_logs.count_documents({"user_id": user_id})
@@ -0,0 +1,108 @@
+"""
+Streaming Response Readers for the Fitbear AI Python suites
+Parses Server-Sent Events and NDJSON bodies from a `requests` response opened
+with stream=True, timing time-to-first-byte, time-to-first-token and total
+"""
+
+import json
+import time
+
+
+class StreamTiming:
+    """Client-side timings (seconds from `started`) for one streamed response"""
+
+    def __init__(self, started):
+        self.started = started
+        self.first_byte = None
+        self.first_token = None
+        self.total = None
+        self.events = 0
+        self.bytes = 0
+
+    def mark_bytes(self, n):
+        if self.first_byte is None:
+            self.first_byte = time.perf_counter() - self.started
+        self.bytes += n
+
+    def mark_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self):
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+        return {
+            "ttfb_ms": ms(self.first_byte),
+            "ttft_ms": ms(self.first_token),
+            "total_ms": ms(self.total),
+            "events": self.events,
+            "bytes": self.bytes,
+        }
+
+    def __str__(self):
+        d = self.as_dict()
+        return f"ttfb={d['ttfb_ms']}ms ttft={d['ttft_ms']}ms total={d['total_ms']}ms events={d['events']}"
+
+
+def _lines(response, timing):
+    buffer = b""
+    for chunk in response.iter_content(chunk_size=None):
+        if not chunk:
+            continue
+        timing.mark_bytes(len(chunk))
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            yield line.rstrip(b"\r").decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+
+def _parse(response, timing, token_type):
+    content_type = response.headers.get("Content-Type", "")
+    sse = "text/event-stream" in content_type
+
+    event_type, data_lines = "message", []
+    for line in _lines(response, timing):
+        if sse:
+            if line.startswith("event:"):
+                event_type = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            elif line == "" and data_lines:
+                payload = json.loads("\n".join(data_lines))
+                timing.events += 1
+                if event_type == token_type:
+                    timing.mark_token()
+                yield event_type, payload
+                event_type, data_lines = "message", []
+        elif line.strip():
+            payload = json.loads(line)
+            kind = payload.pop("type", "message")
+            timing.events += 1
+            if kind == token_type:
+                timing.mark_token()
+            yield kind, payload
+
+
+def iter_events(response, started=None, token_type="token"):
+    """
+    Yield (event_type, payload_dict, timing) for an SSE or NDJSON response,
+    chosen by its Content-Type. `timing` is updated in place; it is final
+    once the generator is exhausted.
+    """
+    timing = StreamTiming(started if started is not None else time.perf_counter())
+    for kind, payload in _parse(response, timing, token_type):
+        yield kind, payload, timing
+    timing.finish()
+
+
+def read_stream(response, started=None, token_type="token"):
+    """Consume a whole stream; returns (list of (type, payload), StreamTiming)"""
+    timing = StreamTiming(started if started is not None else time.perf_counter())
+    events = list(_parse(response, timing, token_type))
+    timing.finish()
+    return events, timing
@@ -0,0 +1,125 @@
+"""
+Streaming STT Client for the Fitbear AI Python suites
+Streams a WAV file to /api/stt/stream as raw PCM, paced like a live
+microphone, and times the transcripts pushed back. The number that matters is
+end-of-speech to final transcript: how long the user waits after they stop
+talking.
+
+    python -m tests.stt_stream clip.wav --url ws://localhost:3000/api/stt/stream
+"""
+
+import argparse
+import io
+import json
+import math
+import struct
+import threading
+import time
+import wave
+from urllib.parse import urlencode
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+
+def synthetic_wav(seconds=2.0, rate=16000):
+    """16-bit mono WAV of voice-band tone bursts; enough audio to time the pipeline"""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 3 * t)  # ~3 syllables a second
+        sample = envelope * (0.6 * math.sin(2 * math.pi * 220 * t) + 0.3 * math.sin(2 * math.pi * 660 * t))
+        frames += struct.pack("<h", int(sample * 12000))
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+    return out.getvalue()
+
+
+def stream_wav(url, wav_bytes, chunk_ms=100, realtime=True, timeout=30):
+    """
+    Stream one WAV clip and return timings in ms: first interim transcript
+    (from the first audio sent), end-of-speech to final transcript, and the
+    relay's own finalize_ms. Raises websockets.exceptions.InvalidStatus if the
+    server refuses the upgrade.
+    """
+    with wave.open(io.BytesIO(wav_bytes)) as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError("stream_wav needs 16-bit PCM WAV")
+        rate, channels = wav.getframerate(), wav.getnchannels()
+        pcm = wav.readframes(wav.getnframes())
+
+    separator = "&" if "?" in url else "?"
+    query = urlencode({"encoding": "linear16", "sample_rate": rate, "channels": channels})
+    received = []  # (seconds since start, message)
+    finished = threading.Event()
+    chunk_bytes = int(rate * channels * 2 * chunk_ms / 1000)
+
+    with connect(f"{url}{separator}{query}", open_timeout=timeout, compression=None) as conn:
+        def reader():
+            try:
+                for payload in conn:
+                    if isinstance(payload, str):
+                        message = json.loads(payload)
+                        received.append((time.perf_counter() - started, message))
+                        if message.get("type") in ("done", "error"):
+                            break
+            except (ConnectionClosed, OSError):
+                pass
+            finally:
+                finished.set()
+
+        started = time.perf_counter()
+        threading.Thread(target=reader, daemon=True).start()
+
+        for i, offset in enumerate(range(0, len(pcm), chunk_bytes)):
+            if realtime:
+                # Pace like a microphone: chunk i is not available before i * chunk_ms
+                wait = started + i * chunk_ms / 1000 - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            conn.send(pcm[offset:offset + chunk_bytes])
+        speech_ended = time.perf_counter() - started
+        conn.send(json.dumps({"type": "stop"}))
+
+        finished.wait(timeout)
+
+    def ms(seconds):
+        return round(seconds * 1000, 1)
+
+    interims = [(at, m) for at, m in received if m.get("type") == "transcript" and not m.get("is_final")]
+    done = next((m for _, m in received if m.get("type") == "done"), None)
+    done_at = next((at for at, m in received if m.get("type") == "done"), None)
+    error = next((m.get("error") for _, m in received if m.get("type") == "error"), None)
+    return {
+        "audio_ms": ms(len(pcm) / (rate * channels * 2)),
+        "interim_results": len(interims),
+        "first_interim_ms": ms(interims[0][0]) if interims else None,
+        "end_of_speech_to_final_ms": ms(done_at - speech_ended) if done_at is not None else None,
+        "relay_finalize_ms": done.get("finalize_ms") if done else None,
+        "transcript": done.get("text", "") if done else None,
+        "error": error if error else (None if done else "no final transcript before timeout"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a WAV file to /api/stt/stream and time the transcripts")
+    parser.add_argument("wav", nargs="?", help="16-bit PCM WAV (default: a synthetic 2s clip)")
+    parser.add_argument("--url", default="ws://localhost:3000/api/stt/stream")
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--fast", action="store_true", help="Send as fast as possible instead of real time")
+    args = parser.parse_args()
+
+    if args.wav:
+        with open(args.wav, "rb") as f:
+            wav_bytes = f.read()
+    else:
+        wav_bytes = synthetic_wav()
+    print(json.dumps(stream_wav(args.url, wav_bytes, args.chunk_ms, realtime=not args.fast), indent=2))
+
+
+if __name__ == "__main__":
+    main()